@@ -1,10 +1,16 @@
+import asyncio
+import functools
+import os
+import threading
+import weakref
 import pandas as pd
-from concurrent.futures import ThreadPoolExecutor
-from typing import List, Dict, Any
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
 from data_modeling.modeler import Modeler
 from utils.config import Config
 from data_ingestion.csv_loader import CSVLoader
 from data_ingestion.crosstab_loader import CrosstabLoader
+from data_ingestion.schema_inference import SchemaInferer
 from data_transformation.cleaner import DataCleaner
 from data_transformation.transformer import DataTransformer
 from data_analysis.qual import QualitativeAnalysis
@@ -12,40 +18,130 @@ from data_analysis.quant import QuantitativeAnalysis
 from data_modeling.visualizer import Visualizer
 from generators.generate_data import DataGenerator
 from data_storage.sqlite_handler import SQLiteHandler
+from data_storage.column_store import ColumnStore
 from data_storage.query_builder import QueryBuilder
+from data_storage.result_cache import QueryResultCache
 from utils.logger import logger
 
 
 
 
-def load_data(file_path: str, file_type: str = 'csv', **kwargs) -> pd.DataFrame:
+def load_data(file_path: str, file_type: str = 'csv', optimize_dtypes: bool = False, **kwargs) -> pd.DataFrame:
+    """
+    Load a CSV or Excel file into a pandas DataFrame.
+
+    :param file_path: The path of the file to load.
+    :param file_type: 'csv', or 'xlsx'/'xls'/'excel' for Excel workbooks.
+    :param optimize_dtypes: If True, infer the narrowest dtypes (small ints, float32, category, bool, dates) from a sample and use them for the loaded frame.
+    :param kwargs: Additional keyword arguments passed to the loader.
+
+    :return: The loaded DataFrame, or a dictionary of DataFrames when all sheets of a workbook are loaded.
+    """
     if file_type == 'csv':
         loader = CSVLoader()
-        return loader.load_csv(file_path, **kwargs)
+        try:
+            return loader.load_csv(file_path, optimize_dtypes=optimize_dtypes, **kwargs)
+        finally:
+            loader.close()
     elif file_type == 'xlsx' or file_type == 'xls' or file_type == 'excel':
         loader = CrosstabLoader()
-        return loader.load_crosstab(file_path, **kwargs)
+        try:
+            data = loader.load_crosstab(file_path, **kwargs)
+        finally:
+            loader.close()
+        if optimize_dtypes:
+            inferer = SchemaInferer()
+            if isinstance(data, dict):
+                return {name: inferer.optimize(df) for name, df in data.items()}
+            return inferer.optimize(data)
+        return data
     else:
         raise ValueError(f"Unsupported file type: {file_type}")
 
 
+async def load_data_async(file_path: str, file_type: str = 'csv', optimize_dtypes: bool = False,
+                          executor: Optional[Executor] = None, semaphore: Optional[asyncio.Semaphore] = None,
+                          **kwargs) -> pd.DataFrame:
+    """
+    Asynchronous version of load_data. Parsing runs in an executor so the event loop stays responsive while the file is read.
+
+    :param file_path: The path of the file to load.
+    :param file_type: 'csv', or 'xlsx'/'xls'/'excel' for Excel workbooks.
+    :param optimize_dtypes: If True, infer the narrowest dtypes from a sample (see load_data).
+    :param executor: The executor that runs the parse. If not provided, the event loop's default executor is used. A ProcessPoolExecutor avoids holding the GIL during parsing.
+    :param semaphore: An optional semaphore that bounds how many loads run at once.
+    :param kwargs: Additional keyword arguments passed to the loader.
+
+    :return: The loaded DataFrame, or a dictionary of DataFrames when all sheets of a workbook are loaded.
+    """
+    loop = asyncio.get_running_loop()
+    call = functools.partial(load_data, file_path, file_type, optimize_dtypes, **kwargs)
+    if semaphore is None:
+        return await loop.run_in_executor(executor, call)
+    async with semaphore:
+        return await loop.run_in_executor(executor, call)
+
+
 class Core:
-    def __init__(self, config_file: str = 'config.json'):
+    def __init__(self, config_file: str = 'config.json', max_workers: int = None, max_concurrent_queries: int = None,
+                 max_concurrent_writes: int = 1, query_cache_bytes: int = 256 * 1024 ** 2):
+        """
+        :param config_file: The path of the JSON configuration file.
+        :param max_workers: The number of threads of the executor that runs blocking work for the async methods.
+        :param max_concurrent_queries: How many query_data_async calls may run at once. Defaults to the executor size.
+        :param max_concurrent_writes: How many save_to_sqlite_async calls may run at once. SQLite allows one writer at a time, so this defaults to 1.
+        :param query_cache_bytes: Memory bound of the results kept by query_data(use_cache=True).
+        """
         self.config = Config(config_file)
-        self.executor = ThreadPoolExecutor()
+        # Same default size as ThreadPoolExecutor's own.
+        max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
         self.dataframe = None
         self.db_path = 'data.db'
         self.table_name = 'generated_data'
         self.query_builder = QueryBuilder()
+        self.query_cache = QueryResultCache(query_cache_bytes)
+        self.max_concurrent_queries = max_concurrent_queries or max_workers
+        self.max_concurrent_writes = max_concurrent_writes
+        # Semaphores belong to one event loop, so they are created per running loop.
+        self._limits = weakref.WeakKeyDictionary()
+        # One handler per database, shared by every call until close().
+        self._handlers = {}
+        self._handlers_lock = threading.Lock()
+
+    def _handler(self, db_path: str) -> SQLiteHandler:
+        with self._handlers_lock:
+            if db_path not in self._handlers:
+                self._handlers[db_path] = SQLiteHandler(db_path)
+            return self._handlers[db_path]
+
+    def close(self):
+        """
+        Release the database handlers and the query cache held by this Core and shut its executor down.
+        """
+        with self._handlers_lock:
+            handlers, self._handlers = list(self._handlers.values()), {}
+        for handler in handlers:
+            handler.close_connection()
+        self.query_cache.close()
+        self.executor.shutdown()
+
+    def _limit(self, kind: str) -> asyncio.Semaphore:
+        limits = self._limits.setdefault(asyncio.get_running_loop(), {})
+        if kind not in limits:
+            size = self.max_concurrent_queries if kind == 'query' else self.max_concurrent_writes
+            limits[kind] = asyncio.Semaphore(size)
+        return limits[kind]
 
     def generate_data(self, num_rows: int = None, columns: List[Dict[str, Any]] = None,
-                      save_path: str = 'generated_data.csv') -> pd.DataFrame:
+                      save_path: str = 'generated_data.csv', save_format: str = 'csv') -> pd.DataFrame:
         """
-        This method generates artificial data and saves it in a CSV file. It returns the generated data as a pandas DataFrame.
+        This method generates artificial data and saves it in a CSV file or a column store. It returns the generated data as a pandas DataFrame.
 
         :param num_rows: The number of rows to generate in the DataFrame. If not provided, it defaults to the value specified in the configuration.
         :param columns: A list of dictionaries representing the columns to include in the DataFrame. Each dictionary should contain the keys 'name' (column name), 'data_type' (column data type), and optionally 'options' (additional options for the column).
         :param save_path: The file path where the generated data will be saved. If not provided, it defaults to 'generated_data.csv'.
+        :param save_format: 'csv' to write a CSV file, or 'columns' to write a memory-mapped column store directory (see open_dataset).
 
         :return: The generated data as a pandas DataFrame.
         """
@@ -62,21 +158,92 @@ class Core:
             generator.add_column(column['name'], column['data_type'], column.get('options', {}))
 
         self.dataframe = generator.generate()
-        self.dataframe.to_csv(save_path, index=False)
+        if save_format == 'columns':
+            ColumnStore(save_path).write(self.dataframe)
+        elif save_format == 'csv':
+            self.dataframe.to_csv(save_path, index=False)
+        else:
+            raise ValueError(f"Unsupported save format: {save_format}")
         logger.info(f"Data generated and saved to '{save_path}'.")
         return self.dataframe
 
+    def save_dataset(self, path: str, df: pd.DataFrame = None) -> int:
+        """
+        This method saves a DataFrame as a memory-mapped column store: one numpy file per column plus a JSON schema.
+
+        :param path: The directory of the column store.
+        :param df: The DataFrame to save. If not provided, the current dataframe is saved.
+
+        :return: The number of rows written.
+        """
+        df = self.dataframe if df is None else df
+        if df is None:
+            raise ValueError("No data to save.")
+        return ColumnStore(path).write(df)
+
+    def open_dataset(self, path: str, mmap_mode: str = 'r') -> pd.DataFrame:
+        """
+        This method opens a column store written by save_dataset or generate_data without copying it into memory. The columns of the returned DataFrame are memory-mapped, so opening is instant and processes opening the same store share the OS page cache.
+
+        :param path: The directory of the column store.
+        :param mmap_mode: 'r' for read-only columns, or 'c' for copy-on-write columns whose changes are never written back.
+
+        :return: The memory-mapped data as a pandas DataFrame.
+        """
+        self.dataframe = ColumnStore(path).open(mmap_mode)
+        return self.dataframe
+
     def save_to_sqlite(self, db_path: str = 'data.db', table_name: str = 'generated_data'):
-        handler = SQLiteHandler(db_path)
-        handler.save_dataframe_to_db(self.dataframe, table_name)
-        logger.info(f"Data saved to SQLite database '{db_path}'.")
+        self._save_frame(self.dataframe, db_path, table_name)
+
+    def query_data(self, query: str, params=None, use_cache: bool = False):
+        """
+        Execute a SQL query on the Core database.
 
-    def query_data(self, query: str):
-        handler = SQLiteHandler(self.db_path)
-        handler.create_connection()
-        results = handler.execute_query(query)
-        logger.info(f"Query executed successfully.")
-        handler.close_connection()
+        :param query: The SQL query to execute.
+        :param params: Optional values for the query's placeholders.
+        :param use_cache: If True, serve repeated read queries from query_cache. Cached results are dropped whenever the database is written, by this process or another one.
+
+        :return: The result rows.
+        """
+        if not use_cache:
+            results = self._handler(self.db_path).execute_query(query, params)
+            logger.info(f"Query executed successfully.")
+            return results
+        results, cached = self.query_cache.get_or_run(
+            self.db_path, query, params, lambda: self._handler(self.db_path).execute_query(query, params))
+        if not cached:
+            logger.info(f"Query executed successfully.")
         return results
 
+    async def save_to_sqlite_async(self, db_path: str = 'data.db', table_name: str = 'generated_data',
+                                   df: pd.DataFrame = None):
+        """
+        Asynchronous version of save_to_sqlite. The write runs on the Core executor, and at most max_concurrent_writes saves run at once.
+
+        :param db_path: The path of the SQLite database.
+        :param table_name: The name of the table to append to.
+        :param df: The DataFrame to save. If not provided, the current dataframe is saved.
+        """
+        df = self.dataframe if df is None else df
+        loop = asyncio.get_running_loop()
+        async with self._limit('write'):
+            await loop.run_in_executor(self.executor, functools.partial(self._save_frame, df, db_path, table_name))
+
+    def _save_frame(self, df: pd.DataFrame, db_path: str, table_name: str):
+        self._handler(db_path).save_dataframe_to_db(df, table_name)
+        logger.info(f"Data saved to SQLite database '{db_path}'.")
 
+    async def query_data_async(self, query: str, params=None, use_cache: bool = False):
+        """
+        Asynchronous version of query_data. The query runs on the Core executor, and at most max_concurrent_queries queries run at once.
+
+        :param query: The SQL query to execute.
+        :param params: Optional values for the query's placeholders.
+        :param use_cache: If True, serve repeated read queries from query_cache.
+
+        :return: The result rows.
+        """
+        loop = asyncio.get_running_loop()
+        async with self._limit('query'):
+            return await loop.run_in_executor(self.executor, self.query_data, query, params, use_cache)
@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 from utils.logger import logger
+from utils.ownership import take_ownership
 from nltk.sentiment.vader import SentimentIntensityAnalyzer
 from wordcloud import WordCloud
 import matplotlib.pyplot as plt
@@ -17,6 +18,10 @@ class QualitativeAnalysis:
     Attributes:
         df (pd.DataFrame): The DataFrame containing the text data.
 
+    Parameters:
+        copy (bool): Analyze a copy of the input DataFrame (default is True). With copy=False the result columns, such
+            as 'sentiment', are written to the caller's DataFrame.
+
     Main Methods:
         - sentiment_analysis: Perform sentiment analysis on a text column.
         - generate_wordcloud: Generate a word cloud from a text column.
@@ -27,8 +32,8 @@ class QualitativeAnalysis:
         - The sentiment analysis method uses the VADER sentiment analysis tool.
         - The keyword extraction method supports both TF-IDF and count-based methods.
     """
-    def __init__(self, df):
-        self.df = df.copy()
+    def __init__(self, df, copy=True):
+        self.df = take_ownership(df, copy)
 
     def sentiment_analysis(self, text_column):
         """
@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 from utils.logger import logger
+from utils.ownership import take_ownership
 import seaborn as sns
 import matplotlib.pyplot as plt
 from scipy import stats
@@ -19,6 +20,11 @@ class QuantitativeAnalysis:
     Attributes:
         df (pd.DataFrame): The DataFrame containing the numerical data.
 
+    Parameters:
+        copy (bool): Analyze a copy of the input DataFrame (default is True). The analyses only read the data, so
+            copy=False avoids the copy for a frame the caller no longer changes, such as one taken from an earlier
+            pipeline stage with utils.ownership.handoff.
+
     Main Methods:
         - descriptive_statistics: Calculate descriptive statistics for the DataFrame.
         - correlation_matrix: Calculate the correlation matrix for the DataFrame.
@@ -33,8 +39,8 @@ class QuantitativeAnalysis:
         - The linear regression method uses the scikit-learn LinearRegression model.
         - The hypothesis testing method supports t-tests and ANOVA tests.
     """
-    def __init__(self, df):
-        self.df = df.copy()
+    def __init__(self, df, copy=True):
+        self.df = take_ownership(df, copy)
 
     def descriptive_statistics(self):
         """
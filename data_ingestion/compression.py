@@ -0,0 +1,233 @@
+import bz2
+import gzip
+import io
+import lzma
+import os
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+_MAGIC = (
+    (b'\x1f\x8b', 'gzip'),
+    (b'BZh', 'bz2'),
+    (b'\xfd7zXZ\x00', 'xz'),
+)
+_OPENERS = {'gzip': gzip.open, 'bz2': bz2.open, 'xz': lzma.open}
+# Compressed bytes of the first gzip member inspected to decide whether a file is split into many small members.
+_PROBE_BYTES = 4 * 1024 * 1024
+_READ_BYTES = 64 * 1024
+# gzip header: magic, deflate method, then a flags byte whose top three bits are reserved and always zero.
+_MEMBER_MAGIC = b'\x1f\x8b\x08'
+# Decompressed bytes a worker may hold for one range before the rest of the file is streamed sequentially instead.
+MAX_INFLATED_BYTES = 64 * 1024 * 1024
+
+
+def detect_compression(file_path):
+    """
+    Detect the compression of a file from its leading magic bytes.
+
+    Parameters:
+        file_path (str): The path to the file. Anything that is not an existing local file is reported as uncompressed.
+
+    Returns:
+        str or None: 'gzip', 'bz2' or 'xz', or None for uncompressed input.
+    """
+    if not isinstance(file_path, (str, os.PathLike)) or not os.path.isfile(file_path):
+        return None
+    with open(file_path, 'rb') as f:
+        head = f.read(6)
+    for magic, kind in _MAGIC:
+        if head.startswith(magic):
+            return kind
+    return None
+
+
+def open_decompressed(file_path, workers=None, range_size=8 * 1024 * 1024, max_inflated=MAX_INFLATED_BYTES):
+    """
+    Open a compressed file as a binary stream of its decompressed bytes, without writing a temporary file.
+
+    A gzip file made of many members (as written by bgzip, or by concatenating gzip files) is inflated in parallel:
+    each worker decompresses the members that start in its own byte range, and the pieces are streamed back in order
+    with a bounded read-ahead. Single-member gzip, bz2 and xz files are decompressed by a sequential stream. A range
+    that inflates to more than max_inflated bytes, such as one holding a large member after small ones (``cat
+    small.gz big.gz``), stops there, and the file is streamed sequentially from that member on, so the read-ahead
+    never holds more than two ranges of max_inflated bytes per worker.
+
+    Parameters:
+        file_path (str): The path to the compressed file.
+        workers (int): Number of decompression threads for multi-member gzip. Defaults to the number of CPUs; 1 turns
+            parallel decompression off.
+        range_size (int): Compressed bytes handed to a worker at a time.
+        max_inflated (int): Decompressed bytes a worker may hold for one range.
+
+    Returns:
+        A readable binary file object.
+    """
+    kind = detect_compression(file_path)
+    if kind is None:
+        return open(file_path, 'rb')
+    workers = workers or os.cpu_count()
+    if kind == 'gzip' and workers > 1 and _has_many_members(file_path):
+        return io.BufferedReader(ParallelGzipReader(file_path, workers, range_size, max_inflated),
+                                 buffer_size=1024 * 1024)
+    return _OPENERS[kind](file_path, 'rb')
+
+
+def _has_many_members(file_path):
+    inflater = zlib.decompressobj(zlib.MAX_WBITS | 16)
+    with open(file_path, 'rb') as f:
+        try:
+            while not inflater.eof and f.tell() < _PROBE_BYTES:
+                block = f.read(_READ_BYTES)
+                if not block:
+                    return False
+                inflater.decompress(block)
+        except zlib.error:
+            return False
+        return inflater.eof and bool(inflater.unused_data or f.read(1))
+
+
+def _inflate_member(f, start, limit):
+    """
+    Inflate the gzip member at byte `start`; return (data, end offset), or None if no valid member starts there. The
+    data is None, and the end offset too, when the member inflates to more than `limit` bytes.
+    """
+    f.seek(start)
+    inflater = zlib.decompressobj(zlib.MAX_WBITS | 16)
+    pieces = []
+    size = 0
+    consumed = 0
+    try:
+        while not inflater.eof:
+            block = inflater.unconsumed_tail
+            if not block:
+                block = f.read(_READ_BYTES)
+                if not block:
+                    return None
+                consumed += len(block)
+            # Inflating one byte past the limit tells an oversized member apart without holding more of it.
+            pieces.append(inflater.decompress(block, limit - size + 1))
+            size += len(pieces[-1])
+            if size > limit:
+                return None, None
+    except zlib.error:
+        return None
+    return b''.join(pieces), start + consumed - len(inflater.unused_data)
+
+
+def _inflate_range(file_path, start, end, limit):
+    """
+    Inflate the gzip members whose headers start in [start, end), up to `limit` decompressed bytes.
+
+    Members are found by trying each magic-byte candidate; zlib verifies the CRC-32 and length trailer, so a false
+    candidate inside compressed data cannot be mistaken for a member. Returns (first member start, offset after the last
+    member, data, complete), with None offsets when no member starts in the range. complete is False when the members
+    inflate to more than `limit` bytes: the data then stops at the offset of the first member that did not fit.
+    """
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        # Read one flags byte past the range so a header straddling its end is still seen.
+        window = f.read(end - start + len(_MEMBER_MAGIC))
+        pos = window.find(_MEMBER_MAGIC, 0, end - start + len(_MEMBER_MAGIC) - 1)
+        while pos != -1:
+            if len(window) <= pos + 3 or window[pos + 3] & 0xE0 == 0:
+                member = _inflate_member(f, start + pos, limit)
+                if member is not None:
+                    break
+            pos = window.find(_MEMBER_MAGIC, pos + 1, end - start + len(_MEMBER_MAGIC) - 1)
+        else:
+            return None, None, b'', True
+
+        first = offset = start + pos
+        pieces = []
+        size = 0
+        while member is not None:
+            if member[0] is None:
+                return first, offset, b''.join(pieces), False
+            pieces.append(member[0])
+            size += len(member[0])
+            offset = member[1]
+            if offset >= end:
+                break
+            member = _inflate_member(f, offset, limit - size)
+        return first, offset, b''.join(pieces), True
+
+
+class ParallelGzipReader(io.RawIOBase):
+    """
+    Raw binary stream over a multi-member gzip file, decompressed by a thread pool (zlib releases the GIL while
+    inflating). At most two ranges per worker, of at most max_inflated decompressed bytes each, are decompressed ahead
+    of the reader. From the first range that inflates to more, the rest of the file is read by a sequential stream.
+    """
+
+    def __init__(self, file_path, workers, range_size, max_inflated=MAX_INFLATED_BYTES):
+        super().__init__()
+        self.file_path = file_path
+        self.max_inflated = max_inflated
+        file_size = os.path.getsize(file_path)
+        self._ranges = deque((start, min(start + range_size, file_size))
+                             for start in range(0, file_size, range_size))
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._pending = deque()
+        self._read_ahead = 2 * workers
+        self._buffer = memoryview(b'')
+        self._expected = 0
+        self._sequential = None
+        self._fill()
+
+    def _fill(self):
+        while self._ranges and len(self._pending) < self._read_ahead:
+            start, end = self._ranges.popleft()
+            self._pending.append(self._executor.submit(_inflate_range, self.file_path, start, end,
+                                                       self.max_inflated))
+
+    def _next_piece(self):
+        if self._sequential is not None:
+            return self._sequential.read(_READ_BYTES) or None
+        while self._pending:
+            first, stop, data, complete = self._pending.popleft().result()
+            self._fill()
+            if first is None or complete and stop <= self._expected:
+                # No member starts in this range, or its members were already inflated by an earlier range.
+                continue
+            if first != self._expected:
+                raise IOError(f"Corrupt gzip stream in {self.file_path} near byte {self._expected}")
+            self._expected = stop
+            if not complete:
+                self._stream_rest()
+            return data
+        return None
+
+    def _stream_rest(self):
+        """Read the file from the member at self._expected on with a sequential stream instead of the workers."""
+        self._ranges.clear()
+        for future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        self._sequential_file = open(self.file_path, 'rb')
+        self._sequential_file.seek(self._expected)
+        self._sequential = gzip.GzipFile(fileobj=self._sequential_file)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not len(self._buffer):
+            data = self._next_piece()
+            if data is None:
+                return 0
+            self._buffer = memoryview(data)
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+    def close(self):
+        if not self.closed:
+            for future in self._pending:
+                future.cancel()
+            self._executor.shutdown(wait=True)
+            if self._sequential is not None:
+                self._sequential.close()
+                self._sequential_file.close()
+        super().close()
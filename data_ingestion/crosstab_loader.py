@@ -1,32 +1,132 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import openpyxl
 import pandas as pd
 from utils.logger import logger
-from data_storage.sqlite_handler import SQLiteHandler
+from data_storage.sqlite_handler import WORKER_DB_TIMEOUT, SQLiteHandler
 
 # Setting up logging
 logger.setLevel("INFO")
 
 
+def _sheet_names(file_path):
+    with pd.ExcelFile(file_path) as workbook:
+        return workbook.sheet_names
+
+
+def _iter_sheet_chunks(file_path, sheet_name, chunk_size):
+    """Yield a worksheet as DataFrame chunks using openpyxl's read-only row iterator."""
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet_name] if sheet_name else workbook.active
+        rows = worksheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = _header_columns(header)
+        width = len(columns)
+        buffer, blank_rows = [], 0
+        for row in rows:
+            if all(value is None for value in row):
+                # Blank rows are only kept when data follows them, matching pd.read_excel's trailing-row handling.
+                blank_rows += 1
+                continue
+            if blank_rows:
+                buffer.extend([(None,) * width] * blank_rows)
+                blank_rows = 0
+            if len(row) != width:
+                row = tuple(row[:width]) + (None,) * (width - len(row))
+            buffer.append(row)
+            if len(buffer) >= chunk_size:
+                yield pd.DataFrame.from_records(buffer, columns=columns)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame.from_records(buffer, columns=columns)
+    finally:
+        workbook.close()
+
+
+def _header_columns(header):
+    """
+    Column names for a header row as pd.read_excel gives them: blank cells become 'Unnamed: <position>', and a repeated
+    name becomes name.1, name.2, ..., skipping suffixed names that already appear in the header.
+    """
+    columns = [f"Unnamed: {idx}" if name is None else name for idx, name in enumerate(header)]
+    counts = {}
+    # Blank cells are renamed last, as pandas does.
+    for idx in sorted(range(len(columns)), key=lambda idx: header[idx] is None):
+        name = base = columns[idx]
+        count = counts.get(name, 0)
+        while count:
+            counts[base] = count + 1
+            name = f"{base}.{count}"
+            count = count + 1 if name in columns else counts.get(name, 0)
+        columns[idx] = name
+        counts[name] = count + 1
+    return columns
+
+
+def _stream_sheets_to_db(db_name, table_name, sources, chunk_size):
+    """
+    Stream (file_path, sheet_name) sources into one table in turn (runs in a worker process). Each sheet is parsed into
+    a staging file before the write lock is taken, so other workers keep writing while it is read.
+    """
+    handler = SQLiteHandler(db_name, timeout=WORKER_DB_TIMEOUT)
+    try:
+        return [handler.bulk_load(_iter_sheet_chunks(file_path, sheet_name, chunk_size), table_name, staged=True)
+                for file_path, sheet_name in sources]
+    finally:
+        handler.close_connection()
+
+
+def _read_sheet(file_path, sheet_name, kwargs):
+    return pd.read_excel(file_path, sheet_name=sheet_name, **kwargs)
+
+
 class CrosstabLoader:
     """
     The CrosstabLoader class provides a set of methods to load crosstabs from Excel files into pandas DataFrames and optionally save them to a SQLite database.
 
     Attributes:
         db_handler (SQLiteHandler instance): An instance of SQLiteHandler to interact with the SQLite database.
+        parse_cache (ParseCache instance or None): An optional cache of previously parsed workbooks.
 
     Main Methods:
-        - __init__: Initialize CrosstabLoader with an optional SQLite database name. Defaults to 'plato.db'.
+        - __init__: Initialize CrosstabLoader with an optional SQLite database name (defaults to 'plato.db') and an
+          optional ParseCache, which lets unchanged workbooks be reloaded without parsing them again.
         - load_crosstab: Load a crosstab from an Excel file into a DataFrame and optionally save it to the database.
         - load_multiple_crosstabs: Load crosstabs from multiple Excel files into DataFrames and optionally save them to the database.
         - load_crosstab_to_db: Load a crosstab directly to the database from an Excel file without returning a DataFrame.
+        - iter_sheet: Read a worksheet lazily as DataFrame chunks with openpyxl's read-only row iterator.
+        - stream_crosstab_to_db: Stream one or all worksheets into the database chunk by chunk.
+        - close: Release the database handler.
 
     Remarks:
         - The load_crosstab method returns a DataFrame if one sheet is loaded from the file or a dictionary of DataFrames if multiple sheets are loaded.
         - The load_multiple_crosstabs returns a list of DataFrames or dictionaries of DataFrames.
         - The **kwargs in load_crosstab, load_multiple_crosstabs, and load_crosstab_to_db can be used to pass any additional parameters to pd.read_excel.
+        - load_multiple_crosstabs(parallel=True) parses every sheet of every file in a process pool. With save_to_db the
+          workers stream their sheets into the database, one transaction per sheet, and only row counts are returned.
+          Sheets are parsed into a staging file first, so the database's write lock is only held to copy them in.
+        - The streaming reader supports .xlsx/.xlsm workbooks.
     """
 
-    def __init__(self, db_name='plato.db'):
+    def __init__(self, db_name='plato.db', parse_cache=None):
         self.db_handler = SQLiteHandler(db_name)
+        self.parse_cache = parse_cache
+
+    def close(self):
+        self.db_handler.close_connection()
+
+    def _read_excel(self, file_path, sheet_name, **kwargs):
+        if self.parse_cache is not None:
+            cached = self.parse_cache.get(file_path, 'excel', sheet_name=sheet_name, **kwargs)
+            if cached is not None:
+                return cached
+        data = pd.read_excel(file_path, sheet_name=sheet_name, **kwargs)
+        if self.parse_cache is not None:
+            self.parse_cache.put(file_path, data, 'excel', sheet_name=sheet_name, **kwargs)
+        return data
 
     def load_crosstab(self, file_path, sheet_name=None, table_name=None, save_to_db=False, **kwargs):
         """
@@ -43,7 +143,7 @@ class CrosstabLoader:
             pd.DataFrame or dict: The loaded DataFrame or a dictionary of DataFrames if multiple sheets are loaded.
         """
         if sheet_name:
-            df = pd.read_excel(file_path, sheet_name=sheet_name, **kwargs)
+            df = self._read_excel(file_path, sheet_name, **kwargs)
             logger.info(f"Crosstab loaded from {file_path} (sheet: {sheet_name})")
 
             if save_to_db:
@@ -54,7 +154,7 @@ class CrosstabLoader:
 
             return df
         else:
-            sheets = pd.read_excel(file_path, sheet_name=None, **kwargs)
+            sheets = self._read_excel(file_path, None, **kwargs)
             logger.info(f"All sheets loaded from {file_path}")
 
             if save_to_db:
@@ -65,7 +165,8 @@ class CrosstabLoader:
 
             return sheets
 
-    def load_multiple_crosstabs(self, file_paths, sheet_names=None, table_names=None, save_to_db=False, **kwargs):
+    def load_multiple_crosstabs(self, file_paths, sheet_names=None, table_names=None, save_to_db=False, parallel=False,
+                                max_workers=None, chunk_size=50000, **kwargs):
         """
         Load multiple crosstabs from Excel files into pandas DataFrames and optionally save them to the database.
 
@@ -74,11 +175,19 @@ class CrosstabLoader:
             sheet_names (list): List of sheet names to load. If None, loads all sheets.
             table_names (list): List of table names to save to. If None, uses sheet names or file names.
             save_to_db (bool): Whether to save the DataFrames to the database.
-            kwargs: Additional keyword arguments to pass to pd.read_excel.
+            parallel (bool): Whether to parse the sheets of all files concurrently in a process pool.
+            max_workers (int): Number of worker processes in parallel mode. Defaults to the number of CPUs.
+            chunk_size (int): Rows per chunk when parallel workers stream sheets into the database.
+            kwargs: Additional keyword arguments to pass to pd.read_excel. Not supported with parallel and save_to_db,
+                which use the streaming reader.
 
         Returns:
-            list: List of loaded DataFrames or dictionaries of DataFrames if multiple sheets are loaded.
+            list: List of loaded DataFrames or dictionaries of DataFrames if multiple sheets are loaded. In parallel mode
+                with save_to_db, the row counts written per sheet take the place of the DataFrames.
         """
+        if parallel:
+            return self._load_multiple_parallel(file_paths, sheet_names, table_names, save_to_db, max_workers,
+                                                chunk_size, kwargs)
         dataframes = []
         for idx, file_path in enumerate(file_paths):
             sheet_name = sheet_names[idx] if sheet_names else None
@@ -98,3 +207,85 @@ class CrosstabLoader:
             kwargs: Additional keyword arguments to pass to pd.read_excel.
         """
         self.load_crosstab(file_path, sheet_name, table_name, save_to_db=True, **kwargs)
+
+    def iter_sheet(self, file_path, sheet_name=None, chunk_size=50000):
+        """
+        Read a worksheet lazily as a sequence of DataFrame chunks.
+
+        The workbook is opened in openpyxl's read-only mode, so rows are streamed from the file and memory stays
+        bounded by the chunk size however large the sheet is. The first row is used as the header.
+
+        Parameters:
+            file_path (str): The path to the .xlsx/.xlsm file.
+            sheet_name (str or None): The sheet to read. If None, reads the active sheet.
+            chunk_size (int): Number of rows per chunk.
+
+        Yields:
+            pd.DataFrame: The next chunk of rows.
+        """
+        yield from _iter_sheet_chunks(file_path, sheet_name, chunk_size)
+        logger.info(f"Crosstab streamed from {file_path} (sheet: {sheet_name})")
+
+    def stream_crosstab_to_db(self, file_path, sheet_name=None, table_name=None, chunk_size=50000):
+        """
+        Stream a crosstab from an Excel file into the database without loading whole sheets into memory. Each sheet is
+        parsed into a staging file and then written in one transaction: an error raises and leaves none of that sheet's
+        rows in the table, and other writers to the database are not blocked while the sheet is read.
+
+        Parameters:
+            file_path (str): The path to the .xlsx/.xlsm file.
+            sheet_name (str or None): The sheet name to load. If None, loads all sheets.
+            table_name (str): The name of the table to save to. If None, uses the sheet name.
+            chunk_size (int): Number of rows per chunk.
+
+        Returns:
+            dict: The number of rows written per sheet.
+        """
+        counts = {}
+        for sheet in [sheet_name] if sheet_name else _sheet_names(file_path):
+            target = table_name or sheet
+            counts[sheet] = self.db_handler.bulk_load(self.iter_sheet(file_path, sheet, chunk_size), target,
+                                                      staged=True)
+            logger.info(f"DataFrame saved to table {target}")
+        return counts
+
+    def _load_multiple_parallel(self, file_paths, sheet_names, table_names, save_to_db, max_workers, chunk_size,
+                                kwargs):
+        if save_to_db and kwargs:
+            raise ValueError(f"pd.read_excel arguments are not supported when streaming to the database: {kwargs}")
+
+        tasks = []
+        for idx, file_path in enumerate(file_paths):
+            sheet_name = sheet_names[idx] if sheet_names else None
+            table_name = table_names[idx] if table_names else None
+            for sheet in [sheet_name] if sheet_name else _sheet_names(file_path):
+                tasks.append((idx, sheet, table_name or sheet))
+
+        results = [None if sheet_names and sheet_names[idx] else {} for idx in range(len(file_paths))]
+
+        def collect(idx, sheet, value):
+            if isinstance(results[idx], dict):
+                results[idx][sheet] = value
+            else:
+                results[idx] = value
+
+        with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+            if save_to_db:
+                # Sheets bound for the same table are written by a single worker so they never race to create it.
+                by_table = {}
+                for idx, sheet, table_name in tasks:
+                    by_table.setdefault(table_name, []).append((idx, sheet))
+                futures = {table_name: executor.submit(_stream_sheets_to_db, self.db_handler.db_name, table_name,
+                                                       [(file_paths[idx], sheet) for idx, sheet in sources], chunk_size)
+                           for table_name, sources in by_table.items()}
+                for table_name, future in futures.items():
+                    for (idx, sheet), rows in zip(by_table[table_name], future.result()):
+                        collect(idx, sheet, rows)
+                    logger.info(f"DataFrame saved to table {table_name}")
+            else:
+                futures = [(idx, sheet, executor.submit(_read_sheet, file_paths[idx], sheet, kwargs))
+                           for idx, sheet, _ in tasks]
+                for idx, sheet, future in futures:
+                    collect(idx, sheet, future.result())
+        logger.info(f"Crosstabs loaded in parallel from {len(file_paths)} files ({len(tasks)} sheets)")
+        return results
@@ -1,8 +1,64 @@
 import pandas as pd
 from data_storage.sqlite_handler import SQLiteHandler
+from data_ingestion.schema_inference import SchemaInferer
+from data_storage.column_store import ColumnStore
+from data_ingestion.ingest_scheduler import IngestScheduler
+from data_ingestion.compression import detect_compression, open_decompressed
 from utils.logger import log_info, log_warning, log_error
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import copy
+import gzip
+import hashlib
+import io
 import os
+import time
+
+# read_csv arguments that describe the layout of the whole file and cannot be applied to a byte range on its own.
+_RANGE_UNSAFE_KWARGS = ('header', 'names', 'skiprows', 'skipfooter', 'nrows', 'chunksize', 'iterator', 'index_col',
+                        'compression')
+# read_csv arguments needed to split the header line into column names.
+_HEADER_KWARGS = ('sep', 'delimiter', 'encoding', 'quotechar', 'escapechar', 'skipinitialspace', 'dialect')
+# Largest slice of new data parsed and committed at once by tail_csv.
+_TAIL_BLOCK_BYTES = 64 * 1024 * 1024
+# Data bytes after the header whose digest tail_csv checkpoints to recognize a file rewritten in place.
+_FINGERPRINT_BYTES = 4096
+
+
+def _data_fingerprint(f, start, offset):
+    """Digest the first ingested bytes of an open file, between start and offset, keeping its read position."""
+    position = f.tell()
+    f.seek(start)
+    digest = hashlib.sha256(f.read(min(_FINGERPRINT_BYTES, offset - start))).hexdigest()
+    f.seek(position)
+    return digest
+
+
+def _parse_byte_range(file_path, start, end, names, kwargs):
+    """Parse the complete lines between two byte offsets of a CSV file (runs in a worker process)."""
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return pd.read_csv(io.BytesIO(data), header=None, names=names, **kwargs)
+
+
+def _text_column_kwargs(kwargs, names, text_columns):
+    """
+    The read_csv arguments that parse text_columns as text: a dtype given for every column is spread over the columns
+    first, and the text columns are no longer parsed as dates.
+    """
+    dtype = kwargs.get('dtype')
+    if dtype is None:
+        dtype = {}
+    elif isinstance(dtype, dict):
+        # A copy keeps a defaultdict's default for the columns it does not name.
+        dtype = copy.copy(dtype)
+    else:
+        dtype = dict.fromkeys(names, dtype)
+    dtype.update(dict.fromkeys(text_columns, object))
+    text_kwargs = dict(kwargs, dtype=dtype)
+    if isinstance(kwargs.get('parse_dates'), list):
+        text_kwargs['parse_dates'] = [column for column in kwargs['parse_dates'] if column not in text_columns]
+    return text_kwargs
 
 
 class CSVLoader:
@@ -14,43 +70,382 @@ class CSVLoader:
 
     It provides the following methods:
 
-    - __init__(db_name='plato.db', chunk_size=50000): The constructor method for the CSVLoader class. It assigns specified
-                                                      database name, chunk size and thread pool executor.
+    - __init__(db_name='plato.db', chunk_size=50000, parse_cache=None, decompress_workers=None): The constructor method
+                                                      for the CSVLoader class. It assigns specified database name, chunk
+                                                      size and thread pool executor. An optional ParseCache lets load_csv
+                                                      reuse previously parsed frames of unchanged files.
+                                                      decompress_workers sets the threads used to inflate multi-member
+                                                      gzip input (defaults to the number of CPUs).
+
+    gzip, bz2 and xz input is detected from the file's magic bytes and decompressed as a stream straight into the parser,
+    without a temporary file.
 
-    - load_csv(file_path, table_name=None, save_to_db=False, **kwargs): This method is designed to load a CSV file into a
-                                                                        dataframe. It optionally saves the dataframe into
-                                                                        a SQLite database.
+    - load_csv(file_path, table_name=None, save_to_db=False, optimize_dtypes=False, sample_rows=10000, **kwargs): This
+                                                                        method is designed to load a CSV file into a
+                                                                        dataframe. It optionally streams the file into a
+                                                                        SQLite database instead. With optimize_dtypes=True
+                                                                        the dtypes are inferred from the first sample_rows
+                                                                        rows and narrowed (see SchemaInferer), and the
+                                                                        memory saving is kept in last_memory_report (None
+                                                                        after a load that made no report, e.g. one
+                                                                        served by the parse cache). When
+                                                                        saving to the database, the inferred dtypes and
+                                                                        date columns are applied to every chunk.
 
     - load_multiple_csvs(file_paths, table_names=None, save_to_db=False, **kwargs): This method utilizes multithreading to
                                                                                     load multiple CSV files concurrently.
                                                                                     Optionally, it saves each dataframe into
                                                                                     a different table in the SQLite database.
+                                                                                    With memory_budget set, the files are
+                                                                                    run by an IngestScheduler in worker
+                                                                                    processes, largest first, under that
+                                                                                    memory budget.
+
+    - iter_csv(file_path, chunk_size=None, **kwargs): This generator reads a CSV file lazily and yields it one
+                                                      dataframe chunk at a time.
+
+    - stream_csv_to_db(file_path, table_name=None, stages=None, chunk_size=None, **kwargs): This method streams a CSV
+                                                      file chunk by chunk through optional processing stages (e.g.
+                                                      DataCleaner.clean_chunks) and into the SQLite database, so only
+                                                      a few chunks are ever held in memory.
+
+    - load_csv_parallel(file_path, num_workers=None, min_range_size=16 MiB, **kwargs): This method splits a single large
+                                                      CSV file into newline-aligned byte ranges, parses them in a
+                                                      process pool and concatenates the parts in file order.
+
+    - csv_to_column_store(file_path, store_path, chunk_size=None, **kwargs): This method streams a CSV file chunk by
+                                                      chunk into a memory-mapped ColumnStore directory.
+
+    - tail_csv(file_path, table_name=None, follow=False, poll_interval=1.0, max_polls=None, on_replaced='raise',
+               **kwargs): This method ingests only the complete lines appended to a CSV file since the last run, using
+                                                      a byte-offset checkpoint stored in the database.
+
+    - close(): Releases the database handler and shuts the thread pool executor down.
     """
 
-    def __init__(self, db_name='plato.db', chunk_size=50000):
+    def __init__(self, db_name='plato.db', chunk_size=50000, parse_cache=None, decompress_workers=None):
         self.db_handler = SQLiteHandler(db_name)
         self.chunk_size = chunk_size
+        self.parse_cache = parse_cache
+        self.decompress_workers = decompress_workers or os.cpu_count()
         self.executor = ThreadPoolExecutor(max_workers=os.cpu_count())
+        self.last_memory_report = None
 
-    def load_csv(self, file_path, table_name=None, save_to_db=False, **kwargs):
+    def close(self):
+        self.db_handler.close_connection()
+        self.executor.shutdown()
+
+    def _open_source(self, file_path, kwargs):
+        """
+        Resolve what to hand pd.read_csv for a file: the path itself, or a decompressed stream for multi-member gzip.
+        Compression found from magic bytes is passed on explicitly, so files without a .gz/.bz2/.xz suffix work too.
+        """
+        kind = None if 'compression' in kwargs else detect_compression(file_path)
+        if kind is None:
+            return file_path, kwargs
+        if kind == 'gzip' and self.decompress_workers > 1:
+            stream = open_decompressed(file_path, workers=self.decompress_workers)
+            if not isinstance(stream, gzip.GzipFile):
+                return stream, dict(kwargs, compression=None)
+            stream.close()
+        return file_path, dict(kwargs, compression=kind)
+
+    def load_csv(self, file_path, table_name=None, save_to_db=False, optimize_dtypes=False, sample_rows=10000,
+                 **kwargs):
+        self.last_memory_report = None
         try:
             if save_to_db:
-                if not table_name:
-                    table_name = file_path.split('/')[-1].split('.')[0]
-                chunk_container = pd.read_csv(file_path, chunksize=self.chunk_size, **kwargs)
-                for chunk in chunk_container:
-                    self.db_handler.save_dataframe_to_db(chunk, table_name)
-                log_info(f"DataFrame saved to table {table_name}")
+                if optimize_dtypes:
+                    kind = None if 'compression' in kwargs else detect_compression(file_path)
+                    read_kwargs = dict(kwargs, compression=kind) if kind else kwargs
+                    dtype, parse_dates, _ = SchemaInferer(sample_rows=sample_rows).infer_csv(file_path, **read_kwargs)
+                    kwargs = dict(kwargs, dtype=dtype or None, parse_dates=parse_dates or None)
+                self.stream_csv_to_db(file_path, table_name, **kwargs)
             else:
-                df = pd.read_csv(file_path, **kwargs)
+                reader = f'csv:optimized:{sample_rows}' if optimize_dtypes else 'csv'
+                if self.parse_cache is not None:
+                    df = self.parse_cache.get(file_path, reader, **kwargs)
+                    if df is not None:
+                        return df
+                if optimize_dtypes:
+                    kind = None if 'compression' in kwargs else detect_compression(file_path)
+                    read_kwargs = dict(kwargs, compression=kind) if kind else kwargs
+                    df, self.last_memory_report = SchemaInferer(sample_rows=sample_rows).read_csv(file_path,
+                                                                                                  **read_kwargs)
+                else:
+                    source, read_kwargs = self._open_source(file_path, kwargs)
+                    try:
+                        df = pd.read_csv(source, **read_kwargs)
+                    finally:
+                        if source is not file_path:
+                            source.close()
                 log_info(f"CSV file loaded from {file_path}")
+                if self.parse_cache is not None:
+                    self.parse_cache.put(file_path, df, reader, **kwargs)
                 return df
         except Exception as e:
             log_error(f"Failed to load CSV file from {file_path}: {e}")
             raise
 
-    def load_multiple_csvs(self, file_paths, table_names=None, save_to_db=False, **kwargs):
+    def load_multiple_csvs(self, file_paths, table_names=None, save_to_db=False, memory_budget=None, **kwargs):
+        if memory_budget is not None:
+            scheduler = IngestScheduler(memory_budget=memory_budget, chunk_size=self.chunk_size)
+            if save_to_db:
+                scheduler.run(file_paths, db_name=self.db_handler.db_name, table_names=table_names, **kwargs)
+                return [None] * len(file_paths)
+            frames = {}
+            scheduler.run(file_paths, sink=frames.__setitem__, **kwargs)
+            return [frames[file_path] for file_path in file_paths]
         futures = [self.executor.submit(self.load_csv, file_path, table_names[idx] if table_names else None, save_to_db,
                                         **kwargs) for idx, file_path in enumerate(file_paths)]
         log_info("Loading the following CSV files: " + ', '.join(file_paths))
         return [future.result() for future in futures]
+
+    def iter_csv(self, file_path, chunk_size=None, **kwargs):
+        """
+        Read a CSV file lazily, one DataFrame chunk at a time.
+
+        Parameters:
+            file_path (str): The path to the CSV file.
+            chunk_size (int): Number of rows per chunk. Defaults to the loader's chunk_size.
+            kwargs: Additional keyword arguments to pass to pd.read_csv.
+
+        Yields:
+            pd.DataFrame: The next chunk of the file.
+        """
+        source, read_kwargs = self._open_source(file_path, kwargs)
+        try:
+            with pd.read_csv(source, chunksize=chunk_size or self.chunk_size, **read_kwargs) as reader:
+                for chunk in reader:
+                    yield chunk
+        except Exception as e:
+            log_error(f"Failed to read CSV file from {file_path}: {e}")
+            raise
+        finally:
+            if source is not file_path:
+                source.close()
+
+    def stream_csv_to_db(self, file_path, table_name=None, stages=None, chunk_size=None, **kwargs):
+        """
+        Stream a CSV file into the database chunk by chunk, passing the chunks through optional processing stages.
+
+        A stage is any callable that takes an iterable of DataFrame chunks and returns an iterable of chunks, for
+        example ``lambda chunks: DataCleaner.clean_chunks(chunks, [('drop_missing_values', {})])``. Stages are chained
+        lazily, so peak memory stays at a few chunks regardless of the size of the file. The chunks are written with
+        SQLiteHandler.bulk_load, in one transaction: a failure part way leaves the table as it was. They are staged in a
+        temporary file first, so the database's write lock is only held while they are copied in and other files can
+        be written meanwhile.
+
+        Parameters:
+            file_path (str): The path to the CSV file.
+            table_name (str): The name of the table to save to. If None, uses the file name.
+            stages (list): Callables applied in order to the stream of chunks.
+            chunk_size (int): Number of rows per chunk. Defaults to the loader's chunk_size.
+            kwargs: Additional keyword arguments to pass to pd.read_csv.
+
+        Returns:
+            int: The number of rows written to the database.
+        """
+        if not table_name:
+            table_name = file_path.split('/')[-1].split('.')[0]
+        chunks = self.iter_csv(file_path, chunk_size, **kwargs)
+        for stage in stages or []:
+            chunks = stage(chunks)
+        rows = self.db_handler.bulk_load(chunks, table_name, staged=True)
+        log_info(f"DataFrame saved to table {table_name}")
+        return rows
+
+    def load_csv_parallel(self, file_path, num_workers=None, min_range_size=16 * 1024 * 1024, **kwargs):
+        """
+        Load a single large CSV file using several processes.
+
+        The body of the file is split into byte ranges aligned on line boundaries, every range is parsed in its own
+        process with the column names taken from the header line, and the parts are concatenated in file order. When
+        the parts disagree on a column's dtype because some ranges hold text and others only numbers or dates, those
+        ranges are re-parsed as text so the column is consistently text, as with pd.read_csv(low_memory=False).
+
+        Ranges are split on raw newlines, so files with quoted fields that contain line breaks must be loaded with
+        load_csv instead.
+
+        Parameters:
+            file_path (str): The path to the CSV file.
+            num_workers (int): Number of worker processes. Defaults to the number of CPUs.
+            min_range_size (int): Smallest byte range handed to a worker. Files smaller than two ranges are parsed in
+                the calling process.
+            kwargs: Additional keyword arguments to pass to pd.read_csv for every range.
+
+        Returns:
+            pd.DataFrame: The loaded DataFrame.
+        """
+        unsupported = [key for key in _RANGE_UNSAFE_KWARGS if key in kwargs]
+        if unsupported:
+            raise ValueError(f"Arguments not supported for parallel parsing: {', '.join(unsupported)}")
+        if detect_compression(file_path):
+            # Byte ranges of compressed data cannot be parsed on their own; the stream is still inflated in parallel.
+            log_info(f"{file_path} is compressed; parsing it as a single decompressed stream")
+            return self.load_csv(file_path, **kwargs)
+
+        num_workers = num_workers or os.cpu_count()
+        file_size = os.path.getsize(file_path)
+        with open(file_path, 'rb') as f:
+            header_line = f.readline()
+            body_start = f.tell()
+            num_ranges = min(num_workers, (file_size - body_start) // max(min_range_size, 1))
+            if num_ranges < 2:
+                df = pd.read_csv(file_path, **kwargs)
+                log_info(f"CSV file loaded from {file_path}")
+                return df
+
+            boundaries = [body_start]
+            for i in range(1, num_ranges):
+                f.seek(body_start + i * (file_size - body_start) // num_ranges - 1)
+                f.readline()
+                if f.tell() > boundaries[-1]:
+                    boundaries.append(f.tell())
+            if boundaries[-1] < file_size:
+                boundaries.append(file_size)
+
+        header_kwargs = {key: kwargs[key] for key in _HEADER_KWARGS if key in kwargs}
+        names = list(pd.read_csv(io.BytesIO(header_line), nrows=0, **header_kwargs).columns)
+        ranges = list(zip(boundaries[:-1], boundaries[1:]))
+
+        try:
+            with ProcessPoolExecutor(max_workers=num_workers) as executor:
+                futures = [executor.submit(_parse_byte_range, file_path, start, end, names, kwargs)
+                           for start, end in ranges]
+                parts = [future.result() for future in futures]
+
+                text_columns = [column for column in parts[0].columns
+                                if len({part[column].dtype == object for part in parts}) > 1]
+                if text_columns:
+                    text_kwargs = _text_column_kwargs(kwargs, names, text_columns)
+                    refresh = {idx: executor.submit(_parse_byte_range, file_path, start, end, names, text_kwargs)
+                               for idx, (start, end) in enumerate(ranges)
+                               if any(parts[idx][column].dtype != object for column in text_columns)}
+                    for idx, future in refresh.items():
+                        parts[idx] = future.result()
+        except Exception as e:
+            log_error(f"Failed to load CSV file from {file_path}: {e}")
+            raise
+
+        df = pd.concat(parts, ignore_index=True)
+        log_info(f"CSV file loaded from {file_path} in {len(ranges)} parallel ranges")
+        return df
+
+    def csv_to_column_store(self, file_path, store_path, chunk_size=None, **kwargs):
+        """
+        Stream a CSV file into a memory-mapped column store.
+
+        Parameters:
+            file_path (str): The path to the CSV file.
+            store_path (str): The directory of the column store to write.
+            chunk_size (int): Number of rows per chunk. Defaults to the loader's chunk_size.
+            kwargs: Additional keyword arguments to pass to pd.read_csv. Passing an explicit dtype avoids columns
+                changing type between chunks.
+
+        Returns:
+            int: The number of rows written.
+        """
+        rows = ColumnStore(store_path).write(self.iter_csv(file_path, chunk_size, **kwargs))
+        log_info(f"CSV file {file_path} written to column store {store_path}")
+        return rows
+
+    def tail_csv(self, file_path, table_name=None, follow=False, poll_interval=1.0, max_polls=None,
+                 on_replaced='raise', **kwargs):
+        """
+        Incrementally ingest an append-only CSV file into the database.
+
+        The byte offset just past the last ingested line, a digest of the header line, the file's device and inode and
+        a digest of its first data bytes are checkpointed per file in the database, in the same transaction as the
+        rows. Each run parses only the complete lines written after the checkpoint; a trailing partial line is left for
+        the next run. If any of them no longer match, or the file shrank below the checkpoint, the file was replaced
+        (rotated, or truncated and rewritten) and on_replaced decides what happens to the rows ingested from it.
+
+        Parameters:
+            file_path (str): The path to the CSV file.
+            table_name (str): The name of the table to append to. If None, uses the file name.
+            follow (bool): Whether to keep polling the file for new lines. Stops on KeyboardInterrupt.
+            poll_interval (float): Seconds between polls in follow mode.
+            max_polls (int): Stop following after this many polls. If None, follows until interrupted.
+            on_replaced (str): 'raise' (default) to raise a ValueError for a replaced file, 'replace' to delete the
+                rows ingested from it and ingest it again from the start, or 'append' to keep those rows and ingest
+                the new file from the start after them (log rotation).
+            kwargs: Additional keyword arguments to pass to pd.read_csv for the new lines.
+
+        Returns:
+            int: The number of rows ingested.
+        """
+        if on_replaced not in ('raise', 'replace', 'append'):
+            raise ValueError(f"on_replaced must be 'raise', 'replace' or 'append', not {on_replaced!r}")
+        unsupported = [key for key in _RANGE_UNSAFE_KWARGS if key in kwargs]
+        if unsupported:
+            raise ValueError(f"Arguments not supported for incremental ingestion: {', '.join(unsupported)}")
+        if detect_compression(file_path):
+            raise ValueError(f"Incremental ingestion needs an uncompressed, append-only file: {file_path}")
+        if not table_name:
+            table_name = file_path.split('/')[-1].split('.')[0]
+
+        total = polls = 0
+        try:
+            while True:
+                total += self._ingest_new_lines(file_path, table_name, on_replaced, kwargs)
+                polls += 1
+                if not follow or (max_polls is not None and polls >= max_polls):
+                    break
+                time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            log_info(f"Stopped following {file_path}")
+        return total
+
+    def _ingest_new_lines(self, file_path, table_name, on_replaced, kwargs):
+        key = os.path.abspath(file_path)
+        rows = 0
+        with open(file_path, 'rb') as f:
+            header_line = f.readline()
+            if not header_line.endswith(b'\n'):
+                return 0
+            signature = hashlib.sha256(header_line).hexdigest()
+            stat = os.fstat(f.fileno())
+            file_size = stat.st_size
+            file_id = f"{stat.st_dev}:{stat.st_ino}"
+            data_start = len(header_line)
+
+            offset = data_start
+            checkpoint = self.db_handler.get_ingest_checkpoint(key)
+            if checkpoint is not None:
+                byte_offset, checkpoint_signature, checkpoint_file_id, data_signature = checkpoint
+                # Checkpoints recorded without a file identity or data digest are only checked on what they have.
+                if (checkpoint_signature == signature and byte_offset <= file_size
+                        and checkpoint_file_id in (None, file_id)
+                        and data_signature in (None, _data_fingerprint(f, data_start, byte_offset))):
+                    offset = byte_offset
+                elif on_replaced == 'raise':
+                    raise ValueError(f"{file_path} was replaced or truncated since it was last ingested; pass "
+                                     f"on_replaced='replace' to delete the rows ingested from it, or "
+                                     f"on_replaced='append' to keep them, and ingest it again from the start")
+                else:
+                    deleted = self.db_handler.reset_ingest_checkpoint(key, delete_rows=on_replaced == 'replace')
+                    log_warning(f"{file_path} was replaced or truncated; {deleted} rows ingested from it deleted, "
+                                f"ingesting it again from the start")
+
+            header_kwargs = {key: kwargs[key] for key in _HEADER_KWARGS if key in kwargs}
+            names = list(pd.read_csv(io.BytesIO(header_line), nrows=0, **header_kwargs).columns)
+
+            f.seek(offset)
+            while offset < file_size:
+                block = f.read(min(_TAIL_BLOCK_BYTES, file_size - offset))
+                end = block.rfind(b'\n')
+                if end < 0:
+                    if len(block) < _TAIL_BLOCK_BYTES:
+                        break
+                    raise ValueError(f"Line at byte {offset} of {file_path} is longer than {_TAIL_BLOCK_BYTES} bytes")
+                block = block[:end + 1]
+                df = pd.read_csv(io.BytesIO(block), header=None, names=names, **kwargs)
+                offset += len(block)
+                f.seek(offset)
+                self.db_handler.append_with_checkpoint(df, table_name, key, offset, signature, file_id,
+                                                       _data_fingerprint(f, data_start, offset))
+                rows += len(df)
+        if rows:
+            log_info(f"{rows} new rows from {file_path} saved to table {table_name}")
+        return rows
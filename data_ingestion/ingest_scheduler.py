@@ -0,0 +1,200 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+import pandas as pd
+from data_storage.sqlite_handler import WORKER_DB_TIMEOUT, SQLiteHandler
+from data_ingestion.compression import detect_compression, open_decompressed
+from utils.logger import log_info, log_error
+
+_SAMPLE_BYTES = 1024 * 1024
+# Typical text compression ratio of gzip/bz2/xz, used to size a compressed file's decompressed content.
+_ASSUMED_COMPRESSION_RATIO = 4
+
+
+def _ingest_to_db(file_path, db_name, table_name, chunk_size, kwargs):
+    """Stream one CSV file into a table (runs in a worker)."""
+    start = time.perf_counter()
+    handler = SQLiteHandler(db_name, timeout=WORKER_DB_TIMEOUT)
+    try:
+        # One transaction per file: a file that fails to load raises and leaves none of its rows behind. The file is
+        # parsed into a staging file first, so the write lock is not held while it is read.
+        with pd.read_csv(file_path, chunksize=chunk_size, **kwargs) as reader:
+            rows = handler.bulk_load(reader, table_name, staged=True)
+    finally:
+        handler.close_connection()
+    return rows, None, time.perf_counter() - start
+
+
+def _file_kwargs(file_path, kwargs):
+    """The read_csv arguments for one file, with its compression detected from its content unless given."""
+    kind = None if 'compression' in kwargs else detect_compression(file_path)
+    return kwargs if kind is None else dict(kwargs, compression=kind)
+
+
+def _ingest_to_frame(file_path, kwargs):
+    """Parse one CSV file into a DataFrame (runs in a worker)."""
+    start = time.perf_counter()
+    df = pd.read_csv(file_path, **kwargs)
+    return len(df), df, time.perf_counter() - start
+
+
+class IngestScheduler:
+    """
+    IngestScheduler Class - Main Object Definition
+
+    The IngestScheduler class ingests many CSV files concurrently while keeping the estimated memory of the files in
+    flight under a budget.
+
+    Every file gets a memory estimate from parsing a sample of its first bytes: the sample's DataFrame size per input
+    byte, times the file size (or times one chunk when streaming to the database). Compressed files are sampled after
+    decompression and their size is scaled by a typical compression ratio. Files are queued largest first so the
+    longest jobs start early and the run finishes sooner. A file is admitted when it fits in the remaining budget; when
+    the largest waiting file does not fit, smaller ones fill the gap, and a file larger than the whole budget runs alone.
+    Results are streamed to the destination as each file completes instead of being collected. Each file is loaded
+    into the database in one transaction, so a file that fails leaves none of its rows behind and fails the run; a
+    table that several files load into is created up front from the first of them. Workers parse and convert their
+    files concurrently into staging files and only hold the database's write lock while copying the rows in.
+
+    It provides the following methods:
+
+    - __init__(memory_budget=2 GiB, max_workers=None, use_processes=True, chunk_size=50000, progress_callback=None):
+                                                      The constructor method. Processes avoid serializing parsing on
+                                                      the GIL; progress_callback(progress, file_stats) is called after
+                                                      every completed file.
+
+    - estimate_memory(file_path, streaming=False, **kwargs): Returns the estimated peak memory in bytes of ingesting a
+                                                      file, either fully in memory or chunk by chunk.
+
+    - run(file_paths, db_name=None, table_names=None, sink=None, **kwargs): Ingests the files into db_name (workers
+                                                      stream each file into its table) or hands each parsed DataFrame to
+                                                      sink(file_path, df) in the calling process. Returns the per-file
+                                                      stats in completion order.
+
+    Attributes:
+
+    - progress: A dict with files_done, files_total, bytes_done and bytes_total for the current or last run.
+    - stats: The per-file stats of the last run: file_path, table_name, bytes, rows, seconds, mb_per_s and
+             estimated_memory.
+    """
+
+    def __init__(self, memory_budget=2 * 1024 ** 3, max_workers=None, use_processes=True, chunk_size=50000,
+                 progress_callback=None):
+        self.memory_budget = memory_budget
+        self.max_workers = max_workers or os.cpu_count()
+        self.use_processes = use_processes
+        self.chunk_size = chunk_size
+        self.progress_callback = progress_callback
+        self.progress = {}
+        self.stats = []
+
+    def estimate_memory(self, file_path, streaming=False, **kwargs):
+        file_size = os.path.getsize(file_path)
+        kind = detect_compression(file_path)
+        if kind is not None:
+            file_size *= _ASSUMED_COMPRESSION_RATIO
+            kwargs = dict(kwargs, compression=kwargs.get('compression', kind))
+        with open_decompressed(file_path, workers=1) as f:
+            sample = f.read(_SAMPLE_BYTES)
+        if len(sample) == _SAMPLE_BYTES:
+            sample = sample[:sample.rfind(b'\n') + 1] or sample
+        try:
+            sample_df = pd.read_csv(file_path, nrows=max(sample.count(b'\n') - 1, 1), **kwargs)
+            bytes_per_input_byte = sample_df.memory_usage(deep=True).sum() / max(len(sample), 1)
+            bytes_per_row = sample_df.memory_usage(deep=True).sum() / max(len(sample_df), 1)
+        except Exception:
+            # An unparsable sample is reported by the ingest itself; assume a typical text-to-frame expansion here.
+            bytes_per_input_byte, bytes_per_row = 3.0, None
+        estimate = int(file_size * bytes_per_input_byte)
+        if streaming and bytes_per_row is not None:
+            estimate = min(estimate, int(bytes_per_row * self.chunk_size))
+        return estimate
+
+    def run(self, file_paths, db_name=None, table_names=None, sink=None, **kwargs):
+        if (db_name is None) == (sink is None):
+            raise ValueError("Pass exactly one destination: db_name or sink")
+
+        jobs = []
+        for idx, file_path in enumerate(file_paths):
+            table_name = table_names[idx] if table_names else file_path.split('/')[-1].split('.')[0]
+            jobs.append({'file_path': file_path, 'table_name': table_name, 'bytes': os.path.getsize(file_path),
+                         'estimated_memory': self.estimate_memory(file_path, streaming=db_name is not None, **kwargs)})
+        pending = deque(sorted(jobs, key=lambda job: job['bytes'], reverse=True))
+        self.progress = {'files_done': 0, 'files_total': len(jobs), 'bytes_done': 0,
+                         'bytes_total': sum(job['bytes'] for job in jobs)}
+        self.stats = []
+        log_info(f"Scheduling {len(jobs)} files under a {self.memory_budget / 1e6:.0f} MB memory budget")
+        if db_name is not None:
+            self._create_shared_tables(pending, db_name, kwargs)
+
+        executor_class = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+        running = {}
+        in_flight = 0
+        with executor_class(max_workers=self.max_workers) as executor:
+            while pending or running:
+                while pending and len(running) < self.max_workers:
+                    job = next((job for job in pending if in_flight + job['estimated_memory'] <= self.memory_budget),
+                               None)
+                    if job is None:
+                        if running:
+                            break
+                        job = pending[0]
+                    pending.remove(job)
+                    if db_name is not None:
+                        future = executor.submit(_ingest_to_db, job['file_path'], db_name, job['table_name'],
+                                                 self.chunk_size, _file_kwargs(job['file_path'], kwargs))
+                    else:
+                        future = executor.submit(_ingest_to_frame, job['file_path'],
+                                                 _file_kwargs(job['file_path'], kwargs))
+                    running[future] = job
+                    in_flight += job['estimated_memory']
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = running.pop(future)
+                    in_flight -= job['estimated_memory']
+                    try:
+                        rows, df, seconds = future.result()
+                    except Exception as e:
+                        log_error(f"Failed to ingest {job['file_path']}: {e}")
+                        pending.clear()
+                        raise
+                    if sink is not None:
+                        sink(job['file_path'], df)
+                        del df
+                    self._record(job, rows, seconds)
+        log_info(f"Ingested {len(jobs)} files ({self.progress['bytes_done'] / 1e6:.1f} MB)")
+        return self.stats
+
+    def _create_shared_tables(self, jobs, db_name, kwargs):
+        """
+        Create each table that several files load into from the first chunk of its first file, so its column types do
+        not depend on which worker gets to it first.
+        """
+        first_jobs = {}
+        shared = set()
+        for job in jobs:
+            if job['table_name'] in first_jobs:
+                shared.add(job['table_name'])
+            first_jobs.setdefault(job['table_name'], job)
+        if not shared:
+            return
+        handler = SQLiteHandler(db_name, timeout=WORKER_DB_TIMEOUT)
+        try:
+            for table_name in shared:
+                file_path = first_jobs[table_name]['file_path']
+                head = pd.read_csv(file_path, nrows=self.chunk_size, **_file_kwargs(file_path, kwargs))
+                handler.bulk_load(head.head(0), table_name)
+        finally:
+            handler.close_connection()
+
+    def _record(self, job, rows, seconds):
+        file_stats = dict(job, rows=rows, seconds=seconds,
+                          mb_per_s=job['bytes'] / 1e6 / seconds if seconds else float('inf'))
+        self.stats.append(file_stats)
+        self.progress['files_done'] += 1
+        self.progress['bytes_done'] += job['bytes']
+        log_info(f"[{self.progress['files_done']}/{self.progress['files_total']}] {job['file_path']}: "
+                 f"{rows} rows in {seconds:.2f}s ({file_stats['mb_per_s']:.1f} MB/s)")
+        if self.progress_callback is not None:
+            self.progress_callback(dict(self.progress), file_stats)
@@ -0,0 +1,194 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from utils.logger import log_info, log_warning
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+class ParseCache:
+    """
+    ParseCache Class - Main Object Definition
+
+    The ParseCache class keeps parsed DataFrames on disk in a binary columnar format, so re-reading an unchanged CSV or
+    Excel file loads the cached columns instead of parsing the text again.
+
+    Entries are keyed by the absolute path, size and modification time of the source file, the reader used and the
+    reader's keyword arguments; touching or rewriting the file therefore misses the cache. Frames are stored as Feather
+    files when pyarrow is installed and as one .npy file per column otherwise. The cache directory is bounded by
+    max_bytes and evicts least recently used entries first. Sources that are not local files, such as buffers and URLs,
+    are read without the cache: get returns None and put stores nothing.
+
+    It provides the following methods:
+
+    - __init__(cache_dir='.plato_cache', max_bytes=2 GiB): The constructor method. Sets the cache directory and size bound.
+
+    - get(file_path, reader='csv', **kwargs): Returns the cached DataFrame (or dict of DataFrames) for a file read with
+                                              the given reader and arguments, or None on a miss.
+
+    - put(file_path, data, reader='csv', **kwargs): Stores a DataFrame or a dict of DataFrames for a file read with the
+                                                    given reader and arguments, then evicts old entries.
+
+    - size(): Returns the total size of the cache in bytes.
+
+    - clear(): Removes every entry from the cache.
+    """
+
+    def __init__(self, cache_dir='.plato_cache', max_bytes=2 * 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def get(self, file_path, reader='csv', **kwargs):
+        key = self._key(file_path, reader, kwargs)
+        if key is None:
+            return None
+        entry = os.path.join(self.cache_dir, key)
+        meta_path = os.path.join(entry, 'meta.json')
+        if not os.path.isfile(meta_path):
+            return None
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            frames = {frame['name']: self._read_frame(os.path.join(entry, frame['dir']), frame)
+                      for frame in meta['frames']}
+        except Exception as e:
+            log_warning(f"Discarding unreadable cache entry for {file_path}: {e}")
+            shutil.rmtree(entry, ignore_errors=True)
+            return None
+        os.utime(meta_path)
+        log_info(f"Parsed data for {file_path} loaded from cache")
+        return frames if meta['kind'] == 'sheets' else frames[None]
+
+    def put(self, file_path, data, reader='csv', **kwargs):
+        key = self._key(file_path, reader, kwargs)
+        if key is None:
+            return
+        frames = data if isinstance(data, dict) else {None: data}
+        if not all(self._cacheable(df) for df in frames.values()):
+            log_warning(f"Parsed data for {file_path} has non-scalar column labels and was not cached")
+            return
+        entry = os.path.join(self.cache_dir, key)
+        staging = tempfile.mkdtemp(prefix=f'.{key}.', dir=self.cache_dir)
+        try:
+            meta = {'kind': 'sheets' if isinstance(data, dict) else 'frame', 'source': os.path.abspath(file_path),
+                    'frames': []}
+            for idx, (name, df) in enumerate(frames.items()):
+                frame_dir = f'f{idx}'
+                os.mkdir(os.path.join(staging, frame_dir))
+                meta['frames'].append(dict(self._write_frame(os.path.join(staging, frame_dir), df),
+                                           name=name, dir=frame_dir))
+            with open(os.path.join(staging, 'meta.json'), 'w') as f:
+                json.dump(meta, f)
+            shutil.rmtree(entry, ignore_errors=True)
+            os.replace(staging, entry)
+        except Exception as e:
+            shutil.rmtree(staging, ignore_errors=True)
+            log_warning(f"Failed to cache parsed data for {file_path}: {e}")
+            return
+        self._evict(keep=key)
+
+    def size(self):
+        return sum(size for _, _, size in self._entries())
+
+    def clear(self):
+        for name, _, _ in self._entries():
+            shutil.rmtree(os.path.join(self.cache_dir, name), ignore_errors=True)
+
+    @staticmethod
+    def _key(file_path, reader, kwargs):
+        if not isinstance(file_path, (str, os.PathLike)) or not os.path.isfile(file_path):
+            # Buffers and URLs have no size and modification time to tell whether they changed.
+            return None
+        stat = os.stat(file_path)
+        fingerprint = [os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns, reader,
+                       repr(sorted(kwargs.items(), key=lambda item: item[0]))]
+        return hashlib.sha256(json.dumps(fingerprint).encode()).hexdigest()[:32]
+
+    @staticmethod
+    def _cacheable(df):
+        labels = list(df.columns) + list(df.index.names)
+        return all(label is None or isinstance(label, (str, int, float, bool)) for label in labels)
+
+    @staticmethod
+    def _write_frame(frame_dir, df):
+        index_names = list(df.index.names)
+        has_index = not isinstance(df.index, pd.RangeIndex) or df.index.start != 0 or df.index.step != 1
+        if has_index:
+            df = df.reset_index()
+        columns = list(df.columns)
+        # Positional names sidestep Feather's string-only column labels and duplicate labels.
+        df = df.set_axis([f'c{i}' for i in range(len(columns))], axis=1)
+        if HAS_PYARROW:
+            df.to_feather(os.path.join(frame_dir, 'data.feather'))
+            return {'format': 'feather', 'columns': columns, 'index': index_names if has_index else None}
+
+        dtypes = []
+        for i, (_, series) in enumerate(df.items()):
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                np.save(os.path.join(frame_dir, f'{i}.npy'), series.cat.codes.to_numpy())
+                np.save(os.path.join(frame_dir, f'{i}.categories.npy'), series.cat.categories.to_numpy(),
+                        allow_pickle=True)
+                dtypes.append({'dtype': 'category', 'ordered': bool(series.cat.ordered)})
+            else:
+                values = series.to_numpy(dtype=object) if pd.api.types.is_extension_array_dtype(series) \
+                    else series.to_numpy()
+                np.save(os.path.join(frame_dir, f'{i}.npy'), values, allow_pickle=True)
+                dtypes.append({'dtype': str(series.dtype)})
+        return {'format': 'npy', 'columns': columns, 'index': index_names if has_index else None, 'dtypes': dtypes}
+
+    @staticmethod
+    def _read_frame(frame_dir, frame):
+        if frame['format'] == 'feather':
+            df = pd.read_feather(os.path.join(frame_dir, 'data.feather'))
+            # Arrow hands back missing strings as None; the CSV and Excel readers use NaN.
+            for column in df.columns[(df.dtypes == object).to_numpy()]:
+                if df[column].isna().any():
+                    df[column] = df[column].fillna(np.nan)
+        else:
+            data = {}
+            for i, spec in enumerate(frame['dtypes']):
+                values = np.load(os.path.join(frame_dir, f'{i}.npy'), allow_pickle=True)
+                if spec['dtype'] == 'category':
+                    categories = np.load(os.path.join(frame_dir, f'{i}.categories.npy'), allow_pickle=True)
+                    data[f'c{i}'] = pd.Categorical.from_codes(values, categories=categories, ordered=spec['ordered'])
+                elif values.dtype == object and spec['dtype'] != 'object':
+                    data[f'c{i}'] = pd.Series(values).astype(spec['dtype'])
+                else:
+                    data[f'c{i}'] = values
+            df = pd.DataFrame(data)
+        if frame['index'] is not None:
+            df = df.set_index([f'c{i}' for i in range(len(frame['index']))])
+            df.index.names = frame['index']
+        df.columns = frame['columns'][len(frame['index'] or []):]
+        return df
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            entry = os.path.join(self.cache_dir, name)
+            meta_path = os.path.join(entry, 'meta.json')
+            if name.startswith('.') or not os.path.isfile(meta_path):
+                continue
+            size = sum(os.path.getsize(os.path.join(root, file))
+                       for root, _, files in os.walk(entry) for file in files)
+            entries.append((name, os.path.getmtime(meta_path), size))
+        return entries
+
+    def _evict(self, keep):
+        # Oldest first; the entry just written goes last and is only dropped if it alone exceeds the bound.
+        entries = sorted(self._entries(), key=lambda entry: (entry[0] == keep, entry[1]))
+        total = sum(size for _, _, size in entries)
+        for name, _, size in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(os.path.join(self.cache_dir, name), ignore_errors=True)
+            total -= size
@@ -0,0 +1,161 @@
+import warnings
+import pandas as pd
+from utils.logger import log_info
+
+# Date layouts recognized in text columns: ISO 8601 dates and times, and dates with slashes. Dotted values such as
+# version numbers are left alone even though pd.to_datetime accepts some of them.
+_DATE_PATTERN = (r'\d{4}-\d{1,2}-\d{1,2}(?:[T ]\d{1,2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?)?'
+                 r'|\d{4}/\d{1,2}/\d{1,2}(?: \d{1,2}:\d{2}(?::\d{2})?)?'
+                 r'|\d{1,2}/\d{1,2}/\d{2,4}(?: \d{1,2}:\d{2}(?::\d{2})?)?')
+
+
+class SchemaInferer:
+    """
+    SchemaInferer Class - Main Object Definition
+
+    The SchemaInferer class picks the narrowest practical dtypes for a dataset from a sample of its rows, so large files
+    can be read with compact types instead of pandas' default object/int64/float64 inference.
+
+    Inference rules:
+
+    - Text columns whose values look like dates (ISO 8601, or numbers separated by slashes) and parse as dates, for at
+      least date_threshold of the sampled values, are read with parse_dates. A column that turns out to hold other
+      values in the full data stays text.
+    - Text columns with few distinct values relative to the sample size are read as 'category'.
+    - Boolean columns that contain missing values are read as the nullable 'boolean' dtype.
+    - Integer and float columns are downcast after the read (int8/int16/int32, float32), since only the full column
+      tells whether its values fit in a narrower type. A float column is only narrowed when every value survives the
+      round trip through float32 exactly, so downcasting never loses precision.
+
+    It provides the following methods:
+
+    - __init__(sample_rows=10000, category_threshold=0.5, downcast_floats=True, date_threshold=0.95): The constructor
+                                                      method. Sets the number of rows sampled, the distinct/total ratio
+                                                      under which text becomes categorical, whether floats that are
+                                                      exact in float32 may be narrowed to it, and the share of sampled
+                                                      values that must be dates for a column to be parsed as dates.
+
+    - infer_from_frame(sample): Returns the (dtype, parse_dates) read_csv arguments inferred from a sample DataFrame.
+
+    - downcast(df): Narrows the integer and float columns of a DataFrame in place and returns it.
+
+    - optimize(df): Applies the inferred dtypes to an in-memory DataFrame (e.g. one loaded from Excel).
+
+    - infer_csv(file_path, **kwargs): Samples a CSV file and returns the (dtype, parse_dates) read_csv arguments for
+                                      it, merged with any given in kwargs, together with the sample.
+
+    - read_csv(file_path, **kwargs): Samples a CSV file, reads it with the inferred dtypes and returns the DataFrame
+                                     together with a memory report.
+    """
+
+    def __init__(self, sample_rows=10000, category_threshold=0.5, downcast_floats=True, date_threshold=0.95):
+        self.sample_rows = sample_rows
+        self.category_threshold = category_threshold
+        self.downcast_floats = downcast_floats
+        self.date_threshold = date_threshold
+
+    def infer_from_frame(self, sample):
+        dtype = {}
+        parse_dates = []
+        for column in sample.columns:
+            values = sample[column].dropna()
+            if sample[column].dtype != object or values.empty:
+                continue
+            if values.map(type).eq(bool).all():
+                dtype[column] = 'boolean'
+            elif self._looks_like_dates(values):
+                parse_dates.append(column)
+            elif values.nunique() <= self.category_threshold * len(values):
+                dtype[column] = 'category'
+        return dtype, parse_dates
+
+    def downcast(self, df):
+        for column in df.columns:
+            if pd.api.types.is_bool_dtype(df[column]):
+                continue
+            if pd.api.types.is_integer_dtype(df[column]):
+                df[column] = pd.to_numeric(df[column], downcast='integer')
+            elif self.downcast_floats and pd.api.types.is_float_dtype(df[column]):
+                narrowed = pd.to_numeric(df[column], downcast='float')
+                if narrowed.dtype != df[column].dtype and _round_trips(df[column], narrowed):
+                    df[column] = narrowed
+        return df
+
+    def optimize(self, df):
+        before = df.memory_usage(deep=True, index=False).sum()
+        dtype, parse_dates = self.infer_from_frame(df.head(self.sample_rows))
+        for column in parse_dates:
+            try:
+                df[column] = pd.to_datetime(df[column], format='mixed')
+            except (ValueError, TypeError, OverflowError):
+                # Values past the sample that are not dates keep the column as text, as read_csv's parse_dates does.
+                pass
+        if dtype:
+            df = df.astype(dtype)
+        df = self.downcast(df)
+        after = df.memory_usage(deep=True, index=False).sum()
+        log_info(f"Dtypes optimized: {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB")
+        return df
+
+    def infer_csv(self, file_path, **kwargs):
+        sample = pd.read_csv(file_path, nrows=self.sample_rows, **kwargs)
+        dtype, parse_dates = self.infer_from_frame(sample)
+
+        user_dtype = kwargs.get('dtype')
+        if isinstance(user_dtype, dict):
+            dtype.update(user_dtype)
+        elif user_dtype is not None:
+            dtype = user_dtype
+        user_parse_dates = kwargs.get('parse_dates')
+        if user_parse_dates is not None:
+            parse_dates = user_parse_dates
+        elif isinstance(dtype, dict):
+            parse_dates = [column for column in parse_dates if column not in dtype]
+        return dtype, parse_dates, sample
+
+    def read_csv(self, file_path, **kwargs):
+        """
+        Read a CSV file with dtypes inferred from a sample of its rows.
+
+        Parameters:
+            file_path (str): The path to the CSV file.
+            kwargs: Additional keyword arguments to pass to pd.read_csv. An explicit dtype or parse_dates argument
+                takes precedence over the inferred one for the columns it names.
+
+        Returns:
+            tuple: The loaded DataFrame and a dict with the row count, the estimated memory of a default read, the
+                memory of the optimized frame (both in bytes) and the ratio between them.
+        """
+        dtype, parse_dates, sample = self.infer_csv(file_path, **kwargs)
+        kwargs = {key: value for key, value in kwargs.items() if key not in ('dtype', 'parse_dates')}
+        df = pd.read_csv(file_path, dtype=dtype or None, parse_dates=parse_dates or None, **kwargs)
+        df = self.downcast(df)
+
+        sample_bytes = sample.memory_usage(deep=True, index=False).sum()
+        default_bytes = int(sample_bytes / len(sample) * len(df)) if len(sample) else 0
+        optimized_bytes = int(df.memory_usage(deep=True, index=False).sum())
+        report = {
+            'rows': len(df),
+            'estimated_default_bytes': default_bytes,
+            'optimized_bytes': optimized_bytes,
+            'reduction': default_bytes / optimized_bytes if optimized_bytes else 1.0,
+        }
+        log_info(f"Dtypes optimized for {file_path}: ~{default_bytes / 1e6:.1f} MB -> {optimized_bytes / 1e6:.1f} MB")
+        return df, report
+
+    def _looks_like_dates(self, values):
+        if pd.api.types.infer_dtype(values, skipna=True) != 'string':
+            return False
+        values = values.str.strip()
+        dates = values[values.str.fullmatch(_DATE_PATTERN)]
+        if len(dates) < self.date_threshold * len(values):
+            return False
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            parsed = pd.to_datetime(dates, format='mixed', errors='coerce')
+        return parsed.notna().sum() >= self.date_threshold * len(values)
+
+
+def _round_trips(column, narrowed):
+    """Whether a narrowed float column converts back to exactly the original values (NaN equal to NaN)."""
+    return bool(narrowed.astype(column.dtype).equals(column))
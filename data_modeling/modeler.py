@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 from utils.logger import logger
+from utils.ownership import take_ownership
 from sklearn.model_selection import train_test_split, GridSearchCV
 from sklearn.linear_model import LinearRegression, LogisticRegression
 from sklearn.tree import DecisionTreeClassifier, DecisionTreeRegressor
@@ -18,6 +19,10 @@ class Modeler:
     Attributes:
         df (pd.DataFrame): The DataFrame containing the data.
 
+    Parameters:
+        copy (bool): Train on a copy of the input DataFrame (default is True). With copy=False the models read the
+            caller's DataFrame, and changes the caller makes to it show up in the next split.
+
     Main Methods:
         - train_test_split: Split the data into training and testing sets.
         - linear_regression: Train and evaluate a linear regression model.
@@ -30,8 +35,8 @@ class Modeler:
     Remarks:
         - The decision tree and random forest methods support hyperparameter tuning with GridSearchCV.
     """
-    def __init__(self, df):
-        self.df = df.copy()
+    def __init__(self, df, copy=True):
+        self.df = take_ownership(df, copy)
 
     def train_test_split(self, target, features, test_size=0.2, random_state=42):
         """
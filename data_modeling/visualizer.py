@@ -5,6 +5,7 @@ import seaborn as sns
 import plotly.express as px
 import plotly.graph_objects as go
 from typing import List, Optional, Dict, Any
+from utils.ownership import take_ownership
 
 
 class Visualizer:
@@ -14,6 +15,10 @@ class Visualizer:
         Attributes:
             df (pd.DataFrame): The DataFrame containing the data.
 
+        Parameters:
+            copy (bool): Plot from a copy of the input DataFrame (default is True). The plots only read the data, so
+                copy=False saves copying a large frame.
+
         Main Methods:
             - plot_histogram: Plot a histogram of a specific column.
             - plot_scatter: Plot a scatter plot between two columns.
@@ -29,8 +34,8 @@ class Visualizer:
             - plot_3d_scatter: Plot a 3D scatter plot between three columns.
             - plot_facet_grid: Plot a facet grid of scatter plots.
       """
-    def __init__(self, df: pd.DataFrame):
-        self.df = df.copy()
+    def __init__(self, df: pd.DataFrame, copy: bool = True):
+        self.df = take_ownership(df, copy)
 
     def plot_histogram(self, column: str, bins: int = 10, color: str = 'blue', title: Optional[str] = None,
                        xlabel: Optional[str] = None, ylabel: Optional[str] = None, show: bool = True):
@@ -0,0 +1,140 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from utils.logger import logger
+
+
+class ColumnStore:
+    """
+    ColumnStore class is used to persist DataFrames as one memory-mapped numpy file per column plus a JSON schema.
+
+    Opening a store maps the column files into memory instead of decoding them, so it is instant regardless of the
+    number of rows, and processes that open the same store share the operating system's page cache rather than each
+    holding a private copy.
+
+    Storage layout (inside the store directory):
+    - schema.json: row count and, per column, its name, file, numpy dtype and kind.
+    - <n>.bin: the raw little-endian values of column n.
+    - <n>.categories.npy: the categories of a dictionary-encoded column.
+
+    Numeric, boolean and datetime columns are stored as their values. Every other column (text, categorical, nullable
+    extension types) is dictionary-encoded as int32 codes and comes back as a categorical. The index is not stored.
+
+    Methods:
+    - __init__(self, path):
+        Constructor method that initializes the ColumnStore object with the directory of the store.
+        :param path: The directory holding the column files.
+        :return: None
+
+    - write(self, data):
+        Writes a DataFrame, or an iterable of DataFrame chunks with the same columns, to the store.
+        :param data: A DataFrame or an iterable of DataFrames.
+        :return: The number of rows written.
+
+    - open(self, mmap_mode='r'):
+        Returns a DataFrame whose columns are backed by the memory-mapped column files.
+        :param mmap_mode: 'r' for read-only columns, 'c' for copy-on-write columns whose changes stay in memory.
+        :return: The memory-mapped pandas DataFrame.
+
+    - schema(self):
+        Returns the parsed schema.json of the store.
+    """
+    SCHEMA_FILE = 'schema.json'
+
+    def __init__(self, path):
+        self.path = path
+
+    def write(self, data):
+        chunks = [data] if isinstance(data, pd.DataFrame) else data
+        os.makedirs(self.path, exist_ok=True)
+        specs, files, encoders = None, [], []
+        rows = 0
+        try:
+            for chunk in chunks:
+                if specs is None:
+                    specs = [self._column_spec(idx, name, series) for idx, (name, series) in enumerate(chunk.items())]
+                    files = [open(os.path.join(self.path, spec['file']), 'wb') for spec in specs]
+                    encoders = [self._new_encoder(spec, series) for spec, (_, series) in zip(specs, chunk.items())]
+                if list(chunk.columns) != [spec['name'] for spec in specs]:
+                    raise ValueError("All chunks written to a column store must have the same columns")
+                for spec, f, encoder, (_, series) in zip(specs, files, encoders, chunk.items()):
+                    f.write(self._encode(spec, encoder, series).tobytes())
+                rows += len(chunk)
+        finally:
+            for f in files:
+                f.close()
+        if specs is None:
+            raise ValueError("No data to write to the column store")
+
+        for spec, encoder in zip(specs, encoders):
+            if encoder is not None:
+                categories = np.empty(len(encoder), dtype=object)
+                categories[:] = list(encoder)
+                np.save(os.path.join(self.path, spec['categories']), categories, allow_pickle=True)
+        with open(os.path.join(self.path, self.SCHEMA_FILE), 'w') as f:
+            json.dump({'rows': rows, 'columns': specs}, f, indent=2)
+        logger.info(f"{rows} rows written to column store {self.path}")
+        return rows
+
+    def open(self, mmap_mode='r'):
+        schema = self.schema()
+        rows = schema['rows']
+        data = {}
+        for spec in schema['columns']:
+            dtype = np.dtype(spec['dtype'])
+            path = os.path.join(self.path, spec['file'])
+            values = np.memmap(path, dtype=dtype, mode=mmap_mode, shape=(rows,)) if rows else np.empty(0, dtype)
+            if spec['kind'] == 'category':
+                categories = np.load(os.path.join(self.path, spec['categories']), allow_pickle=True)
+                cat_dtype = pd.CategoricalDtype(pd.Index(categories), ordered=spec.get('ordered', False))
+                values = pd.Categorical.from_codes(values, dtype=cat_dtype, validate=False)
+            elif spec.get('tz'):
+                values = pd.arrays.DatetimeArray(values, dtype=pd.DatetimeTZDtype(tz=spec['tz']), copy=False)
+            data[spec['name']] = values
+        logger.info(f"Column store {self.path} opened ({rows} rows)")
+        return pd.DataFrame(data, copy=False)
+
+    def schema(self):
+        with open(os.path.join(self.path, self.SCHEMA_FILE)) as f:
+            return json.load(f)
+
+    @staticmethod
+    def _column_spec(idx, name, series):
+        spec = {'name': name, 'file': f'{idx}.bin'}
+        dtype = series.dtype
+        if isinstance(dtype, pd.DatetimeTZDtype):
+            spec.update(kind='values', dtype='<M8[ns]', tz=str(dtype.tz))
+        elif isinstance(dtype, np.dtype) and dtype.kind in 'biufcmM':
+            spec.update(kind='values', dtype=dtype.newbyteorder('<').str)
+        else:
+            spec.update(kind='category', dtype='<i4', categories=f'{idx}.categories.npy',
+                        ordered=bool(isinstance(dtype, pd.CategoricalDtype) and dtype.ordered))
+        return spec
+
+    @staticmethod
+    def _new_encoder(spec, series):
+        if spec['kind'] != 'category':
+            return None
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # Keep the declared category order so ordered categoricals compare the same way after a round trip.
+            return {value: code for code, value in enumerate(series.cat.categories)}
+        return {}
+
+    @staticmethod
+    def _encode(spec, encoder, series):
+        if spec['kind'] == 'category':
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                codes, uniques = series.cat.codes.to_numpy(), series.cat.categories
+            else:
+                codes, uniques = pd.factorize(series)
+            lookup = np.array([encoder.setdefault(value, len(encoder)) for value in uniques] + [-1], dtype='<i4')
+            return lookup[codes]
+        if spec.get('tz'):
+            return series.dt.tz_convert('UTC').dt.tz_localize(None).to_numpy().astype('<M8[ns]', copy=False)
+        values = series.to_numpy()
+        dtype = np.dtype(spec['dtype'])
+        if values.dtype != dtype and not np.can_cast(values.dtype, dtype, casting='safe'):
+            raise ValueError(f"Column {spec['name']!r} changed dtype from {dtype} to {values.dtype} between chunks; "
+                             f"pass an explicit dtype to the reader")
+        return values.astype(dtype, copy=False)
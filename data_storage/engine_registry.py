@@ -0,0 +1,94 @@
+import os
+import threading
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool, StaticPool
+from utils.logger import logger
+
+# Connections kept open per file database; extra threads borrow overflow connections that close when returned.
+POOL_SIZE = min(32, (os.cpu_count() or 1) + 4)
+MAX_OVERFLOW = 2 * POOL_SIZE
+# Prepared statements each connection keeps, least recently used first out, keyed by SQL text.
+STATEMENT_CACHE_SIZE = 512
+
+_engines = {}
+# Handlers holding each registered engine; the engine is disposed when the last one releases it.
+_references = {}
+_lock = threading.Lock()
+_pid = os.getpid()
+
+
+def get_engine(db_name='plato.db', timeout=5):
+    """
+    Return the process-wide SQLAlchemy engine for a SQLite database, creating it on first use.
+
+    Handlers of the same database share one engine, so they reuse its pooled connections and their warm page caches
+    instead of opening the file again. Every call takes a reference to the engine that is given back with
+    release_engine, and the engine is only disposed once every reference is given back. Every connection caches up to
+    STATEMENT_CACHE_SIZE prepared statements, so a query shape run with bound parameters is parsed and planned once per
+    connection.
+
+    File databases use a QueuePool: each thread checks out its own connection. Opening a database does not change its
+    journal mode; SQLiteHandler switches a file to WAL when it first writes to it, after which readers run in parallel
+    with each other and with a writer. A database that is only read keeps its mode and gets no -wal or -shm files next
+    to it. An in-memory database lives in a single connection, so it uses a StaticPool shared by all threads; it is not
+    shared between calls, so every ':memory:' engine is a separate database.
+
+    Parameters:
+        db_name (str): The path of the database file, or ':memory:'.
+        timeout (float): Seconds a connection waits for another connection's write lock before failing.
+
+    Returns:
+        sqlalchemy.engine.Engine: The shared engine.
+    """
+    global _pid
+    if db_name == ':memory:':
+        return _create_engine(db_name, timeout)
+    key = (database_key(db_name), timeout)
+    with _lock:
+        if os.getpid() != _pid:
+            # Pooled connections must not cross a fork; the child starts with fresh engines.
+            for engine in _engines.values():
+                engine.dispose(close=False)
+            _engines.clear()
+            _references.clear()
+            _pid = os.getpid()
+        engine = _engines.get(key)
+        if engine is None:
+            engine = _engines[key] = _create_engine(db_name, timeout)
+            logger.info(f"Database engine created for {db_name}")
+        _references[key] = _references.get(key, 0) + 1
+        return engine
+
+
+def release_engine(engine):
+    """
+    Give back a reference to an engine taken with get_engine. The last reference closes the engine's pooled
+    connections and drops it from the registry; an in-memory engine is closed, and its database dropped, right away.
+
+    Parameters:
+        engine (sqlalchemy.engine.Engine): The engine returned by get_engine.
+
+    Returns:
+        None
+    """
+    with _lock:
+        key = next((key for key, registered in _engines.items() if registered is engine), None)
+        if key is not None:
+            _references[key] -= 1
+            if _references[key]:
+                return
+            del _engines[key], _references[key]
+    engine.dispose()
+
+
+def database_key(db_name):
+    """Return the name under which a database is registered: its absolute path, or ':memory:'."""
+    return db_name if db_name == ':memory:' else os.path.abspath(db_name)
+
+
+def _create_engine(db_name, timeout):
+    connect_args = {'check_same_thread': False, 'timeout': timeout, 'cached_statements': STATEMENT_CACHE_SIZE}
+    if db_name == ':memory:':
+        return create_engine(f'sqlite:///{db_name}', connect_args=connect_args, poolclass=StaticPool)
+    return create_engine(f'sqlite:///{db_name}', connect_args=connect_args, poolclass=QueuePool,
+                         pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW)
@@ -0,0 +1,256 @@
+import re
+import statistics
+import threading
+import time
+from collections import Counter
+from data_storage.engine_registry import database_key
+from data_storage.sql_utils import normalize_sql, quote_identifier, unquote_identifier
+from data_storage.sqlite_handler import SQLiteHandler
+from utils.logger import logger
+
+# The clause layout produced by QueryBuilder; other statements (joins, subqueries in FROM, writes) are not recorded.
+_SHAPE = re.compile(r'^SELECT (?P<select>.+?) FROM (?P<table>"(?:[^"]|"")+"|[\w.]+)'
+                    r'(?: WHERE (?P<where>.+?))?(?: GROUP BY (?P<group>.+?))?(?: HAVING .+?)?'
+                    r'(?: ORDER BY (?P<order>.+?))?(?: LIMIT .+)?$', re.IGNORECASE | re.DOTALL)
+_COMPARISON = re.compile(r'("(?:[^"]|"")+"|\b[A-Za-z_]\w*\b)\s*(==|=|\bIN\b|\bIS\b|<=|>=|<|>|\bBETWEEN\b|\bLIKE\b)',
+                         re.IGNORECASE)
+_EQUALITY = {'=', '==', 'IN', 'IS'}
+# Columns beyond this are not added to make an index covering.
+MAX_INDEX_COLUMNS = 6
+
+
+class IndexAdvisor:
+    """
+    IndexAdvisor Class - Main Object Definition
+
+    The IndexAdvisor class watches the queries run on a database through SQLiteHandler, finds the query shapes that
+    SQLite answers with a full table scan or a temporary sort, and proposes indexes for them.
+
+    For every recorded query it counts, per table, the columns compared in WHERE (split into equality and range
+    comparisons), the GROUP BY columns and the ORDER BY columns. A query shape is flagged when EXPLAIN QUERY PLAN shows
+    a SCAN of its table or a temporary B-tree for grouping or ordering. The index proposed for it lists the equality
+    columns, then the grouping or ordering columns, then one range column; when the query selects a short list of
+    plain columns they are appended so the index covers the query and the table is not read at all.
+
+    It provides the following methods:
+
+    - __init__(db_name='plato.db', max_shapes=1000): The constructor method. Starts recording the queries run on the
+                                                      database by any SQLiteHandler in the process. Raises ValueError
+                                                      for ':memory:': every in-memory handler has a database of its
+                                                      own, so the advisor could not see the tables the queries use.
+
+    - record(db, query, params): Records one query; called by SQLiteHandler as a query listener.
+
+    - column_usage(table_name): Returns Counters of the where_equality, where_range, group_by and order_by columns
+                                recorded for a table.
+
+    - full_scans(): Returns the recorded query shapes whose plan scans a table or sorts in a temporary B-tree, with the
+                    plan details.
+
+    - recommend(): Returns the proposed indexes as dicts with table, columns, sql, queries (recorded executions of the
+                   shapes it serves) and reason.
+
+    - apply(recommendations=None, repeat=3): Creates the recommended indexes (all of recommend() by default), runs
+                                             ANALYZE, and returns a report with the median time of the affected query
+                                             shapes before and after.
+
+    - close(): Stops recording and releases the database handler.
+    """
+
+    def __init__(self, db_name='plato.db', max_shapes=1000):
+        if db_name == ':memory:':
+            raise ValueError("IndexAdvisor needs a database file; an in-memory database is private to its handler")
+        self.handler = SQLiteHandler(db_name)
+        self.db = database_key(db_name)
+        self.max_shapes = max_shapes
+        self.shapes = {}
+        self._usage = {}
+        self._columns = {}
+        self._lock = threading.Lock()
+        SQLiteHandler.add_query_listener(self.record)
+
+    def record(self, db, query, params):
+        if db != self.db:
+            return
+        sql = normalize_sql(query)
+        match = _SHAPE.match(sql)
+        if match is None:
+            return
+        table = unquote_identifier(match.group('table'))
+        columns = self._table_columns(table)
+        if not columns:
+            return
+        with self._lock:
+            shape = self.shapes.get(sql)
+            if shape is None:
+                if len(self.shapes) >= self.max_shapes:
+                    return
+                shape = self.shapes[sql] = {'table': table, 'count': 0, 'params': params,
+                                            **_clause_columns(match, columns)}
+                usage = self._usage.setdefault(table, {key: Counter() for key in
+                                                       ('where_equality', 'where_range', 'group_by', 'order_by')})
+                for key in usage:
+                    usage[key].update(shape[key])
+            shape['count'] += 1
+            shape['params'] = params
+
+    def column_usage(self, table_name):
+        with self._lock:
+            return {key: Counter(counter) for key, counter in self._usage.get(table_name, {}).items()}
+
+    def full_scans(self):
+        scans = []
+        for sql, shape in list(self.shapes.items()):
+            plan = self._plan(sql, shape['params'])
+            if plan is None:
+                continue
+            pattern = re.compile(rf'^SCAN (TABLE )?"?{re.escape(shape["table"])}"?( AS \w+)?$', re.IGNORECASE)
+            scanned = any(pattern.match(detail) for detail in plan)
+            sorted_in_temp = any(detail.startswith('USE TEMP B-TREE') for detail in plan)
+            if scanned or sorted_in_temp:
+                scans.append({'sql': sql, 'table': shape['table'], 'count': shape['count'], 'plan': plan,
+                              'full_scan': scanned, 'temp_sort': sorted_in_temp})
+        return scans
+
+    def recommend(self):
+        proposals = {}
+        for scan in self.full_scans():
+            shape = self.shapes[scan['sql']]
+            columns = _index_columns(shape)
+            if not columns or self._has_index(shape['table'], columns):
+                continue
+            key = (shape['table'], tuple(columns))
+            proposal = proposals.setdefault(key, {
+                'table': shape['table'], 'columns': columns, 'queries': 0, 'shapes': [],
+                'reason': 'full scan' if scan['full_scan'] else 'temporary sort',
+                'sql': f"CREATE INDEX IF NOT EXISTS {quote_identifier(_index_name(shape['table'], columns))} "
+                       f"ON {quote_identifier(shape['table'])} "
+                       f"({', '.join(quote_identifier(column) for column in columns)})"})
+            proposal['queries'] += shape['count']
+            proposal['shapes'].append(scan['sql'])
+        # A proposal whose columns start a longer proposal's columns is served by that longer index.
+        recommendations = []
+        for proposal in sorted(proposals.values(), key=lambda proposal: len(proposal['columns']), reverse=True):
+            longer = next((kept for kept in recommendations if kept['table'] == proposal['table']
+                           and kept['columns'][:len(proposal['columns'])] == proposal['columns']), None)
+            if longer is None:
+                recommendations.append(proposal)
+            else:
+                longer['queries'] += proposal['queries']
+                longer['shapes'] += proposal['shapes']
+        return sorted(recommendations, key=lambda proposal: proposal['queries'], reverse=True)
+
+    def apply(self, recommendations=None, repeat=3):
+        recommendations = self.recommend() if recommendations is None else recommendations
+        report = []
+        for proposal in recommendations:
+            shapes = proposal.get('shapes') or [sql for sql, shape in self.shapes.items()
+                                                if shape['table'] == proposal['table']]
+            before = sum(self._time(sql, repeat) for sql in shapes)
+            self._execute(proposal['sql'])
+            self._execute(f"ANALYZE {quote_identifier(proposal['table'])}")
+            after = sum(self._time(sql, repeat) for sql in shapes)
+            entry = dict(proposal, before_s=before, after_s=after, speedup=before / after if after else float('inf'))
+            report.append(entry)
+            logger.info(f"Index on {proposal['table']}({', '.join(proposal['columns'])}): "
+                        f"{before * 1e3:.2f} ms -> {after * 1e3:.2f} ms for {len(shapes)} query shapes")
+        return report
+
+    def close(self):
+        SQLiteHandler.remove_query_listener(self.record)
+        self.handler.close_connection()
+
+    def _table_columns(self, table):
+        if table not in self._columns:
+            rows = self._execute(f"PRAGMA table_info({quote_identifier(table)})")
+            if not rows:
+                # Not a table (yet); looked up again next time.
+                return {}
+            self._columns[table] = {row[1].lower(): row[1] for row in rows}
+        return self._columns[table]
+
+    def _has_index(self, table, columns):
+        for index in self._execute(f"PRAGMA index_list({quote_identifier(table)})"):
+            indexed = [row[2] for row in self._execute(f"PRAGMA index_info({quote_identifier(index[1])})")]
+            if indexed[:len(columns)] == columns:
+                return True
+        return False
+
+    def _plan(self, sql, params):
+        try:
+            return [row[-1] for row in self._execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+        except Exception as e:
+            logger.warning(f"Could not explain query {sql}: {e}")
+            return None
+
+    def _time(self, sql, repeat):
+        params = self.shapes[sql]['params']
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            self._execute(sql, params)
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings)
+
+    def _execute(self, sql, params=None):
+        # A raw cursor: the advisor's own statements are neither recorded nor slowed down by SQLAlchemy.
+        raw = self.handler.engine.raw_connection()
+        try:
+            rows = raw.cursor().execute(sql, params or ()).fetchall()
+            raw.commit()
+            return rows
+        finally:
+            raw.close()
+
+
+def _clause_columns(match, columns):
+    """Split the columns used by the clauses of a query into equality and range comparisons, groupings and orderings."""
+    equality, ranges = [], []
+    for name, operator in _COMPARISON.findall(match.group('where') or ''):
+        column = columns.get(unquote_identifier(name).lower())
+        if column is None:
+            continue
+        target = equality if operator.upper() in _EQUALITY else ranges
+        if column not in equality and column not in ranges:
+            target.append(column)
+    return {
+        'where_equality': equality,
+        'where_range': ranges,
+        'group_by': _column_list(match.group('group'), columns),
+        'order_by': _column_list(match.group('order'), columns),
+        'select': _column_list(match.group('select'), columns, strict=True),
+    }
+
+
+def _column_list(text, columns, strict=False):
+    """Columns of a comma separated clause; with strict, None unless every item is a plain column."""
+    result = []
+    for item in (text or '').split(','):
+        words = item.split()
+        if words and len(words) > 1 and words[-1].upper() in ('ASC', 'DESC'):
+            words = words[:-1]
+        column = columns.get(unquote_identifier(' '.join(words)).lower()) if words else None
+        if column is None:
+            if strict:
+                return None
+            continue
+        if column not in result:
+            result.append(column)
+    return result
+
+
+def _index_columns(shape):
+    columns = list(shape['where_equality'])
+    for column in shape['group_by'] or shape['order_by']:
+        if column not in columns:
+            columns.append(column)
+    for column in shape['where_range'][:1]:
+        if column not in columns:
+            columns.append(column)
+    if columns and shape['select'] and len(set(columns) | set(shape['select'])) <= MAX_INDEX_COLUMNS:
+        columns += [column for column in shape['select'] if column not in columns]
+    return columns
+
+
+def _index_name(table, columns):
+    return f"ix_{table}_{'_'.join(columns)}"
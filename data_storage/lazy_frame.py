@@ -0,0 +1,195 @@
+import pandas as pd
+from data_storage.query_builder import QueryBuilder
+from data_storage.sql_utils import quote_identifier
+from utils.logger import logger
+
+# Declared column types that load_table_to_dataframe returns as datetimes and booleans.
+_DATETIME_TYPES = ('DATETIME', 'TIMESTAMP', 'DATE')
+_BOOLEAN_TYPES = ('BOOLEAN',)
+# Typed tables store datetimes as nanoseconds; NULL is read as NaT's int64 value so the column stays integer.
+_NAT_SQL = -9223372036854775808
+_NANOSECOND_DTYPES = ('datetime64[ns]', 'timedelta64[ns]')
+
+
+class LazyFrame:
+    """
+    LazyFrame class describes a query on a SQLite table without running it.
+
+    Column selections, row filters, orderings and limits are recorded and compiled with QueryBuilder into a single SQL
+    statement, so SQLite reads only the selected columns and returns only the matching rows. Nothing is read until
+    collect(), iter_batches(), count() or head() is called. Every method returns a new LazyFrame and leaves the original
+    unchanged, so a base frame can be refined in several directions.
+
+    Filters are SQL conditions with ? placeholders, combined with AND:
+        handler.lazy_table('sales').select('region', 'amount').filter('amount > ?', 100).collect()
+
+    Methods:
+    - select(self, *columns): Keeps only the given columns, in that order.
+    - filter(self, condition, *params): Keeps the rows matching a SQL condition.
+    - order_by(self, columns, order='ASC'): Sorts the rows.
+    - limit(self, count): Keeps at most count rows. Filters and orderings must come before the limit.
+    - to_sql(self): Returns the compiled (query, params) tuple.
+    - collect(self): Runs the query and returns a DataFrame. DATETIME and BOOLEAN columns get the dtypes
+      load_table_to_dataframe gives them; the columns of a typed table get the dtypes recorded in its catalog.
+    - iter_batches(self, chunksize=50000): Runs the query and yields DataFrames of at most chunksize rows.
+    - count(self): Returns the number of matching rows without reading them. Raises a ValueError if the query fails,
+        e.g. on a filter naming a column the table does not have.
+    - head(self, n=5): Returns the first n rows as a DataFrame.
+
+    Attributes:
+    - columns: The names of the columns the frame will return.
+    """
+
+    def __init__(self, handler, table_name, columns=None, filters=(), order=None, limit_count=None):
+        self.handler = handler
+        self.table_name = table_name
+        self._schema = None
+        self._dtypes = None
+        self._columns = list(columns) if columns is not None else None
+        self._filters = tuple(filters)
+        self._order = order
+        self._limit = limit_count
+
+    @property
+    def columns(self):
+        return list(self._columns) if self._columns is not None else list(self._table_schema())
+
+    def select(self, *columns):
+        if len(columns) == 1 and isinstance(columns[0], (list, tuple)):
+            columns = columns[0]
+        unknown = [column for column in columns if column not in self._table_schema()]
+        if unknown:
+            raise ValueError(f"Columns not in table {self.table_name}: {', '.join(map(str, unknown))}")
+        return self._derive(columns=list(columns))
+
+    def filter(self, condition, *params):
+        self._check_before_limit('filter')
+        return self._derive(filters=self._filters + ((condition, params),))
+
+    def order_by(self, columns, order='ASC'):
+        self._check_before_limit('order_by')
+        return self._derive(order=(columns, order))
+
+    def limit(self, count):
+        count = int(count) if self._limit is None else min(int(count), self._limit)
+        return self._derive(limit_count=count)
+
+    def to_sql(self):
+        dtypes = self._table_dtypes()
+        if not self._columns and not dtypes:
+            return self._build('*')
+        return self._build(', '.join(_select_expression(column, dtypes.get(column)) for column in self.columns))
+
+    def collect(self):
+        query, params = self.to_sql()
+        df = pd.concat(self.handler.iter_query(query, params=params), ignore_index=True)
+        logger.info(f"Lazy frame on {self.table_name} collected: {len(df)} rows x {len(df.columns)} columns")
+        return self._restore_types(df)
+
+    def iter_batches(self, chunksize=50000):
+        query, params = self.to_sql()
+        for chunk in self.handler.iter_query(query, chunksize=chunksize, params=params):
+            yield self._restore_types(chunk)
+
+    def count(self):
+        if self._limit is None:
+            query, params = self._build('COUNT(*)')
+        else:
+            inner, params = self._build('1')
+            query = f"SELECT COUNT(*) FROM ({inner})"
+        rows = self.handler.execute_query(query, params)
+        if rows is None:
+            # execute_query logs the error and returns None.
+            raise ValueError(f"Could not count the rows of the lazy frame on {self.table_name}: {query}")
+        return rows[0][0]
+
+    def head(self, n=5):
+        return self.limit(n).collect()
+
+    def __repr__(self):
+        query, params = self.to_sql()
+        return f"LazyFrame({query!r}, params={params!r})"
+
+    def _derive(self, **changes):
+        state = dict(columns=self._columns, filters=self._filters, order=self._order, limit_count=self._limit)
+        state.update(changes)
+        frame = LazyFrame(self.handler, self.table_name, **state)
+        frame._schema = self._schema
+        frame._dtypes = self._dtypes
+        return frame
+
+    def _check_before_limit(self, method):
+        if self._limit is not None:
+            raise ValueError(f"{method}() must come before limit()")
+
+    def _build(self, columns):
+        builder = QueryBuilder().select(columns).from_table(quote_identifier(self.table_name))
+        for condition, params in self._filters:
+            builder.where(condition, *params)
+        if self._order is not None:
+            order_columns, order = self._order
+            if not isinstance(order_columns, str):
+                order_columns = ', '.join(quote_identifier(column) for column in order_columns)
+            builder.order_by(order_columns, order)
+        if self._limit is not None:
+            builder.limit(self._limit)
+        return builder.build(with_params=True)
+
+    def _table_schema(self):
+        if self._schema is None:
+            rows = self.handler.execute_query(f"PRAGMA table_info({quote_identifier(self.table_name)})")
+            if not rows:
+                raise ValueError(f"Table {self.table_name} does not exist")
+            self._schema = {row[1]: (row[2] or '').upper() for row in rows}
+        return self._schema
+
+    def _table_dtypes(self):
+        if self._dtypes is None:
+            self._dtypes = self.handler.table_dtypes(self.table_name) or {}
+        return self._dtypes
+
+    def _restore_types(self, df):
+        dtypes = self._table_dtypes()
+        if dtypes:
+            return _apply_dtypes(df, dtypes)
+        schema = self._table_schema()
+        for column in df.columns:
+            declared = schema.get(column, '')
+            if declared in _DATETIME_TYPES and df[column].dtype == object:
+                df[column] = pd.to_datetime(df[column])
+            elif declared in _BOOLEAN_TYPES and df[column].notna().all():
+                df[column] = df[column].astype(bool)
+        return df
+
+
+def _select_expression(column, spec):
+    if spec is not None and spec['dtype'] in _NANOSECOND_DTYPES:
+        return f"IFNULL({quote_identifier(column)}, {_NAT_SQL}) AS {quote_identifier(column)}"
+    return quote_identifier(column)
+
+
+def _apply_dtypes(df, dtypes):
+    """Give the columns read from a typed table the dtypes recorded in its catalog."""
+    for column in df.columns:
+        spec = dtypes.get(column)
+        if spec is None:
+            continue
+        dtype, values = spec['dtype'], df[column]
+        if dtype in _NANOSECOND_DTYPES:
+            values = pd.Series(values.to_numpy(dtype='int64').view(dtype), index=df.index)
+            if spec.get('tz'):
+                values = values.dt.tz_localize('UTC').dt.tz_convert(spec['tz'])
+        elif dtype == 'category':
+            values = pd.Series(pd.Categorical(values, categories=spec['categories'], ordered=spec['ordered']),
+                               index=df.index)
+        elif dtype == 'bool':
+            values = values.astype(bool if values.notna().all() else 'boolean')
+        elif dtype in ('object', 'string'):
+            values = values.astype(dtype)
+        elif pd.api.types.is_integer_dtype(dtype) and values.isna().any():
+            # A NULL in a numpy integer column needs the nullable dtype of the same width.
+            values = values.astype(dtype if dtype[0].isupper() else dtype.capitalize().replace('Uint', 'UInt'))
+        else:
+            values = values.astype(dtype)
+        df[column] = values
+    return df
@@ -5,59 +5,94 @@ class QueryBuilder:
     """
     This module defines the QueryBuilder class, which can be used to build SQL queries.
 
+    Values are passed as bound parameters rather than written into the SQL text: a condition uses ``?`` placeholders
+    and its values follow it as arguments. Queries of the same shape then produce the same SQL text whatever the
+    values, so SQLite parses and plans each shape once and reuses the prepared statement.
+
     Usage:
         query_builder = QueryBuilder()
-        query_builder.select("name, age").from_table("users").where("age > 18").build()
+        query_builder.select("name, age").from_table("users").where("age > ?", 18).build(with_params=True)
 
     Attributes:
         query (str): The string representation of the SQL query being built.
+        params (list): The values bound to the query's placeholders, in order.
 
     Methods:
         __init__(): Initializes the QueryBuilder object.
         select(columns="*"): Adds a SELECT statement to the query.
         from_table(table_name): Adds a FROM statement to the query.
-        where(condition): Adds a WHERE statement to the query.
+        where(condition, *params): Adds a WHERE statement to the query; further calls are combined with AND.
         group_by(columns): Adds a GROUP BY statement to the query.
-        having(condition): Adds a HAVING statement to the query.
+        having(condition, *params): Adds a HAVING statement to the query.
         order_by(columns, order="ASC"): Adds an ORDER BY statement to the query.
-        build(): Finalizes the query and returns the string representation of the query.
+        limit(count): Adds a LIMIT statement to the query, with the count bound as a parameter.
+        build(with_params=False): Finalizes the query and returns the string representation of the query, or a
+            (query, params) tuple when with_params is True.
 
     Example:
         query_builder = QueryBuilder()
-        query_builder.select("name, age").from_table("users").where("age > 18").build()
+        query_builder.select("name, age").from_table("users").where("age > ?", 18).build(with_params=True)
 
-    This will generate the following SQL query: "SELECT name, age FROM users WHERE age > 18".
+    This will generate the following SQL query and parameters: ("SELECT name, age FROM users WHERE age > ?", (18,)).
     """
     def __init__(self):
         self.query = ""
+        self._reset_params()
 
     def select(self, columns="*"):
         self.query = f"SELECT {columns} "
+        self._reset_params()
         return self
 
     def from_table(self, table_name):
         self.query += f"FROM {table_name} "
         return self
 
-    def where(self, condition):
-        self.query += f"WHERE {condition} "
+    def where(self, condition, *params):
+        if self._where_start is None:
+            self._where_start = len(self.query) + len("WHERE ")
+            self.query += f"WHERE {condition} "
+        elif self._where_end == len(self.query):
+            conditions = self.query[self._where_start:].strip()
+            if not self._where_combined:
+                conditions = f"({conditions})"
+                self._where_combined = True
+            self.query = f"{self.query[:self._where_start]}{conditions} AND ({condition}) "
+        else:
+            raise ValueError("Conditions added with where() must follow each other")
+        self._where_end = len(self.query)
+        self.params.extend(params)
         return self
 
     def group_by(self, columns):
         self.query += f"GROUP BY {columns} "
         return self
 
-    def having(self, condition):
+    def having(self, condition, *params):
         self.query += f"HAVING {condition} "
+        self.params.extend(params)
         return self
 
     def order_by(self, columns, order="ASC"):
         self.query += f"ORDER BY {columns} {order} "
         return self
 
-    def build(self):
+    def limit(self, count):
+        self.query += "LIMIT ? "
+        self.params.append(int(count))
+        return self
+
+    def build(self, with_params=False):
         final_query = self.query.strip()
+        params = tuple(self.params)
+        if params and not with_params:
+            logger.warning(f"Query built without its {len(params)} bound parameters: {final_query}")
         self.query = ""
+        self._reset_params()
         logger.info(f"Query built: {final_query}")
-        return final_query
+        return (final_query, params) if with_params else final_query
 
+    def _reset_params(self):
+        self.params = []
+        self._where_start = self._where_end = None
+        self._where_combined = False
@@ -0,0 +1,145 @@
+import re
+import threading
+import time
+from collections import deque
+from data_storage.engine_registry import database_key, get_engine, release_engine
+from data_storage.sql_utils import normalize_sql, split_quoted
+from data_storage.sqlite_handler import SQLiteHandler
+from utils.logger import logger
+
+# Literals replaced by ? in a query shape; quoted identifiers are kept.
+_NUMBER = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?\b')
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+# Aggregates top() can rank by.
+_RANKINGS = ('total_seconds', 'mean_seconds', 'max_seconds', 'calls', 'rows', 'bytes')
+
+
+class QueryProfiler:
+    """
+    QueryProfiler Class - Main Object Definition
+
+    The QueryProfiler class instruments every query run through SQLiteHandler (execute_query, iter_query,
+    fetch_columnar) and every cached result served by QueryResultCache, so the queries worth tuning can be found under
+    real load.
+
+    Each query is measured for wall time (executing and fetching, not the caller's processing of the rows), rows
+    returned, estimated bytes materialized and whether it came from a cache. Queries are grouped by shape: the
+    normalized SQL with literals replaced by ?, so the same statement with different values or IN list lengths is
+    one shape. A query slower than slow_threshold is logged as a warning and kept in a bounded slow-query log
+    together with the EXPLAIN QUERY PLAN of its shape, captured once per shape.
+
+    It provides the following methods:
+
+    - __init__(db_name=None, slow_threshold=0.1, slow_log_size=1000, max_shapes=1000, explain=True): The constructor
+      method. Starts profiling the queries run on a database, or on every database when db_name is None.
+
+    - record(db, query, params, stats): Records one query; called by SQLiteHandler as a profile listener.
+
+    - slow_queries(): Returns the slow-query log, oldest first, as dicts with sql, params, seconds, rows, bytes,
+                      cached, plan and at (the time.time() the query finished).
+
+    - top(n=10, by='total_seconds'): Returns the n query shapes with the highest total_seconds, mean_seconds,
+                                     max_seconds, calls, rows or bytes, as dicts that also hold cache_hits,
+                                     slow_calls and the captured plan.
+
+    - plan(shape, db=None): Returns the EXPLAIN QUERY PLAN details of a recorded shape, capturing them if needed.
+
+    - reset(): Clears the recorded statistics and the slow-query log.
+
+    - close(): Stops profiling.
+    """
+
+    def __init__(self, db_name=None, slow_threshold=0.1, slow_log_size=1000, max_shapes=1000, explain=True):
+        self.db = None if db_name is None else database_key(db_name)
+        self.slow_threshold = slow_threshold
+        self.max_shapes = max_shapes
+        self.explain = explain
+        self.shapes = {}
+        self._slow = deque(maxlen=slow_log_size)
+        self._lock = threading.Lock()
+        SQLiteHandler.add_profile_listener(self.record)
+
+    def record(self, db, query, params, stats):
+        if self.db is not None and db != self.db:
+            return
+        shape = query_shape(query)
+        with self._lock:
+            entry = self.shapes.get((db, shape))
+            if entry is None:
+                if len(self.shapes) >= self.max_shapes:
+                    return
+                entry = self.shapes[(db, shape)] = {
+                    'db': db, 'shape': shape, 'sql': query, 'params': params, 'calls': 0, 'cache_hits': 0,
+                    'slow_calls': 0, 'total_seconds': 0.0, 'max_seconds': 0.0, 'rows': 0, 'bytes': 0, 'plan': None}
+            entry['calls'] += 1
+            entry['cache_hits'] += stats['cached']
+            entry['total_seconds'] += stats['seconds']
+            entry['max_seconds'] = max(entry['max_seconds'], stats['seconds'])
+            entry['rows'] += stats['rows']
+            entry['bytes'] += stats['bytes']
+            slow = stats['seconds'] >= self.slow_threshold and not stats['cached']
+            if slow:
+                entry['slow_calls'] += 1
+                entry['sql'], entry['params'] = query, params
+        if not slow:
+            return
+        plan = self.plan(shape, db) if self.explain else None
+        with self._lock:
+            self._slow.append(dict(stats, sql=query, params=params, plan=plan, at=time.time()))
+        logger.warning(f"Slow query ({stats['seconds'] * 1e3:.1f} ms, {stats['rows']} rows, "
+                       f"~{stats['bytes'] / 1e6:.1f} MB): {query}" + (f" | plan: {'; '.join(plan)}" if plan else ''))
+
+    def slow_queries(self):
+        with self._lock:
+            return [dict(entry) for entry in self._slow]
+
+    def top(self, n=10, by='total_seconds'):
+        if by not in _RANKINGS:
+            raise ValueError(f"Unknown ranking {by!r}; expected one of {', '.join(_RANKINGS)}")
+        with self._lock:
+            entries = [dict(entry, mean_seconds=entry['total_seconds'] / entry['calls'])
+                       for entry in self.shapes.values()]
+        return sorted(entries, key=lambda entry: entry[by], reverse=True)[:n]
+
+    def plan(self, shape, db=None):
+        with self._lock:
+            entry = next((entry for (entry_db, entry_shape), entry in self.shapes.items()
+                          if entry_shape == shape and db in (None, entry_db)), None)
+        if entry is None:
+            raise KeyError(f"Query shape not recorded: {shape}")
+        if entry['plan'] is None:
+            entry['plan'] = _explain(entry['db'], entry['sql'], entry['params'])
+        return entry['plan']
+
+    def reset(self):
+        with self._lock:
+            self.shapes.clear()
+            self._slow.clear()
+
+    def close(self):
+        SQLiteHandler.remove_profile_listener(self.record)
+
+
+def query_shape(query):
+    """Normalize a query and replace its literals with ?, so executions with different values share a shape."""
+    parts = split_quoted(normalize_sql(query))
+    shape = ''.join(('?' if part.startswith("'") else part) if idx % 2 else _NUMBER.sub('?', part)
+                    for idx, part in enumerate(parts))
+    return _IN_LIST.sub('(?)', shape)
+
+
+def _explain(db, sql, params):
+    if db == ':memory:':
+        # Every in-memory database is private to its handler, so there is no connection to explain the query on.
+        return []
+    # A raw cursor: the plan lookup is neither profiled nor recorded by query listeners.
+    engine = get_engine(db)
+    raw = engine.raw_connection()
+    try:
+        return [row[-1] for row in raw.cursor().execute(f"EXPLAIN QUERY PLAN {sql}", params or ()).fetchall()]
+    except Exception as e:
+        logger.warning(f"Could not explain query {sql}: {e}")
+        return []
+    finally:
+        raw.close()
+        release_engine(engine)
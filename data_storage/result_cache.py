@@ -0,0 +1,158 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import quote
+from data_storage.engine_registry import database_key
+from data_storage.sql_utils import estimate_bytes, normalize_sql
+from data_storage.sqlite_handler import SQLiteHandler
+from utils.logger import logger
+
+
+class QueryResultCache:
+    """
+    QueryResultCache class keeps the results of read queries in memory, keyed by database, normalized SQL and
+    parameters, and evicts the least recently used results once they exceed a memory bound.
+
+    A database's cached results are dropped as soon as its contents may have changed:
+    - a SQLiteHandler in this process commits rows to any of its tables (write listener), or
+    - SQLite's PRAGMA data_version, polled on a dedicated connection at every lookup, changes. That covers writes by
+      other connections and other processes, including writes that bypass SQLiteHandler.
+
+    Methods:
+    - __init__(self, max_bytes=256 MiB):
+        Constructor method that sets the memory bound and registers the cache as a SQLiteHandler write listener.
+        :param max_bytes: The estimated memory the cached results may use.
+        :return: None
+
+    - get_or_run(self, db_name, query, params, run):
+        Returns the cached result of a query, or calls run() and caches what it returns (unless it is None). A result
+        is only stored when the database did not change while run() was executing. Cache hits are reported to
+        SQLiteHandler profile listeners. Queries on ':memory:' always run, as the name does not tell apart the
+        separate in-memory databases of different handlers.
+        :param db_name: The path of the database, or ':memory:'.
+        :param query: The SQL query.
+        :param params: The query's parameters, or None.
+        :param run: A callable without arguments that executes the query.
+        :return: A tuple of the result (a new list on every call) and whether it came from the cache.
+
+    - invalidate(self, db_name=None):
+        Drops the cached results of a database, or of every database.
+        :param db_name: The path of the database, or None for all.
+        :return: None
+
+    - size(self):
+        Returns the estimated memory of the cached results in bytes.
+
+    - close(self):
+        Unregisters the write listener and closes the data_version connections.
+        :return: None
+
+    Attributes:
+    - hits, misses: Lookup counters since the cache was created.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 ** 2):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._watchers = {}
+        self._versions = {}
+        self._generations = {}
+        SQLiteHandler.add_write_listener(self._on_write)
+
+    def get_or_run(self, db_name, query, params, run):
+        start = time.perf_counter()
+        db = database_key(db_name)
+        if db == ':memory:':
+            with self._lock:
+                self.misses += 1
+            return run(), False
+        key = (db, normalize_sql(query), _freeze(params))
+        with self._lock:
+            token = self._validate(db)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                result = list(entry[0])
+            else:
+                self.misses += 1
+        if entry is not None:
+            SQLiteHandler.report_query(db_name, query, params, time.perf_counter() - start, result)
+            return result, True
+
+        result = run()
+        if result is None:
+            return result, False
+        with self._lock:
+            if self._validate(db) == token:
+                self._store(key, result)
+        return list(result), False
+
+    def invalidate(self, db_name=None):
+        with self._lock:
+            db = None if db_name is None else database_key(db_name)
+            for key in [key for key in self._entries if db is None or key[0] == db]:
+                self._bytes -= self._entries.pop(key)[1]
+
+    def size(self):
+        return self._bytes
+
+    def close(self):
+        SQLiteHandler.remove_write_listener(self._on_write)
+        with self._lock:
+            for watcher in self._watchers.values():
+                if watcher is not None:
+                    watcher.close()
+            self._watchers.clear()
+            self.invalidate()
+
+    def _on_write(self, db, table_name):
+        with self._lock:
+            self._generations[db] = self._generations.get(db, 0) + 1
+            self._validate(db)
+
+    def _validate(self, db):
+        """Drop the database's entries if it changed since the last check; return its current change token."""
+        token = (self._data_version(db), self._generations.get(db, 0))
+        if self._versions.get(db) != token:
+            if db in self._versions:
+                self.invalidate(db)
+            self._versions[db] = token
+        return token
+
+    def _data_version(self, db):
+        if self._watchers.get(db) is None and db != ':memory:':
+            # An in-memory database cannot be opened from a second connection; only write listeners apply to it.
+            try:
+                self._watchers[db] = sqlite3.connect(f'file:{quote(db)}?mode=ro', uri=True, check_same_thread=False)
+            except sqlite3.OperationalError:
+                # The file does not exist yet; it is watched once it does.
+                return None
+        watcher = self._watchers.get(db)
+        return None if watcher is None else watcher.execute('PRAGMA data_version').fetchone()[0]
+
+    def _store(self, key, result):
+        size = estimate_bytes(result)
+        if size > self.max_bytes:
+            logger.info(f"Query result of ~{size / 1e6:.1f} MB is larger than the cache and was not cached")
+            return
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (tuple(result), size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._bytes -= evicted
+
+
+def _freeze(params):
+    if params is None:
+        return ()
+    if isinstance(params, dict):
+        return tuple(sorted(params.items()))
+    return tuple(params)
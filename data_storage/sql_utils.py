@@ -0,0 +1,41 @@
+import re
+import sys
+
+# Quoted strings and identifiers, with '' and "" escapes; a capturing group, so re.split keeps them.
+_QUOTED = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")")
+_WHITESPACE = re.compile(r'\s+')
+# Rows sampled to estimate the memory of a large result.
+_SIZE_SAMPLE_ROWS = 1000
+
+
+def split_quoted(sql):
+    """Split SQL into alternating unquoted and quoted parts: the parts at odd positions are quoted."""
+    return _QUOTED.split(sql)
+
+
+def normalize_sql(query):
+    """Collapse whitespace outside quotes and drop a trailing semicolon, so equivalent spellings share a cache key."""
+    parts = split_quoted(query.strip().rstrip(';').strip())
+    return ''.join(part if idx % 2 else _WHITESPACE.sub(' ', part) for idx, part in enumerate(parts))
+
+
+def quote_identifier(identifier):
+    """Quote a table, column or index name for SQL, doubling any double quotes in it."""
+    return '"' + str(identifier).replace('"', '""') + '"'
+
+
+def unquote_identifier(identifier):
+    """Return the name a possibly double-quoted SQL identifier stands for."""
+    identifier = identifier.strip()
+    if len(identifier) > 1 and identifier[0] == identifier[-1] == '"':
+        return identifier[1:-1].replace('""', '"')
+    return identifier
+
+
+def estimate_bytes(rows):
+    """Estimate the memory of a list of result rows from a sample of them."""
+    sample = rows[:_SIZE_SAMPLE_ROWS]
+    if not sample:
+        return sys.getsizeof(rows)
+    sample_bytes = sum(sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row) for row in sample)
+    return sys.getsizeof(rows) + int(sample_bytes * len(rows) / len(sample))
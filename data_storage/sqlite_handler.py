@@ -1,17 +1,60 @@
-from sqlalchemy import create_engine, text
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from operator import itemgetter
+from sqlalchemy import create_engine
+import json
+import numpy as np
+import os
 import pandas as pd
+import sqlite3
+import tempfile
+import threading
+import time
+import weakref
 from utils.logger import logger
-from sqlalchemy.pool import StaticPool
+from data_storage.engine_registry import database_key, get_engine, release_engine
+from data_storage.lazy_frame import LazyFrame
+from data_storage.sql_utils import estimate_bytes, quote_identifier
+
+# Connection settings applied for the duration of a bulk load. WAL with synchronous=NORMAL cannot corrupt the database
+# on a crash, it only skips the fsync of each commit; a negative cache_size is in KiB (here 256 MiB).
+BULK_LOAD_PRAGMAS = {'synchronous': 'NORMAL', 'cache_size': -262144, 'temp_store': 'MEMORY'}
+# Busy timeout of handlers in worker processes that share one database file: the workers take turns holding its write
+# lock to copy their parsed rows in, so they wait much longer than the default five seconds before giving up.
+WORKER_DB_TIMEOUT = 600
+# Rows converted and handed to executemany at a time.
+_BULK_BATCH_ROWS = 100000
+# STRICT tables (type-checked columns) need SQLite 3.37 or later.
+STRICT_TABLES_SUPPORTED = sqlite3.sqlite_version_info >= (3, 37, 0)
+# Compiles to_sql's CREATE TABLE statements for bulk_load without checking out a connection of the target database,
+# which would end the load's transaction on a single-connection (in-memory) engine. It never holds any data.
+_SCHEMA_ENGINE = create_engine('sqlite://')
+# Whether each engine's database has a DTYPE_CATALOG_TABLE, checked on first use, so untyped databases skip the lookup.
+_DTYPE_CATALOGS = weakref.WeakKeyDictionary()
+# Schema and table a staged bulk load is attached and copied from.
+_STAGE_SCHEMA = 'plato_stage'
+_STAGE_TABLE = 'staged'
+# The lock each engine's bulk loads hold in this process while their write transaction is open.
+_WRITE_LOCKS = weakref.WeakKeyDictionary()
+_WRITE_LOCKS_GUARD = threading.Lock()
+# Engines whose database has been switched to WAL by this process.
+_WAL_ENGINES = weakref.WeakSet()
+# Rowid ranges per worker in load_table_parallel, so a range with many gaps does not hold up the whole load.
+_RANGES_PER_WORKER = 4
 
 
 class SQLiteHandler:
     """
     SQLiteHandler class is used to handle database operations in SQLite.
 
+    Handlers of the same database file share one pooled engine from the engine registry, so creating a handler is cheap
+    and concurrent readers in different threads use separate connections. Every ':memory:' handler has a database of its
+    own.
+
     Methods:
-    - __init__(self, db_name='plato.db'):
+    - __init__(self, db_name='plato.db', timeout=5):
         Constructor method that initializes the SQLiteHandler object with a database name.
         :param db_name: Optional parameter specifying the name of the database (default is 'plato.db').
+        :param timeout: Seconds a connection waits for another connection's write lock before failing (default is 5).
         :return: None
 
     - create_connection(self):
@@ -19,59 +62,881 @@ class SQLiteHandler:
         :return: A connection object.
 
     - close_connection(self):
-        Closes the connection to the SQLite database.
+        Releases the handler's reference to the shared engine. The pooled connections to the database are closed once
+        every handler of the database has released it, so only close handlers before moving or deleting the file. An
+        in-memory database is closed, and its data dropped, right away.
         :return: None
 
-    - save_dataframe_to_db(self, df, table_name):
+    - save_dataframe_to_db(self, df, table_name, bulk=False):
         Saves a pandas DataFrame to a table in the SQLite database.
         :param df: The DataFrame to be saved.
         :param table_name: The name of the table to save the DataFrame.
+        :param bulk: Write the DataFrame with bulk_load instead of to_sql (default is False).
         :return: None
 
-    - execute_query(self, query):
-        Executes a SQL query on the SQLite database.
+    - bulk_load(self, data, table_name, if_exists='append', index_columns=None, typed=False, strict=False,
+                staged=False, keep_indexes=False):
+        Writes a DataFrame, or an iterable of DataFrame chunks, in a single transaction with a prepared executemany on
+        the raw sqlite3 connection. The database is switched to WAL and the connection uses BULK_LOAD_PRAGMAS while
+        loading. The table's secondary indexes are dropped before the rows are inserted and rebuilt once at the end,
+        together with an index on each of index_columns, still inside the transaction. The write lock is taken when
+        the transaction begins, so concurrent loads into one database run one after another; loads from threads of one
+        process wait for each other without a timeout. Chunks that are slow to produce (parsed from a file) should be
+        staged: they are then converted into a temporary database file next to the database before the lock is taken,
+        and the lock is only held to copy them in, so concurrent loads parse in parallel.
+        :param data: A DataFrame or an iterable of DataFrames with the same columns.
+        :param table_name: The name of the table to load into. It is created from the first chunk if missing.
+        :param if_exists: 'append', 'replace' or 'fail' when the table already exists (default is 'append').
+        :param index_columns: Optional columns to index after the load.
+        :param typed: Create a missing table as a typed table (see below) instead of with to_sql's column types.
+        :param strict: Make a new typed table STRICT, so SQLite rejects values of the wrong type (SQLite >= 3.37).
+        :param staged: Pull and convert every chunk before taking the write lock (default is False).
+        :param keep_indexes: Keep the table's indexes in place instead of dropping and rebuilding them, which is cheaper
+                             for a load that is small next to the table (default is False).
+        :return: The number of rows written.
+
+    - table_dtypes(self, table_name):
+        Returns the dtype catalog of a typed table as a dict mapping each column to its spec, or None for other tables.
+        Whether the database has a catalog at all is checked once per engine, so in a database without typed tables the
+        call runs no query. A catalog another process creates later is seen once the handlers of the database have
+        been closed.
+        :param table_name: The name of the table.
+        :return: A dict, or None.
+
+    - execute_query(self, query, params=None):
+        Executes a SQL query on the SQLite database. The SQL is handed to the driver as is, so every pooled connection
+        reuses its prepared statement for SQL text it has run before; pass values as params to keep that text the same.
         :param query: The SQL query to be executed.
+        :param params: Optional sequence or mapping of values for the query's ? or :name placeholders.
         :return: The result of the query as a list of tuples.
 
+    - iter_query(self, query, chunksize=50000, params=None):
+        Runs a query on a pooled raw sqlite3 cursor and yields the result as DataFrames of at most chunksize rows, so
+        memory stays bounded by one chunk regardless of the size of the result.
+        :param query: The SQL query to be executed.
+        :param chunksize: The number of rows per DataFrame (default is 50000).
+        :param params: Optional sequence or mapping of values for the query's ? or :name placeholders.
+        :return: A generator of DataFrames.
+
+    - fetch_columnar(self, query, params=None, chunksize=50000):
+        Runs a query and returns its result as one numpy array per column, filled chunk by chunk straight from the
+        cursor without building Row objects or an intermediate DataFrame. Columns holding only integers become int64
+        (float64 when they contain NULLs), numeric columns float64, and anything else object.
+        :param query: The SQL query to be executed.
+        :param params: Optional sequence or mapping of values for the query's placeholders.
+        :param chunksize: The number of rows fetched from the cursor at a time (default is 50000).
+        :return: A dict mapping column names to numpy arrays, in result order.
+
     - load_table_to_dataframe(self, table_name):
         Loads a table from the SQLite database into a pandas DataFrame.
         :param table_name: The name of the table to load.
         :return: The loaded pandas DataFrame, or None if an error occurs.
+
+    - load_table_parallel(self, table_name, num_workers=None, use_processes=True, columns=None,
+                          min_rows_per_range=100000):
+        Loads a table by splitting its rowid span into ranges that are read on separate connections by worker processes
+        (or threads), then concatenated in rowid order. Returns the same DataFrame as load_table_to_dataframe. Tables
+        without a rowid, small tables and in-memory databases are read on one connection.
+        :param table_name: The name of the table to load.
+        :param num_workers: The number of workers (default is the number of CPUs).
+        :param use_processes: Read in processes (default) rather than threads; threads still overlap SQLite's page reads
+                              but convert rows to Python objects one at a time.
+        :param columns: Optional list of columns to load.
+        :param min_rows_per_range: The smallest rowid span handed to a worker (default is 100000).
+        :return: The loaded pandas DataFrame.
+
+    - lazy_table(self, table_name):
+        Returns a LazyFrame on a table: column selections, filters and limits are recorded and pushed down into one SQL
+        query, and rows are only read when the frame is collected.
+        :param table_name: The name of the table.
+        :return: A LazyFrame.
+
+    - add_write_listener(listener) / remove_write_listener(listener):
+        Class methods that register or unregister a callable invoked as listener(database_key, table_name) after any
+        handler in the process commits rows to a table (save_dataframe_to_db, bulk_load, append_with_checkpoint).
+        Bound methods are held weakly, so registering does not keep their object alive.
+        :param listener: The callable.
+        :return: None
+
+    - add_query_listener(listener) / remove_query_listener(listener):
+        Class methods that register or unregister a callable invoked as listener(database_key, query, params) after
+        any handler in the process runs a query with execute_query, iter_query or fetch_columnar. Held like write
+        listeners.
+        :param listener: The callable.
+        :return: None
+
+    - add_profile_listener(listener) / remove_profile_listener(listener):
+        Class methods that register or unregister a callable invoked as listener(database_key, query, params, stats)
+        once a query run with execute_query, iter_query or fetch_columnar has returned all of its rows, or once
+        report_query is called. stats is a dict with seconds (time spent executing and fetching, not consuming the
+        rows), rows, bytes (estimated memory of the fetched rows) and cached. Held like write listeners.
+        :param listener: The callable.
+        :return: None
+
+    - report_query(db_name, query, params, seconds, rows, cached=True):
+        Class method that reports a query answered without running it, e.g. from a result cache, to profile listeners.
+        :param db_name: The path of the database, or ':memory:'.
+        :param query: The SQL query.
+        :param params: The query's parameters, or None.
+        :param seconds: The time taken to answer it.
+        :param rows: The result rows.
+        :param cached: Whether the rows came from a cache.
+        :return: None
+
+    - get_ingest_checkpoint(self, file_path):
+        Returns the incremental ingest checkpoint recorded for a file.
+        :param file_path: The absolute path of the ingested file.
+        :return: A (byte_offset, header_signature, file_id, data_signature) tuple, or None if the file has no
+                 checkpoint. file_id and data_signature are None for checkpoints recorded without them.
+
+    - append_with_checkpoint(self, df, table_name, file_path, byte_offset, header_signature, file_id=None,
+                             data_signature=None):
+        Appends a DataFrame to a table and records the file's new checkpoint in the same transaction, so a crash can
+        never leave rows saved without their checkpoint or the other way round. Rows are converted like bulk_load's,
+        so they match the rest of a typed table. The rowids the rows were given are recorded against the file in the
+        INGESTED_ROWS_TABLE (for tables whose rowids SQLite assigns).
+        :param df: The DataFrame to append (may be empty).
+        :param table_name: The name of the table to append to.
+        :param file_path: The absolute path of the ingested file.
+        :param byte_offset: The offset just past the last ingested line.
+        :param header_signature: A digest of the file's header line.
+        :param file_id: Optional identity of the file on disk, such as its device and inode.
+        :param data_signature: Optional digest of the file's first ingested bytes.
+        :return: None
+
+    - reset_ingest_checkpoint(self, file_path, delete_rows=False):
+        Forgets a file's checkpoint and the rows recorded against it, in one transaction, so the file is next ingested
+        from the start.
+        :param file_path: The absolute path of the ingested file.
+        :param delete_rows: Also delete the rows ingested from the file from their tables (default is False).
+        :return: The number of rows deleted.
+
+    Typed tables are created with INTEGER, REAL and TEXT columns and record the pandas dtype of every column in the
+    DTYPE_CATALOG_TABLE. Datetimes and timedeltas are stored as INTEGER nanoseconds (UTC for tz-aware columns),
+    categoricals as their values, with their categories kept in the catalog. Loading a typed table
+    (load_table_to_dataframe, lazy_table, load_table_parallel) restores datetime, timezone, category, bool and narrow
+    numeric dtypes directly, without parsing text. Filters on a datetime column of a typed table compare nanosecond
+    integers. Rows written to a typed table with save_dataframe_to_db, bulk_load or append_with_checkpoint are converted
+    the same way.
+
+    save_dataframe_to_db, bulk_load, append_with_checkpoint and reset_ingest_checkpoint switch a database file to WAL
+    before writing, so readers are not blocked by a writer from then on; the mode is kept in the file. Opening or
+    reading a database leaves its journal mode as it is.
     """
-    def __init__(self, db_name='plato.db'):
-        self.engine = create_engine(f'sqlite:///{db_name}', connect_args={'check_same_thread': False}, poolclass=StaticPool)
-        logger.info(f"Database connection created with {db_name}")
+    CHECKPOINT_TABLE = '_plato_ingest_checkpoints'
+    INGESTED_ROWS_TABLE = '_plato_ingest_rows'
+    DTYPE_CATALOG_TABLE = '_plato_dtypes'
+    _listeners = {'write': [], 'query': [], 'profile': []}
+    _listeners_lock = threading.Lock()
+
+    def __init__(self, db_name='plato.db', timeout=5):
+        self.db_name = db_name
+        self.engine = get_engine(db_name, timeout)
+        self._holds_engine = True
 
     def create_connection(self):
         return self.engine.connect()
 
     def close_connection(self):
-        self.engine.dispose()
+        if self._holds_engine:
+            release_engine(self.engine)
+            self._holds_engine = False
         logger.info(f"Database connection closed")
 
-    def save_dataframe_to_db(self, df, table_name):
+    def save_dataframe_to_db(self, df, table_name, bulk=False):
         try:
+            if bulk:
+                self.bulk_load(df, table_name)
+                return
+            if self.table_dtypes(table_name) is not None:
+                # Typed tables need their values converted to the stored representation. A save is usually small next
+                # to the table, so its indexes are updated in place rather than rebuilt.
+                self.bulk_load(df, table_name, keep_indexes=True)
+                return
+            self._enable_wal()
             chunk_size = 2000
-            for i in range(0, len(df), chunk_size):
-                df.iloc[i:i+chunk_size].to_sql(table_name, con=self.engine, if_exists='append', index=False, method='multi')
-                logger.info(f"DataFrame saved to table {table_name}")
+            try:
+                for i in range(0, len(df), chunk_size):
+                    df.iloc[i:i+chunk_size].to_sql(table_name, con=self.engine, if_exists='append', index=False, method='multi')
+            finally:
+                # Earlier slices are committed even if a later one fails.
+                self._notify_write(table_name)
+            logger.info(f"DataFrame saved to table {table_name}")
         except Exception as e:
             logger.error(f"Error saving DataFrame to table {table_name}: {e}")
 
-    def execute_query(self, query):
+    def bulk_load(self, data, table_name, if_exists='append', index_columns=None, typed=False, strict=False,
+                  staged=False, keep_indexes=False):
+        chunks = [data] if isinstance(data, pd.DataFrame) else data
+        # Staged chunks are pulled and converted before the write lock is taken, so it is only held to copy them in.
+        stage = _StagedChunks(chunks, lambda head: self._staging_specs(head, table_name, if_exists, typed),
+                              self._staging_dir()) if staged else None
+        self._enable_wal()
+        raw = self.engine.raw_connection()
+        conn = raw.driver_connection
+        previous = {name: conn.execute(f"PRAGMA {name}").fetchone()[0] for name in BULK_LOAD_PRAGMAS}
+        attached = False
+        rows = 0
+        try:
+            for name, value in BULK_LOAD_PRAGMAS.items():
+                conn.execute(f"PRAGMA {name}={value}")
+            if stage is not None:
+                # ATTACH is not allowed inside a transaction.
+                conn.execute(f"ATTACH DATABASE ? AS {_STAGE_SCHEMA}", (stage.path,))
+                attached = True
+            # Loads from threads of this process queue here rather than on SQLite's busy timeout, which a long load
+            # would outlast.
+            with _write_lock(self.engine):
+                # Take the write lock up front: a deferred transaction that read first cannot upgrade once another
+                # connection has committed, and fails at once instead of waiting out the busy timeout.
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    if stage is None:
+                        rows, indexes = self._insert_chunks(conn, chunks, table_name, if_exists, typed, strict,
+                                                            keep_indexes)
+                    else:
+                        rows, indexes = self._insert_staged(conn, stage, table_name, if_exists, typed, strict,
+                                                            keep_indexes)
+                    for sql in indexes:
+                        conn.execute(sql)
+                    for column in index_columns or []:
+                        conn.execute(f"CREATE INDEX IF NOT EXISTS {quote_identifier(f'ix_{table_name}_{column}')} "
+                                     f"ON {quote_identifier(table_name)} ({quote_identifier(column)})")
+                    conn.commit()
+                except BaseException:
+                    conn.rollback()
+                    raise
+        finally:
+            if attached:
+                conn.execute(f"DETACH DATABASE {_STAGE_SCHEMA}")
+            if stage is not None:
+                stage.discard()
+            for name, value in previous.items():
+                conn.execute(f"PRAGMA {name}={value}")
+            raw.close()
+        self._notify_write(table_name)
+        logger.info(f"{rows} rows bulk loaded into table {table_name}")
+        return rows
+
+    def _insert_chunks(self, conn, chunks, table_name, if_exists, typed, strict, keep_indexes):
+        """Insert chunks as they are pulled. Returns the number of rows and the SQL that recreates the indexes."""
+        insert, indexes, specs = None, [], None
+        rows = 0
+        for chunk in chunks:
+            if insert is None:
+                indexes, specs = self._prepare_bulk_table(conn, chunk, table_name, if_exists, typed, strict,
+                                                          keep_indexes)
+                columns = ', '.join(quote_identifier(column) for column in chunk.columns)
+                insert = (f"INSERT INTO {quote_identifier(table_name)} ({columns}) "
+                          f"VALUES ({', '.join('?' * len(chunk.columns))})")
+            if specs is not None:
+                self._extend_categories(conn, table_name, specs, _category_values(specs, chunk))
+            for start in range(0, len(chunk), _BULK_BATCH_ROWS):
+                conn.executemany(insert, _sql_rows(chunk.iloc[start:start + _BULK_BATCH_ROWS], specs))
+            rows += len(chunk)
+        return rows, indexes
+
+    def _insert_staged(self, conn, stage, table_name, if_exists, typed, strict, keep_indexes):
+        """Copy a staged load into the table. Returns the number of rows and the SQL that recreates the indexes."""
+        if stage.head is None:
+            return 0, []
+        indexes, specs = self._prepare_bulk_table(conn, stage.head, table_name, if_exists, typed, strict,
+                                                  keep_indexes)
+        if (specs is None) != (stage.specs is None):
+            raise ValueError(f"Table '{table_name}' was created with other column types while its rows were staged")
+        if specs is not None:
+            self._extend_categories(conn, table_name, specs, stage.categories)
+        columns = ', '.join(quote_identifier(column) for column in stage.head.columns)
+        conn.execute(f"INSERT INTO {quote_identifier(table_name)} ({columns}) "
+                     f"SELECT {columns} FROM {_STAGE_SCHEMA}.{_STAGE_TABLE} ORDER BY rowid")
+        return stage.rows, indexes
+
+    def _staging_specs(self, head, table_name, if_exists, typed):
+        """The dtype catalog that _prepare_bulk_table will give a staged load whose first chunk is head."""
+        if if_exists != 'replace':
+            raw = self.engine.raw_connection()
+            try:
+                exists = _table_exists(raw.driver_connection, table_name)
+            finally:
+                raw.close()
+            if exists:
+                return self.table_dtypes(table_name)
+        return {column: _column_type(series)[1] for column, series in head.items()} if typed else None
+
+    def _staging_dir(self):
+        """Stage next to the database file, on the disk its rows are going to, or in the temporary directory."""
+        return None if self.db_name == ':memory:' else os.path.dirname(database_key(self.db_name))
+
+    def _prepare_bulk_table(self, conn, df, table_name, if_exists, typed, strict, keep_indexes=False):
+        """
+        Create or reset the target table and drop its secondary indexes unless keep_indexes is set. Returns the SQL that
+        recreates the dropped indexes and the table's dtype catalog (None for an untyped table).
+        """
+        exists = _table_exists(conn, table_name)
+        if exists and if_exists == 'fail':
+            raise ValueError(f"Table '{table_name}' already exists.")
+        if exists and if_exists == 'replace':
+            conn.execute(f"DROP TABLE {quote_identifier(table_name)}")
+            if _read_catalog(conn, self.DTYPE_CATALOG_TABLE, table_name) is not None:
+                conn.execute(f"DELETE FROM {self.DTYPE_CATALOG_TABLE} WHERE table_name = ?", (table_name,))
+            exists = False
+        if not exists and typed:
+            return [], self._create_typed_table(conn, df, table_name, strict)
+        if not exists:
+            # Same column types as to_sql, so bulk and regular loads into one table agree.
+            conn.execute(pd.io.sql.get_schema(df.head(0), table_name, con=_SCHEMA_ENGINE))
+            return [], None
+        if keep_indexes:
+            return [], _read_catalog(conn, self.DTYPE_CATALOG_TABLE, table_name)
+        # Indexes backing PRIMARY KEY/UNIQUE constraints have no SQL and stay in place.
+        indexes = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? "
+                               "AND sql IS NOT NULL", (table_name,)).fetchall()
+        for name, _ in indexes:
+            conn.execute(f"DROP INDEX {quote_identifier(name)}")
+        return [sql for _, sql in indexes], _read_catalog(conn, self.DTYPE_CATALOG_TABLE, table_name)
+
+    def _create_typed_table(self, conn, df, table_name, strict):
+        if strict and not STRICT_TABLES_SUPPORTED:
+            logger.warning(f"SQLite {sqlite3.sqlite_version} has no STRICT tables; {table_name} is created without it")
+            strict = False
+        columns = [(column,) + _column_type(series) for column, series in df.items()]
+        definition = ', '.join(f"{quote_identifier(column)} {sql_type}" for column, sql_type, _ in columns)
+        conn.execute(f"CREATE TABLE {quote_identifier(table_name)} ({definition}){' STRICT' if strict else ''}")
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {self.DTYPE_CATALOG_TABLE} ("
+                     "table_name TEXT NOT NULL, column_name TEXT NOT NULL, position INTEGER NOT NULL, "
+                     "spec TEXT NOT NULL, PRIMARY KEY (table_name, column_name))")
+        conn.executemany(f"INSERT INTO {self.DTYPE_CATALOG_TABLE} (table_name, column_name, position, spec) "
+                         "VALUES (?, ?, ?, ?)",
+                         [(table_name, column, position, json.dumps(spec))
+                          for position, (column, _, spec) in enumerate(columns)])
+        # Set before the load commits: a rolled-back catalog only costs later calls a lookup.
+        _DTYPE_CATALOGS[self.engine] = True
+        return {column: spec for column, _, spec in columns}
+
+    def _extend_categories(self, conn, table_name, specs, values):
+        """Add the values (a dict of column -> distinct values) that are new to a categorical column's categories."""
+        for column, column_values in values.items():
+            spec = specs.get(column)
+            if spec is None or spec['dtype'] != 'category':
+                continue
+            known = set(spec['categories'])
+            new = [value for value in column_values if value not in known]
+            if new:
+                spec['categories'] = spec['categories'] + [_json_scalar(value) for value in new]
+                conn.execute(f"UPDATE {self.DTYPE_CATALOG_TABLE} SET spec = ? WHERE table_name = ? AND column_name = ?",
+                             (json.dumps(spec), table_name, column))
+
+    def table_dtypes(self, table_name):
+        if not self._has_dtype_catalog():
+            return None
+        raw = self.engine.raw_connection()
+        try:
+            return _read_catalog(raw.driver_connection, self.DTYPE_CATALOG_TABLE, table_name)
+        finally:
+            raw.close()
+
+    def _has_dtype_catalog(self):
+        exists = _DTYPE_CATALOGS.get(self.engine)
+        if exists is None:
+            raw = self.engine.raw_connection()
+            try:
+                exists = _table_exists(raw.driver_connection, self.DTYPE_CATALOG_TABLE)
+            finally:
+                raw.close()
+            _DTYPE_CATALOGS[self.engine] = exists
+        return exists
+
+    def execute_query(self, query, params=None):
+        start = time.perf_counter()
         try:
             with self.create_connection() as conn:
-                result = conn.execute(text(query))
+                result = conn.exec_driver_sql(query, params or ())
                 logger.info(f"Query executed: {query}")
-                return result.fetchall()
+                rows = result.fetchall()
         except Exception as e:
             logger.error(f"Error executing query: {query}: {e}")
+            return None
+        seconds = time.perf_counter() - start
+        self._notify('query', query, params)
+        if self._listeners['profile']:
+            self._notify('profile', query, params, _query_stats(seconds, len(rows), estimate_bytes(rows)))
+        return rows
+
+    def iter_query(self, query, chunksize=50000, params=None):
+        raw = self.engine.raw_connection()
+        profiled = bool(self._listeners['profile'])
+        try:
+            start = time.perf_counter()
+            cursor = raw.cursor()
+            cursor.execute(query, params or ())
+            self._notify('query', query, params)
+            columns = [column[0] for column in cursor.description or ()]
+            chunks = total_rows = total_bytes = 0
+            while True:
+                rows = cursor.fetchmany(chunksize)
+                if not rows and chunks:
+                    break
+                chunks += 1
+                total_rows += len(rows)
+                if profiled:
+                    total_bytes += estimate_bytes(rows)
+                seconds = time.perf_counter() - start
+                yield pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+                # Time spent by the consumer between chunks is not the query's.
+                start = time.perf_counter() - seconds
+                if len(rows) < chunksize:
+                    break
+            cursor.close()
+            if profiled:
+                self._notify('profile', query, params, _query_stats(time.perf_counter() - start, total_rows,
+                                                                    total_bytes))
+        except Exception as e:
+            logger.error(f"Error executing query: {query}: {e}")
+            raise
+        finally:
+            raw.close()
+        logger.info(f"Query streamed in {chunks} chunks: {query}")
+
+    def fetch_columnar(self, query, params=None, chunksize=50000):
+        raw = self.engine.raw_connection()
+        profiled = bool(self._listeners['profile'])
+        try:
+            start = time.perf_counter()
+            cursor = raw.cursor()
+            cursor.execute(query, params or ())
+            self._notify('query', query, params)
+            columns = [column[0] for column in cursor.description or ()]
+            parts = [[] for _ in columns]
+            total_rows = total_bytes = 0
+            while True:
+                rows = cursor.fetchmany(chunksize)
+                if not rows:
+                    break
+                total_rows += len(rows)
+                if profiled:
+                    total_bytes += estimate_bytes(rows)
+                for idx, part in enumerate(parts):
+                    values = list(map(itemgetter(idx), rows))
+                    part.append(_typed_array(values) if any(value is not None for value in values) else len(values))
+            cursor.close()
+        except Exception as e:
+            logger.error(f"Error executing query: {query}: {e}")
+            raise
+        finally:
+            raw.close()
+        result = {column: _concat_parts(part) for column, part in zip(columns, parts)}
+        if profiled:
+            self._notify('profile', query, params, _query_stats(time.perf_counter() - start, total_rows, total_bytes))
+        logger.info(f"Query fetched into {len(columns)} column arrays: {query}")
+        return result
 
     def load_table_to_dataframe(self, table_name):
         try:
+            if self.table_dtypes(table_name) is not None:
+                return self.lazy_table(table_name).collect()
             df = pd.read_sql_table(table_name, con=self.engine)
             logger.info(f"Table {table_name} loaded into DataFrame")
             return df
         except Exception as e:
             logger.error(f"Error loading table {table_name} into DataFrame: {e}")
             return None
+
+    def load_table_parallel(self, table_name, num_workers=None, use_processes=True, columns=None,
+                            min_rows_per_range=100000):
+        frame = self.lazy_table(table_name)
+        if columns is not None:
+            frame = frame.select(columns)
+        raw = self.engine.raw_connection()
+        try:
+            low, high = raw.cursor().execute(
+                f"SELECT MIN(rowid), MAX(rowid) FROM {quote_identifier(table_name)}").fetchone()
+        except Exception:
+            # WITHOUT ROWID tables and views have no rowid to partition on.
+            low = high = None
+        finally:
+            raw.close()
+        num_workers = num_workers or os.cpu_count()
+        # Workers open a handler of their own, and an in-memory database is private to this one.
+        if low is None or num_workers < 2 or high - low + 1 < 2 * min_rows_per_range or self.db_name == ':memory:':
+            return frame.collect()
+
+        span = high - low + 1
+        count = max(2, min(num_workers * _RANGES_PER_WORKER, span // min_rows_per_range))
+        bounds = [low + span * idx // count for idx in range(count + 1)]
+        ranges = [(bounds[idx], bounds[idx + 1] - 1) for idx in range(count)]
+        executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        with executor_class(max_workers=num_workers) as executor:
+            parts = list(executor.map(_load_rowid_range, [self.db_name] * count, [table_name] * count,
+                                      [columns] * count, *zip(*ranges)))
+        df = pd.concat(_align_null_parts(parts), ignore_index=True)
+        logger.info(f"Table {table_name} loaded into DataFrame from {count} rowid ranges on {num_workers} workers")
+        return df
+
+    def lazy_table(self, table_name):
+        return LazyFrame(self, table_name)
+
+    @classmethod
+    def add_write_listener(cls, listener):
+        cls._add_listener('write', listener)
+
+    @classmethod
+    def remove_write_listener(cls, listener):
+        cls._remove_listener('write', listener)
+
+    @classmethod
+    def add_query_listener(cls, listener):
+        cls._add_listener('query', listener)
+
+    @classmethod
+    def remove_query_listener(cls, listener):
+        cls._remove_listener('query', listener)
+
+    @classmethod
+    def add_profile_listener(cls, listener):
+        cls._add_listener('profile', listener)
+
+    @classmethod
+    def remove_profile_listener(cls, listener):
+        cls._remove_listener('profile', listener)
+
+    @classmethod
+    def report_query(cls, db_name, query, params, seconds, rows, cached=True):
+        if cls._listeners['profile']:
+            cls._broadcast('profile', database_key(db_name), query, params,
+                           _query_stats(seconds, len(rows), estimate_bytes(rows), cached))
+
+    @classmethod
+    def _add_listener(cls, kind, listener):
+        ref = weakref.WeakMethod(listener) if hasattr(listener, '__self__') else (lambda: listener)
+        with cls._listeners_lock:
+            cls._listeners[kind] = cls._listeners[kind] + [ref]
+
+    @classmethod
+    def _remove_listener(cls, kind, listener):
+        with cls._listeners_lock:
+            cls._listeners[kind] = [ref for ref in cls._listeners[kind] if ref() not in (None, listener)]
+
+    def _notify(self, kind, *args):
+        if self._listeners[kind]:
+            self._broadcast(kind, database_key(self.db_name), *args)
+
+    @classmethod
+    def _broadcast(cls, kind, db, *args):
+        for ref in cls._listeners[kind]:
+            listener = ref()
+            if listener is not None:
+                listener(db, *args)
+
+    def _notify_write(self, table_name):
+        self._notify('write', table_name)
+
+    def _enable_wal(self):
+        """Switch the database to WAL before the engine's first write; the mode is kept in the file."""
+        if self.engine in _WAL_ENGINES:
+            return
+        # Other threads' writes wait here, so none of them reads the file while its journal mode changes.
+        with _write_lock(self.engine):
+            if self.engine in _WAL_ENGINES:
+                return
+            raw = self.engine.raw_connection()
+            try:
+                raw.driver_connection.execute("PRAGMA journal_mode=WAL")
+            finally:
+                raw.close()
+            _WAL_ENGINES.add(self.engine)
+
+    def _ensure_checkpoint_table(self, conn):
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {self.CHECKPOINT_TABLE} ("
+                     "file_path TEXT PRIMARY KEY, byte_offset INTEGER NOT NULL, "
+                     "header_signature TEXT NOT NULL, updated_at TEXT NOT NULL, file_id TEXT, data_signature TEXT)")
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({self.CHECKPOINT_TABLE})")}
+        for column in ('file_id', 'data_signature'):
+            if column not in columns:
+                # Checkpoints recorded before files were identified keep NULL here.
+                conn.execute(f"ALTER TABLE {self.CHECKPOINT_TABLE} ADD COLUMN {column} TEXT")
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {self.INGESTED_ROWS_TABLE} ("
+                     "file_path TEXT NOT NULL, table_name TEXT NOT NULL, "
+                     "first_rowid INTEGER NOT NULL, last_rowid INTEGER NOT NULL)")
+
+    def get_ingest_checkpoint(self, file_path):
+        raw = self.engine.raw_connection()
+        try:
+            conn = raw.driver_connection
+            self._ensure_checkpoint_table(conn)
+            row = conn.execute(f"SELECT byte_offset, header_signature, file_id, data_signature "
+                               f"FROM {self.CHECKPOINT_TABLE} WHERE file_path = ?", (file_path,)).fetchone()
+        finally:
+            raw.close()
+        return tuple(row) if row else None
+
+    def append_with_checkpoint(self, df, table_name, file_path, byte_offset, header_signature, file_id=None,
+                               data_signature=None):
+        self._enable_wal()
+        raw = self.engine.raw_connection()
+        conn = raw.driver_connection
+        try:
+            self._ensure_checkpoint_table(conn)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if len(df):
+                    # The same conversion as bulk_load, so appended rows match the rest of a typed table.
+                    _, specs = self._prepare_bulk_table(conn, df, table_name, 'append', False, False,
+                                                        keep_indexes=True)
+                    if specs is not None:
+                        self._extend_categories(conn, table_name, specs, _category_values(specs, df))
+                    first_rowid = self._max_rowid(conn, table_name) + 1
+                    columns = ', '.join(quote_identifier(column) for column in df.columns)
+                    insert = (f"INSERT INTO {quote_identifier(table_name)} ({columns}) "
+                              f"VALUES ({', '.join('?' * len(df.columns))})")
+                    for start in range(0, len(df), _BULK_BATCH_ROWS):
+                        conn.executemany(insert, _sql_rows(df.iloc[start:start + _BULK_BATCH_ROWS], specs))
+                    self._record_ingested_rows(conn, file_path, table_name, first_rowid,
+                                               self._max_rowid(conn, table_name))
+                conn.execute(f"INSERT OR REPLACE INTO {self.CHECKPOINT_TABLE} (file_path, byte_offset, "
+                             "header_signature, updated_at, file_id, data_signature) "
+                             "VALUES (?, ?, ?, CURRENT_TIMESTAMP, ?, ?)",
+                             (file_path, byte_offset, header_signature, file_id, data_signature))
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        finally:
+            raw.close()
+        if len(df):
+            self._notify_write(table_name)
+        logger.info(f"{len(df)} rows appended to table {table_name} (checkpoint {byte_offset} for {file_path})")
+
+    def reset_ingest_checkpoint(self, file_path, delete_rows=False):
+        self._enable_wal()
+        raw = self.engine.raw_connection()
+        conn = raw.driver_connection
+        deleted = {}
+        try:
+            self._ensure_checkpoint_table(conn)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                spans = conn.execute(f"SELECT table_name, first_rowid, last_rowid FROM {self.INGESTED_ROWS_TABLE} "
+                                     "WHERE file_path = ?", (file_path,)).fetchall()
+                for table_name, first_rowid, last_rowid in spans if delete_rows else ():
+                    if _table_exists(conn, table_name):
+                        count = conn.execute(f"DELETE FROM {quote_identifier(table_name)} "
+                                             "WHERE rowid BETWEEN ? AND ?", (first_rowid, last_rowid)).rowcount
+                        deleted[table_name] = deleted.get(table_name, 0) + count
+                conn.execute(f"DELETE FROM {self.INGESTED_ROWS_TABLE} WHERE file_path = ?", (file_path,))
+                conn.execute(f"DELETE FROM {self.CHECKPOINT_TABLE} WHERE file_path = ?", (file_path,))
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        finally:
+            raw.close()
+        for table_name in deleted:
+            self._notify_write(table_name)
+        logger.info(f"Ingest checkpoint of {file_path} reset ({sum(deleted.values())} rows deleted)")
+        return sum(deleted.values())
+
+    @staticmethod
+    def _max_rowid(conn, table_name):
+        return conn.execute(f"SELECT MAX(rowid) FROM {quote_identifier(table_name)}").fetchone()[0] or 0
+
+    def _record_ingested_rows(self, conn, file_path, table_name, first_rowid, last_rowid):
+        """Record the rowids a file's rows were given, extending the file's last span when they follow on from it."""
+        extended = conn.execute(f"UPDATE {self.INGESTED_ROWS_TABLE} SET last_rowid = ? "
+                                "WHERE file_path = ? AND table_name = ? AND last_rowid = ?",
+                                (last_rowid, file_path, table_name, first_rowid - 1)).rowcount
+        if not extended:
+            conn.execute(f"INSERT INTO {self.INGESTED_ROWS_TABLE} (file_path, table_name, first_rowid, last_rowid) "
+                         "VALUES (?, ?, ?, ?)", (file_path, table_name, first_rowid, last_rowid))
+
+
+def _load_rowid_range(db_name, table_name, columns, start, end):
+    """Read the rows of a table whose rowid is in [start, end] (runs in a worker)."""
+    handler = SQLiteHandler(db_name)
+    try:
+        frame = handler.lazy_table(table_name)
+        if columns is not None:
+            frame = frame.select(columns)
+        return frame.filter('rowid BETWEEN ? AND ?', start, end).order_by('rowid').collect()
+    finally:
+        handler.close_connection()
+
+
+def _align_null_parts(parts):
+    """Give columns that are entirely NULL within one range the dtype the other ranges read them as."""
+    for column in parts[0].columns:
+        dtypes = {part[column].dtype for part in parts if part[column].notna().any()}
+        if len(dtypes) != 1:
+            continue
+        dtype = dtypes.pop()
+        if dtype.kind not in 'iufmM':
+            continue
+        target = np.float64 if dtype.kind in 'iu' else dtype
+        for part in parts:
+            if part[column].dtype == object and part[column].isna().all():
+                part[column] = part[column].astype(target)
+    return parts
+
+
+def _sql_rows(df, specs=None):
+    """
+    Convert a DataFrame to row tuples of values sqlite3 can bind, stored the way to_sql stores them, or for a typed
+    table the way its catalog specs describe.
+    """
+    columns = []
+    for column, series in df.items():
+        spec = specs.get(column) if specs else None
+        if spec is not None and spec['dtype'] in ('datetime64[ns]', 'timedelta64[ns]'):
+            if isinstance(series.dtype, pd.DatetimeTZDtype):
+                series = series.dt.tz_convert('UTC').dt.tz_localize(None)
+            elif spec['dtype'] == 'datetime64[ns]':
+                series = pd.to_datetime(series)
+            else:
+                series = pd.to_timedelta(series)
+            values = pd.Series(series.to_numpy().view('int64'), index=series.index).astype(object)
+        elif pd.api.types.is_datetime64_any_dtype(series):
+            values = series.dt.strftime('%Y-%m-%d %H:%M:%S.%f')
+        elif pd.api.types.is_timedelta64_dtype(series):
+            values = series.astype('int64').astype(object)
+        elif pd.api.types.is_bool_dtype(series) and not pd.api.types.is_extension_array_dtype(series):
+            values = series.astype('int64')
+        else:
+            values = series.astype(object)
+        columns.append(values.where(series.notna(), None).tolist())
+    return zip(*columns)
+
+
+def _table_exists(conn, table_name):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                        (table_name,)).fetchone() is not None
+
+
+def _write_lock(engine):
+    with _WRITE_LOCKS_GUARD:
+        lock = _WRITE_LOCKS.get(engine)
+        if lock is None:
+            lock = _WRITE_LOCKS[engine] = threading.Lock()
+    return lock
+
+
+def _category_values(specs, df):
+    """The distinct values of a chunk's categorical columns, for a typed table's catalog."""
+    return {column: pd.unique(df[column].dropna()) for column, spec in specs.items()
+            if spec['dtype'] == 'category' and column in df}
+
+
+class _StagedChunks:
+    """
+    The rows of a bulk load, converted to SQL values and written to a private temporary database file, so that pulling
+    and parsing the chunks never holds the target database's write lock. specs_for(head) is called with the first
+    chunk and returns the dtype catalog the rows are converted for.
+    """
+
+    def __init__(self, chunks, specs_for, directory=None):
+        fd, self.path = tempfile.mkstemp(prefix='.plato_stage_', suffix='.db', dir=directory)
+        os.close(fd)
+        self.head, self.specs, self.categories, self.rows = None, None, {}, 0
+        conn = sqlite3.connect(self.path)
+        try:
+            # The file is thrown away after the load, so it needs no journal or fsync.
+            conn.execute("PRAGMA journal_mode=OFF")
+            conn.execute("PRAGMA synchronous=OFF")
+            insert = None
+            for chunk in chunks:
+                if insert is None:
+                    self.head = chunk.head(0)
+                    self.specs = specs_for(chunk)
+                    # Untyped columns keep every value as bound; the target table's affinities apply on the copy.
+                    columns = ', '.join(quote_identifier(column) for column in chunk.columns)
+                    conn.execute(f"CREATE TABLE {_STAGE_TABLE} ({columns})")
+                    insert = f"INSERT INTO {_STAGE_TABLE} ({columns}) VALUES ({', '.join('?' * len(chunk.columns))})"
+                if self.specs is not None:
+                    for column, values in _category_values(self.specs, chunk).items():
+                        self.categories.setdefault(column, {}).update(dict.fromkeys(values))
+                for start in range(0, len(chunk), _BULK_BATCH_ROWS):
+                    conn.executemany(insert, _sql_rows(chunk.iloc[start:start + _BULK_BATCH_ROWS], self.specs))
+                self.rows += len(chunk)
+            conn.commit()
+        except BaseException:
+            conn.close()
+            self.discard()
+            raise
+        conn.close()
+
+    def discard(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _query_stats(seconds, rows, size, cached=False):
+    return {'seconds': seconds, 'rows': rows, 'bytes': size, 'cached': cached}
+
+
+def _column_type(series):
+    """Return the SQLite column type and the catalog spec of a typed table column."""
+    dtype = series.dtype
+    if isinstance(dtype, pd.DatetimeTZDtype):
+        return 'INTEGER', {'dtype': 'datetime64[ns]', 'tz': str(dtype.tz)}
+    if pd.api.types.is_datetime64_dtype(dtype):
+        return 'INTEGER', {'dtype': 'datetime64[ns]'}
+    if pd.api.types.is_timedelta64_dtype(dtype):
+        return 'INTEGER', {'dtype': 'timedelta64[ns]'}
+    if pd.api.types.is_bool_dtype(dtype):
+        return 'INTEGER', {'dtype': 'bool'}
+    if isinstance(dtype, pd.CategoricalDtype):
+        categories = dtype.categories
+        if all(isinstance(value, (str, int, float, np.integer, np.floating)) for value in categories):
+            sql_type = ('INTEGER' if pd.api.types.is_integer_dtype(categories)
+                        else 'REAL' if pd.api.types.is_float_dtype(categories) else 'TEXT')
+            return sql_type, {'dtype': 'category', 'categories': [_json_scalar(value) for value in categories],
+                              'ordered': bool(dtype.ordered)}
+        return 'TEXT', {'dtype': 'object'}
+    if pd.api.types.is_integer_dtype(dtype):
+        return 'INTEGER', {'dtype': str(dtype)}
+    if pd.api.types.is_float_dtype(dtype):
+        return 'REAL', {'dtype': str(dtype)}
+    if pd.api.types.is_string_dtype(dtype) and str(dtype) == 'string':
+        return 'TEXT', {'dtype': 'string'}
+    return 'TEXT', {'dtype': 'object'}
+
+
+def _json_scalar(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _read_catalog(conn, catalog_table, table_name):
+    try:
+        rows = conn.execute(f"SELECT column_name, spec FROM {catalog_table} WHERE table_name = ? ORDER BY position",
+                            (table_name,)).fetchall()
+    except sqlite3.OperationalError:
+        # No typed table has been created in this database yet.
+        return None
+    return {column: json.loads(spec) for column, spec in rows} or None
+
+
+def _typed_array(values):
+    """Build the narrowest of int64, float64 or object arrays that holds a column of sqlite3 values."""
+    kinds = set(map(type, values))
+    has_null = type(None) in kinds
+    kinds.discard(type(None))
+    if kinds <= {int} and not has_null:
+        try:
+            return np.array(values, dtype=np.int64)
+        except OverflowError:
+            pass
+    elif kinds <= {int, float}:
+        return np.array(values, dtype=np.float64)
+    return np.array(values, dtype=object)
+
+
+def _concat_parts(parts):
+    """Join a column's chunk arrays; all-NULL chunks are given as row counts and filled to suit the other chunks."""
+    arrays = [part for part in parts if not isinstance(part, int)]
+    if not arrays:
+        return np.full(sum(parts), None, dtype=object)
+    dtype = np.result_type(*arrays)
+    if len(arrays) < len(parts) and dtype == np.int64:
+        dtype = np.dtype(np.float64)
+    fill = None if dtype == object else np.nan
+    return np.concatenate([np.full(part, fill, dtype=dtype) if isinstance(part, int) else part for part in parts])
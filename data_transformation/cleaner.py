@@ -1,11 +1,27 @@
-import pandas as pd
+import functools
 import numpy as np
+from data_transformation.cleaning_plan import (CleaningPlan, convert_column, fill_value, fills, min_max_scale,
+                                               outlier_mask, z_scale)
+from data_transformation.column_executor import ColumnExecutor
+from data_transformation.streaming_stats import MAX_MODE_CANDIDATES, fit_cleaning
 from utils.logger import logger
+from utils.ownership import take_ownership
 
 # Setting up logging
 logger.setLevel("INFO")
 
 
+def _deferrable(method):
+    """In lazy mode, record the call in the cleaner's plan instead of running it."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self._steps is None:
+            return method(self, *args, **kwargs)
+        self._steps.append((method.__name__, args, kwargs))
+        return self
+    return wrapper
+
+
 class DataCleaner:
     """
     DataCleaner Class
@@ -17,7 +33,17 @@ class DataCleaner:
 
     Methods
     -------
-    - __init__: Constructor takes in the input DataFrame and creates a copy for cleaning.
+    - __init__: Constructor takes in the input DataFrame and creates a copy for cleaning (unless copy=False). With
+        lazy=True, the cleaning methods only record themselves and get_cleaned_data() runs them as one CleaningPlan,
+        which reads each column only where a step needs it and builds the result once, without copying the whole frame
+        at every step. The result is the same as running the methods eagerly, and the input frame is left unchanged.
+        With max_workers above 1 (or None for the number of CPUs), fill_missing_values and convert_data_types process
+        the columns in parallel with a ColumnExecutor: numeric columns on threads, object columns on processes.
+    - clean_chunks(cls, chunks, steps): This class method applies a sequence of cleaning steps to every DataFrame in an
+        iterable of chunks, yielding the cleaned chunks one at a time.
+    - fit(cls, chunks, steps): This class method computes the column statistics of a sequence of cleaning steps over a
+        re-iterable source of chunks, so that the returned FittedCleaning cleans a table larger than memory chunk by
+        chunk with the same result as cleaning it whole.
     - remove_duplicates(self, subset=None, keep='first'): This method removes duplicate rows based on some subset of columns.
         By default, it keeps the first occurrence of the duplicate.
     - fill_missing_values(self, strategy='mean', columns=None): This method fills missing values with mean, median, mode or any
@@ -25,22 +51,80 @@ class DataCleaner:
     - drop_missing_values(self, columns=None, how='any'): This method drops rows with missing values. It allows selection of
         specific columns and dropping strategy (any or all).
     - replace_values(self, to_replace, value, columns=None): This method replaces specific values in selected columns.
-    - remove_outliers(self, columns=None, method='IQR', factor=1.5): This method removes outliers from the DataFrame using either
-        the IQR method or the Z-score method.
+    - remove_outliers(self, columns=None, method='IQR', factor=1.5, approximate=False): This method removes outliers from the
+        DataFrame using either the IQR method or the Z-score method. With approximate=True, the IQR quartiles come from
+        a mergeable KLL quantile sketch.
     - convert_data_types(self, columns, target_type, **kwargs): This method converts data types of the specified columns to the
         target data type. Additionally, dtype-specific keyword arguments can be provided.
     - normalize_data(self, columns=None): This method scales the specified columns of the DataFrame so that they have a minimum of
         0 and a maximum of 1.
     - standardize_data(self, columns=None): This method standardizes the specified columns of the DataFrame so they have a mean of
         0 and a standard deviation of 1.
-    - get_cleaned_data(self): This method returns the cleaned DataFrame.
+    - get_cleaned_data(self): This method returns the cleaned DataFrame, running the recorded steps first in lazy mode.
 
     Log messages are generated after each cleaning operation to track the changes to the data.
     """
 
-    def __init__(self, df):
-        self.df = df.copy()
+    def __init__(self, df, copy=True, lazy=False, max_workers=1):
+        # A lazy plan never writes to its input, so the copy is deferred to the plan's result.
+        self.df = take_ownership(df, copy and not lazy)
+        self._copy = copy
+        self._steps = [] if lazy else None
+        self._executor = ColumnExecutor(max_workers)
+
+    @classmethod
+    def clean_chunks(cls, chunks, steps):
+        """
+        Apply a sequence of cleaning steps to each DataFrame in an iterable of chunks.
+
+        Chunks are cleaned in place rather than copied, so a stream such as CSVLoader.iter_csv can be cleaned while
+        holding only one chunk at a time. Steps that rely on column statistics (mean/mode filling, outlier removal,
+        normalization, standardization) compute those statistics per chunk.
 
+        Parameters:
+            chunks (iterable): DataFrame chunks to clean.
+            steps (list): (method_name, kwargs) pairs naming the DataCleaner methods to apply, in order.
+
+        Returns:
+            generator: The cleaned chunks (pd.DataFrame), cleaned as they are read. Unknown step names raise a
+            ValueError right away, before any chunk is read.
+        """
+        for name, _ in steps:
+            if name.startswith('_') or name == 'get_cleaned_data' or not callable(getattr(cls, name, None)):
+                raise ValueError(f"Unknown cleaning step: {name}")
+
+        def cleaned():
+            for chunk in chunks:
+                cleaner = cls(chunk, copy=False)
+                for name, kwargs in steps:
+                    getattr(cleaner, name)(**kwargs)
+                yield cleaner.get_cleaned_data()
+        return cleaned()
+
+    @classmethod
+    def fit(cls, chunks, steps, max_mode_candidates=MAX_MODE_CANDIDATES):
+        """
+        Fit a sequence of cleaning steps over all the chunks of a table, for cleaning it chunk by chunk afterwards.
+
+        Unlike clean_chunks, which computes statistics per chunk, fill_missing_values ('mean' or 'mode'),
+        normalize_data and standardize_data use the statistics of the whole table, accumulated in streaming passes
+        with mergeable ColumnStats, and so does remove_outliers with the IQR method, whose fences come from KLL
+        quantile sketches of the whole table (as with approximate=True). Row-local steps (drop_missing_values,
+        replace_values, convert_data_types and constant fills) are supported as well; remove_duplicates, Z-score
+        outlier removal and median fills need the whole frame and raise a ValueError.
+
+        Parameters:
+            chunks: A re-iterable source of chunks: a list, or a callable returning a new iterator of chunks on every
+                call, such as lambda: loader.iter_csv(path).
+            steps (list): (method_name, kwargs) pairs naming the DataCleaner methods to apply, in order.
+            max_mode_candidates (int): The distinct values per column for which 'mode' fills stay exact.
+
+        Returns:
+            FittedCleaning: Its apply(chunks) yields the cleaned chunks.
+        """
+        return fit_cleaning(chunks, steps, max_mode_candidates)
+
+    @_deferrable
     def remove_duplicates(self, subset=None, keep='first'):
         """
         Remove duplicate rows from the DataFrame.
@@ -56,20 +140,21 @@ class DataCleaner:
         logger.info("Duplicates removed")
         return self
 
+    @_deferrable
     def fill_missing_values(self, strategy='mean', columns=None):
         if columns is None:
             columns = self.df.columns
-
-        if strategy in ['mean', 'median']:
-            self.df[columns] = self.df[columns].apply(
-                lambda x: x.fillna(x.mean()) if pd.api.types.is_numeric_dtype(x) else x)
-        elif strategy == 'mode':
-            self.df[columns] = self.df[columns].apply(lambda x: x.fillna(x.mode()[0]))
-        else:
-            self.df[columns].fillna(strategy, inplace=True)
-
+        # Whether a column has missing values is checked by fill_value, on the executor's workers.
+        columns = [column for column in ([columns] if isinstance(columns, str) else columns)
+                   if fills(column, self.df[column].dtype, strategy)]
+
+        values = self._executor.map(fill_value, [self.df[column] for column in columns], strategy)
+        for column, value in zip(columns, values):
+            if value is not None:
+                self.df[column] = self.df[column].fillna(value)
         return self
 
+    @_deferrable
     def drop_missing_values(self, columns=None, how='any'):
         """
         Drop rows with missing values.
@@ -85,13 +170,15 @@ class DataCleaner:
         logger.info(f"Rows with missing values dropped ({how})")
         return self
 
+    @_deferrable
     def replace_values(self, to_replace, value, columns=None):
         if columns is None:
             columns = self.df.columns
         self.df[columns] = self.df[columns].replace(to_replace, value)
         return self
 
-    def remove_outliers(self, columns=None, method='IQR', factor=1.5):
+    @_deferrable
+    def remove_outliers(self, columns=None, method='IQR', factor=1.5, approximate=False):
         """
         Remove outliers from the DataFrame.
 
@@ -99,6 +186,8 @@ class DataCleaner:
             columns (list or str): Specific columns to check for outliers. If None, applies to all numeric columns.
             method (str): Method to use for outlier detection ('IQR' or 'Z-score').
             factor (float): Factor for the method used. For 'IQR', it multiplies the IQR. For 'Z-score', it is the threshold.
+            approximate (bool): For 'IQR', take the quartiles from a KLLSketch of each column (rank error about 1.65%)
+                instead of an exact quantile.
 
         Returns:
             DataCleaner: self (to allow method chaining).
@@ -106,28 +195,11 @@ class DataCleaner:
         if columns is None:
             columns = self.df.select_dtypes(include=[np.number]).columns
 
-        if method == 'IQR':
-            Q1 = self.df[columns].quantile(0.25)
-            Q3 = self.df[columns].quantile(0.75)
-            IQR = Q3 - Q1
-
-            if isinstance(columns, list):
-                self.df = self.df[
-                    ~((self.df[columns] < (Q1 - factor * IQR)) | (self.df[columns] > (Q3 + factor * IQR))).any(axis=1)]
-            else:  # Modify this section to treat Series.
-                self.df = self.df[
-                    ~((self.df[columns] < (Q1 - factor * IQR)) | (self.df[columns] > (Q3 + factor * IQR)))]
-
-        elif method == 'Z-score':
-            from scipy import stats
-            z_scores = np.abs(stats.zscore(self.df[columns]))
-            self.df = self.df[(z_scores < factor).all(axis=1)]
-        else:
-            raise ValueError(f"Unknown method: {method}")
-
+        self.df = self.df[np.asarray(outlier_mask(self.df[columns], method, factor, approximate), dtype=bool)]
         logger.info(f"Outliers removed using {method} method")
         return self
 
+    @_deferrable
     def convert_data_types(self, columns, target_type, **kwargs):
         """
         Convert the data type of specified columns.
@@ -140,13 +212,12 @@ class DataCleaner:
         Returns:
             DataCleaner: self (to allow method chaining).
         """
-        for column in columns:
-            if target_type == 'datetime':
-                self.df[column] = pd.to_datetime(self.df[column], **kwargs)
-            else:
-                self.df[column] = self.df[column].astype(target_type)
+        converted = self._executor.map(convert_column, [self.df[column] for column in columns], target_type, **kwargs)
+        for column, values in zip(columns, converted):
+            self.df[column] = values
         return self
 
+    @_deferrable
     def normalize_data(self, columns=None):
         """
         Normalize data in the DataFrame.
@@ -160,11 +231,11 @@ class DataCleaner:
         if columns is None:
             columns = self.df.select_dtypes(include=[np.number]).columns
 
-        self.df[columns] = (self.df[columns] - self.df[columns].min()) / (
-                self.df[columns].max() - self.df[columns].min())
+        self.df[columns] = min_max_scale(self.df[columns])
         logger.info(f"Data normalized for columns: {columns}")
         return self
 
+    @_deferrable
     def standardize_data(self, columns=None):
         """
         Standardize data in the DataFrame.
@@ -178,7 +249,7 @@ class DataCleaner:
         if columns is None:
             columns = self.df.select_dtypes(include=[np.number]).columns
 
-        self.df[columns] = (self.df[columns] - self.df[columns].mean()) / self.df[columns].std()
+        self.df[columns] = z_scale(self.df[columns])
         logger.info(f"Data standardized for columns: {columns}")
         return self
 
@@ -189,4 +260,7 @@ class DataCleaner:
         Returns:
             pd.DataFrame: The cleaned DataFrame.
         """
+        if self._steps is not None and (self._steps or self._copy):
+            self.df = CleaningPlan(self._steps, self._executor).execute(self.df, copy=self._copy)
+            self._steps, self._copy = [], False
         return self.df
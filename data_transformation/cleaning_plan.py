@@ -0,0 +1,296 @@
+import numpy as np
+import pandas as pd
+from data_transformation.column_executor import ColumnExecutor
+from data_transformation.quantile_sketch import KLLSketch
+from utils.logger import logger
+from utils.ownership import take_ownership
+
+_QUARTILES = [0.25, 0.75]
+
+
+class CleaningPlan:
+    """
+    CleaningPlan Class
+    ------------------
+
+    This class executes a recorded chain of DataCleaner steps as one fused operation. DataCleaner(df, lazy=True) builds
+    one and runs it from get_cleaned_data().
+
+    The input frame is never modified and is not copied up front. Rows removed by remove_duplicates,
+    drop_missing_values and remove_outliers are tracked as positions into the input, and each step reads only the
+    columns it needs at the current positions. Columns rewritten by a step are kept as separate Series, filtered along
+    with the positions. The result is assembled once at the end: the untouched columns are taken from the input in a
+    single pass and the rewritten ones are inserted. Statistics are computed only for the columns and rows a step
+    uses: columns without missing values are not filled, the quartiles of remove_outliers come from one quantile call
+    and normalize_data reads each minimum once.
+
+    Every step computes exactly what the eager DataCleaner method computes on the same data, so the result is the
+    same as running the chain eagerly.
+
+    Methods
+    -------
+    - __init__(self, steps, executor=None): Takes (method_name, args, kwargs) tuples naming DataCleaner methods, in
+        order, and the ColumnExecutor that fills and converts columns (in the calling thread by default). The step
+        scale_columns(offsets, scales), which computes (column - offset) / scale for every column in offsets, applies
+        statistics computed beforehand (see streaming_stats.fit_cleaning), as does keep_within(lower, upper), which keeps
+        the rows with no value outside the fences given per column.
+    - execute(self, df, copy=True): Runs the steps on df and returns the cleaned DataFrame. With copy=False, an empty
+        plan returns df itself.
+    """
+
+    def __init__(self, steps, executor=None):
+        for name, _, _ in steps:
+            if name not in _STEPS:
+                raise ValueError(f"Unknown cleaning step: {name}")
+        self.steps = list(steps)
+        self.executor = executor or ColumnExecutor(max_workers=1)
+
+    def execute(self, df, copy=True):
+        state = _PlanState(df, self.executor)
+        for name, args, kwargs in self.steps:
+            _STEPS[name](state, *args, **kwargs)
+        result = state.result(copy)
+        logger.info(f"Cleaning plan of {len(self.steps)} steps executed: {len(df)} -> {len(result)} rows")
+        return result
+
+
+class _PlanState:
+    """The rows kept so far (positions into the input, or None for all) and the columns rewritten so far."""
+
+    def __init__(self, df, executor):
+        self.df = df
+        self.executor = executor
+        self.rows = None
+        self.columns = {}
+        self._taken = {}
+
+    def get(self, column):
+        if column in self.columns:
+            return self.columns[column]
+        if self.rows is None:
+            return self.df[column]
+        if column not in self._taken:
+            self._taken[column] = self.df[column].take(self.rows)
+        return self._taken[column]
+
+    def frame(self, columns):
+        if not any(column in self.columns for column in columns):
+            if self.rows is None:
+                return self.df[columns]
+            return self.df.iloc[self.rows, self.df.columns.get_indexer(columns)]
+        return pd.DataFrame({column: self.get(column) for column in columns})
+
+    def values(self, columns):
+        """A Series for a single column name, as DataFrame[str] gives, otherwise a DataFrame."""
+        return self.get(columns) if isinstance(columns, str) else self.frame(list(columns))
+
+    def set(self, column, values):
+        self.columns[column] = values
+        self._taken.pop(column, None)
+
+    def set_values(self, values):
+        if isinstance(values, pd.Series):
+            self.set(values.name, values)
+        else:
+            for column in values.columns:
+                self.set(column, values[column])
+
+    def dtype(self, column):
+        return (self.columns[column] if column in self.columns else self.df[column]).dtype
+
+    def has_missing(self, column):
+        if column in self.columns:
+            return self.columns[column].hasnans
+        # A column with no missing values in the input has none in any subset of its rows.
+        return self.df[column].hasnans and self.isna(column).any()
+
+    def isna(self, column):
+        if column in self.columns:
+            return self.columns[column].isna().to_numpy()
+        missing = self.df[column].isna().to_numpy()
+        return missing if self.rows is None else missing[self.rows]
+
+    def numeric_columns(self):
+        empty = pd.DataFrame({column: (self.columns[column] if column in self.columns else self.df[column]).iloc[:0]
+                              for column in self.df.columns})
+        return empty.select_dtypes(include=[np.number]).columns
+
+    def keep(self, mask):
+        mask = np.asarray(mask, dtype=bool)
+        if mask.all():
+            return
+        positions = np.arange(len(self.df)) if self.rows is None else self.rows
+        self.rows = positions[mask]
+        self.columns = {column: values[mask] for column, values in self.columns.items()}
+        self._taken = {}
+
+    def result(self, copy):
+        if not self.columns:
+            if self.rows is not None:
+                return self.df.take(self.rows)
+            return take_ownership(self.df, copy)
+        # Selecting the untouched columns copies them once; the rewritten columns are new already.
+        result = self.frame([column for column in self.df.columns if column not in self.columns])
+        for position, column in enumerate(self.df.columns):
+            if column in self.columns:
+                result.insert(position, column, self.columns[column])
+        return result
+
+
+def fill_column(values, strategy):
+    """Fill the missing values of one column the way DataCleaner.fill_missing_values does."""
+    value = fill_value(values, strategy)
+    return values if value is None else values.fillna(value)
+
+
+def fills(column, dtype, strategy):
+    """Whether fill_missing_values fills a column of this name and dtype, should it have missing values."""
+    if isinstance(strategy, str) and strategy in ('mean', 'median'):
+        return pd.api.types.is_numeric_dtype(dtype)
+    return column in strategy if isinstance(strategy, dict) else True
+
+
+def fill_value(values, strategy):
+    """The value fill_column fills one column with, or None when the column is left as it is."""
+    if not values.hasnans:
+        return None
+    if isinstance(strategy, str) and strategy in ('mean', 'median'):
+        return getattr(values, strategy)() if pd.api.types.is_numeric_dtype(values) else None
+    if isinstance(strategy, str) and strategy == 'mode':
+        return values.mode()[0]
+    if isinstance(strategy, dict):
+        return strategy.get(values.name)
+    return strategy
+
+
+def outlier_mask(values, method, factor, approximate=False):
+    """
+    Return a boolean mask of the rows of a DataFrame (or Series) that remove_outliers keeps.
+
+    With approximate=True, the quartiles of the IQR method come from a KLLSketch of each column instead of an exact
+    quantile; the Z-score method is always exact.
+    """
+    if method == 'IQR':
+        quartiles = sketch_quartiles(values) if approximate else values.quantile([0.25, 0.75])
+        q1, q3 = quartiles.loc[0.25], quartiles.loc[0.75]
+        iqr = q3 - q1
+        return fence_mask(values, q1 - factor * iqr, q3 + factor * iqr)
+    if method == 'Z-score':
+        from scipy import stats
+        z_scores = np.abs(stats.zscore(values))
+        return (z_scores < factor).all(axis=1) if np.ndim(z_scores) == 2 else z_scores < factor
+    raise ValueError(f"Unknown method: {method}")
+
+
+def fence_mask(values, lower, upper):
+    """Return a boolean mask of the rows with no value below lower or above upper (scalars, or Series by column)."""
+    outside = (values < lower) | (values > upper)
+    return ~(outside.any(axis=1) if isinstance(outside, pd.DataFrame) else outside)
+
+
+def sketch_quartiles(values):
+    """The approximate quartiles of a Series, or of each column of a DataFrame, in the layout of quantile()."""
+    if isinstance(values, pd.Series):
+        return pd.Series(KLLSketch().update(values).quantile(_QUARTILES), index=_QUARTILES, name=values.name)
+    return pd.DataFrame({column: KLLSketch().update(values[column]).quantile(_QUARTILES) for column in values.columns},
+                        index=_QUARTILES, columns=values.columns)
+
+
+def convert_column(values, target_type, **kwargs):
+    if target_type == 'datetime':
+        return pd.to_datetime(values, **kwargs)
+    return values.astype(target_type)
+
+
+def min_max_scale(values):
+    low = values.min()
+    return (values - low) / (values.max() - low)
+
+
+def z_scale(values):
+    return (values - values.mean()) / values.std()
+
+
+def _as_list(columns):
+    return [columns] if isinstance(columns, str) else list(columns)
+
+
+def _remove_duplicates(state, subset=None, keep='first'):
+    if state.rows is None and not state.columns:
+        state.keep(~state.df.duplicated(subset=subset, keep=keep))
+        return
+    columns = state.df.columns if subset is None else _as_list(subset)
+    state.keep(~state.frame(list(columns)).duplicated(keep=keep))
+
+
+def _fill_missing_values(state, strategy='mean', columns=None):
+    columns = [column for column in (state.df.columns if columns is None else _as_list(columns))
+               if fills(column, state.dtype(column), strategy) and state.has_missing(column)]
+    for column, value in zip(columns, state.executor.map(fill_value, [state.get(column) for column in columns],
+                                                         strategy)):
+        if value is not None:
+            state.set(column, state.get(column).fillna(value))
+
+
+def _drop_missing_values(state, columns=None, how='any'):
+    if how not in ('any', 'all'):
+        raise ValueError(f"invalid how option: {how}")
+    columns = state.df.columns if columns is None else _as_list(columns)
+    missing = [state.isna(column) for column in columns]
+    if missing:
+        stacked = np.column_stack(missing)
+        state.keep(~stacked.any(axis=1) if how == 'any' else ~stacked.all(axis=1))
+
+
+def _replace_values(state, to_replace, value, columns=None):
+    columns = state.df.columns if columns is None else columns
+    state.set_values(state.values(columns).replace(to_replace, value))
+
+
+def _remove_outliers(state, columns=None, method='IQR', factor=1.5, approximate=False):
+    columns = state.numeric_columns() if columns is None else columns
+    state.keep(outlier_mask(state.values(columns), method, factor, approximate))
+
+
+def _convert_data_types(state, columns, target_type, **kwargs):
+    converted = state.executor.map(convert_column, [state.get(column) for column in columns], target_type, **kwargs)
+    for column, values in zip(columns, converted):
+        state.set(column, values)
+
+
+def _normalize_data(state, columns=None):
+    columns = state.numeric_columns() if columns is None else columns
+    state.set_values(min_max_scale(state.values(columns)))
+
+
+def _standardize_data(state, columns=None):
+    columns = state.numeric_columns() if columns is None else columns
+    state.set_values(z_scale(state.values(columns)))
+
+
+def _scale_columns(state, offsets, scales):
+    dtype = getattr(offsets, 'dtype', None)
+    for column, offset in offsets.items():
+        values = state.get(column)
+        if isinstance(dtype, np.dtype) and isinstance(values.dtype, np.dtype) and values.dtype != dtype:
+            # Frame arithmetic in the eager methods promotes each column to the common dtype of the statistics.
+            values = values.astype(np.promote_types(values.dtype, dtype))
+        state.set(column, (values - offset) / scales[column])
+
+
+def _keep_within(state, lower, upper):
+    state.keep(fence_mask(state.frame(list(lower.index)), lower, upper))
+
+
+_STEPS = {
+    'remove_duplicates': _remove_duplicates,
+    'fill_missing_values': _fill_missing_values,
+    'drop_missing_values': _drop_missing_values,
+    'replace_values': _replace_values,
+    'remove_outliers': _remove_outliers,
+    'convert_data_types': _convert_data_types,
+    'normalize_data': _normalize_data,
+    'standardize_data': _standardize_data,
+    'scale_columns': _scale_columns,
+    'keep_within': _keep_within,
+}
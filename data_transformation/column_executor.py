@@ -0,0 +1,77 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+# Below this many cells, columns are processed in the calling thread: starting the pools costs more than it saves.
+MIN_PARALLEL_CELLS = 200000
+# Tasks per process, so columns of uneven cost still spread evenly while each pickling round trip carries several.
+_TASKS_PER_WORKER = 4
+
+
+class ColumnExecutor:
+    """
+    ColumnExecutor Class
+    --------------------
+
+    This class runs a function over many columns in parallel, with each column processed independently. Columns of
+    numpy dtypes go to a thread pool: their kernels (reductions, hashing, fillna) release the GIL, so threads scale
+    with the cores without copying any data. Columns of Python objects (object and string dtypes) go to a process pool
+    instead, since every operation on them holds the GIL; they are sent in batches of several columns per task, and
+    only the function's results come back. Both pools are started per call and only for enough work: with one
+    worker, or fewer than min_cells cells in total, the columns are processed in the calling thread.
+
+    The function and its arguments must be picklable (a module-level function) for the process pool. Inside a daemon
+    process, such as a worker of another pool, the object columns go to the thread pool too.
+
+    Methods
+    -------
+    - __init__(self, max_workers=None, use_processes=True, min_cells=MIN_PARALLEL_CELLS): max_workers defaults to the
+        number of CPUs; use_processes=False runs every column in the thread pool.
+    - map(self, func, columns, *args, **kwargs): Returns [func(column, *args, **kwargs) for column in columns], a
+        list of the results in the order of the columns (Series).
+    """
+
+    def __init__(self, max_workers=None, use_processes=True, min_cells=MIN_PARALLEL_CELLS):
+        self.max_workers = max_workers or os.cpu_count()
+        self.use_processes = use_processes
+        self.min_cells = min_cells
+
+    def map(self, func, columns, *args, **kwargs):
+        columns = list(columns)
+        if self.max_workers < 2 or len(columns) < 2 or sum(len(column) for column in columns) < self.min_cells:
+            return [func(column, *args, **kwargs) for column in columns]
+        use_processes = self.use_processes and not multiprocessing.current_process().daemon
+        pooled = [idx for idx, column in enumerate(columns) if use_processes and _holds_gil(column)]
+        threaded = [idx for idx, column in enumerate(columns) if not (use_processes and _holds_gil(column))]
+        results = [None] * len(columns)
+        processes = None
+        try:
+            if pooled:
+                # The process pool forks its workers before any thread starts, so no lock is held in the forked copies.
+                batches = np.array_split(pooled, min(len(pooled), self.max_workers * _TASKS_PER_WORKER))
+                processes = ProcessPoolExecutor(max_workers=min(self.max_workers, len(batches)))
+                batch_futures = [(batch, processes.submit(_run_batch, func, [columns[idx] for idx in batch], args,
+                                                          kwargs)) for batch in batches]
+            if threaded:
+                with ThreadPoolExecutor(max_workers=min(self.max_workers, len(threaded))) as threads:
+                    for idx, result in zip(threaded, threads.map(lambda idx: func(columns[idx], *args, **kwargs),
+                                                                 threaded)):
+                        results[idx] = result
+            if pooled:
+                for batch, future in batch_futures:
+                    for idx, result in zip(batch, future.result()):
+                        results[idx] = result
+        finally:
+            if processes is not None:
+                processes.shutdown(cancel_futures=True)
+        return results
+
+
+def _holds_gil(column):
+    return column.dtype == object or isinstance(column.dtype, pd.StringDtype)
+
+
+def _run_batch(func, columns, args, kwargs):
+    return [func(column, *args, **kwargs) for column in columns]
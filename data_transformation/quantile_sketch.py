@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+
+# The capacity of the top compactor. A quantile's rank error is about 3.3 / k (1.65% at k=200) with 99% confidence.
+DEFAULT_K = 200
+# Each compactor holds 2/3 of the items of the one above it, down to _MIN_CAPACITY.
+_SHRINK = 2 / 3
+_MIN_CAPACITY = 2
+
+
+class KLLSketch:
+    """
+    KLLSketch Class
+    ---------------
+
+    This class is a KLL quantile sketch (Karnin, Lang and Liberty): it summarizes a stream of numbers in a few
+    kilobytes, however long the stream is, and answers quantile queries within a bounded rank error. A sketch merges
+    with the sketches of other chunks, streams or processes, and the merged sketch has the same error guarantee as one
+    sketch of all the values.
+
+    Values are kept in compactors, one per level, and each value at level h stands for 2**h input values. When a
+    compactor holds more than its capacity, it is sorted and every other value (starting at a random one of the first
+    two) moves up a level. The top compactor holds k values and the ones below hold 2/3 of the one above, so the sketch
+    retains under 3k values. Missing values are ignored. Until the first compaction the sketch holds every value, and
+    quantile() is exact and interpolated as Series.quantile() does.
+
+    Methods
+    -------
+    - __init__(self, k=DEFAULT_K, seed=None): Creates an empty sketch. A larger k lowers the error (about 3.3 / k of
+        the count, in rank) and raises the memory used; seed makes the compactions reproducible.
+    - update(self, values): Adds a Series or array of numbers; returns self.
+    - merge(self, other): Adds the values summarized by another sketch of the same k; returns self.
+    - quantile(self, q): Returns the approximate q-quantile (a float), or an array for a list of quantiles. It is NaN
+        for an empty sketch.
+
+    Attributes
+    ----------
+    - count: The number of values added.
+    - min, max: The smallest and largest value added (exact), NaN for an empty sketch.
+    - nbytes: The memory held by the retained values.
+    """
+
+    def __init__(self, k=DEFAULT_K, seed=None):
+        if k < _MIN_CAPACITY:
+            raise ValueError(f"k must be at least {_MIN_CAPACITY}")
+        self.k = k
+        self.count = 0
+        self.min = float('nan')
+        self.max = float('nan')
+        self._levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        if isinstance(values, pd.Series):
+            values = values.to_numpy(dtype=float, na_value=np.nan)
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if values.size:
+            self.count += values.size
+            self.min = float(np.fmin(self.min, values.min()))
+            self.max = float(np.fmax(self.max, values.max()))
+            self._levels[0] = np.concatenate([self._levels[0], values])
+            self._compress()
+        return self
+
+    def merge(self, other):
+        if other.k != self.k:
+            raise ValueError(f"Cannot merge a sketch of k={other.k} into one of k={self.k}")
+        for level, values in enumerate(other._levels):
+            if level == len(self._levels):
+                self._levels.append(np.empty(0))
+            self._levels[level] = np.concatenate([self._levels[level], values])
+        self.count += other.count
+        self.min = float(np.fmin(self.min, other.min))
+        self.max = float(np.fmax(self.max, other.max))
+        self._compress()
+        return self
+
+    def quantile(self, q):
+        quantiles = np.atleast_1d(np.asarray(q, dtype=float))
+        if ((quantiles < 0) | (quantiles > 1)).any():
+            raise ValueError("Quantiles must be between 0 and 1")
+        if not self.count:
+            result = np.full(len(quantiles), np.nan)
+        elif len(self._levels) == 1:
+            result = np.quantile(self._levels[0], quantiles)
+        else:
+            values = np.concatenate(self._levels)
+            weights = np.concatenate([np.full(len(level_values), 2 ** level, dtype=np.int64)
+                                      for level, level_values in enumerate(self._levels)])
+            order = np.argsort(values, kind='stable')
+            values, ranks = values[order], np.cumsum(weights[order])
+            # The first retained value whose weighted rank reaches q * count.
+            result = values[np.minimum(np.searchsorted(ranks, quantiles * self.count), len(values) - 1)]
+            result = np.where(quantiles == 0, self.min, np.where(quantiles == 1, self.max, result))
+        return float(result[0]) if np.ndim(q) == 0 else result
+
+    @property
+    def nbytes(self):
+        return sum(level_values.nbytes for level_values in self._levels)
+
+    def _capacity(self, level):
+        return max(_MIN_CAPACITY, int(np.ceil(self.k * _SHRINK ** (len(self._levels) - level - 1))))
+
+    def _compress(self):
+        while True:
+            full = next((level for level, values in enumerate(self._levels) if len(values) > self._capacity(level)),
+                        None)
+            if full is None:
+                return
+            self._compact(full)
+
+    def _compact(self, level):
+        # New values arrive unsorted at level 0; above it, a stable sort is fast on the sorted runs that compactions
+        # and merges leave behind.
+        values = np.sort(self._levels[level], kind='quicksort' if level == 0 else 'stable')
+        paired = len(values) - len(values) % 2
+        if level + 1 == len(self._levels):
+            self._levels.append(np.empty(0))
+        self._levels[level + 1] = np.concatenate([self._levels[level + 1],
+                                                  values[self._rng.integers(2):paired:2]])
+        self._levels[level] = values[paired:]
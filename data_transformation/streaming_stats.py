@@ -0,0 +1,319 @@
+import heapq
+import numpy as np
+import pandas as pd
+from data_transformation.cleaning_plan import CleaningPlan
+from data_transformation.quantile_sketch import KLLSketch
+from utils.logger import logger
+
+# Distinct values a column's mode candidates are exact for; beyond this only the most frequent ones are kept.
+MAX_MODE_CANDIDATES = 4096
+# Steps that need column statistics, and the strategies of fill_missing_values that do.
+_STAT_STEPS = ('fill_missing_values', 'normalize_data', 'standardize_data', 'remove_outliers')
+_STAT_STRATEGIES = ('mean', 'mode')
+# Steps that only look at one row at a time.
+_ROW_STEPS = ('fill_missing_values', 'drop_missing_values', 'replace_values', 'convert_data_types')
+_ALL = None
+
+
+class ColumnStats:
+    """
+    ColumnStats Class
+    -----------------
+
+    This class accumulates the statistics of one column over a stream of chunks in a single pass, and merges with the
+    ColumnStats of other chunks, streams or processes: the merged result is the same as accumulating everything in one
+    place.
+
+    Moments use Welford's update per chunk and Chan's parallel combination between chunks, so they stay accurate over
+    billions of rows. Mode candidates are exact value counts while the column has at most max_mode_candidates distinct
+    values; past that only the max_mode_candidates most frequent values seen so far are kept, so mode() is then exact
+    only for a value frequent enough to stay among them in every chunk. Quantiles come from a KLLSketch, kept with
+    track_quantiles=True.
+
+    Methods
+    -------
+    - __init__(self, track_modes=False, max_mode_candidates=MAX_MODE_CANDIDATES, track_quantiles=False): Creates empty
+        statistics. Values are counted for mode() only with track_modes=True, and sketched for quantile() only with
+        track_quantiles=True.
+    - update(self, values): Adds a Series of values; returns self.
+    - merge(self, other): Adds the statistics of another ColumnStats; returns self.
+    - mode(self): Returns the most frequent value (the smallest one on ties, as Series.mode()[0]), or None.
+    - quantile(self, q): Returns the approximate q-quantile (or an array for a list of quantiles) of a numeric column.
+
+    Attributes
+    ----------
+    - count: The number of non-missing values.
+    - nulls: The number of missing values.
+    - mean, var, std: The mean, and the sample variance and standard deviation (ddof=1) of numeric columns.
+    - min, max: The smallest and largest value of numeric columns.
+    """
+
+    def __init__(self, track_modes=False, max_mode_candidates=MAX_MODE_CANDIDATES, track_quantiles=False):
+        self.track_modes = track_modes
+        self.max_mode_candidates = max_mode_candidates
+        self.count = 0
+        self.nulls = 0
+        self.mean = float('nan')
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+        self.numeric = None
+        self.dtype = None
+        self.candidates = {}
+        self.sketch = KLLSketch() if track_quantiles else None
+
+    def update(self, values):
+        present = values.dropna()
+        other = ColumnStats(self.track_modes, self.max_mode_candidates)
+        other.count, other.nulls = len(present), len(values) - len(present)
+        other.numeric = pd.api.types.is_numeric_dtype(values)
+        other.dtype = values.dtype
+        if other.numeric and other.count:
+            numbers = present.astype(float) if pd.api.types.is_bool_dtype(present) else present
+            other.mean = float(numbers.mean())
+            other.m2 = float(((numbers - other.mean) ** 2).sum())
+            other.min, other.max = present.min(), present.max()
+        if self.track_modes and other.count:
+            other.candidates = present.value_counts(sort=False).to_dict()
+        if self.sketch is not None and other.numeric:
+            self.sketch.update(present)
+        return self.merge(other)
+
+    def merge(self, other):
+        if other.count:
+            if self.numeric is not False and other.numeric:
+                total = self.count + other.count
+                if self.count:
+                    delta = other.mean - self.mean
+                    self.mean += delta * other.count / total
+                    self.m2 += other.m2 + delta * delta * self.count * other.count / total
+                    self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+                else:
+                    self.mean, self.m2, self.min, self.max = other.mean, other.m2, other.min, other.max
+            if self.track_modes:
+                for value, count in other.candidates.items():
+                    self.candidates[value] = self.candidates.get(value, 0) + count
+                self._prune()
+            if self.sketch is not None and other.sketch is not None:
+                self.sketch.merge(other.sketch)
+        if other.numeric is not None:
+            self.numeric = other.numeric if self.numeric is None else self.numeric and other.numeric
+            self.dtype = other.dtype
+        self.count += other.count
+        self.nulls += other.nulls
+        return self
+
+    @property
+    def var(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else float('nan')
+
+    @property
+    def std(self):
+        return self.var ** 0.5
+
+    def mode(self):
+        if not self.candidates:
+            return None
+        top = max(self.candidates.values())
+        tied = [value for value, count in self.candidates.items() if count == top]
+        try:
+            return min(tied)
+        except TypeError:
+            return min(tied, key=str)
+
+    def quantile(self, q):
+        if self.sketch is None:
+            raise ValueError("Quantiles are only kept by ColumnStats(track_quantiles=True)")
+        return self.sketch.quantile(q)
+
+    def _prune(self):
+        if len(self.candidates) > self.max_mode_candidates:
+            self.candidates = dict(heapq.nlargest(self.max_mode_candidates, self.candidates.items(),
+                                                  key=lambda item: item[1]))
+
+
+class FittedCleaning:
+    """
+    FittedCleaning Class
+    --------------------
+
+    This class holds a chain of DataCleaner steps whose column statistics were computed over a whole stream by
+    fit_cleaning(). Every step is row-local once fitted, so the chain is applied chunk by chunk and the cleaned chunks
+    concatenate to the same frame as cleaning the concatenated input.
+
+    Methods
+    -------
+    - transform(self, chunk): Returns the cleaned copy of one chunk.
+    - apply(self, chunks): Yields the cleaned chunks of an iterable of chunks (or of a callable returning one).
+
+    Attributes
+    ----------
+    - steps: The fitted (method_name, args, kwargs) steps, with statistics filled in.
+    - stats: For each original step, the ColumnStats per column it was fitted with (empty for row-local steps).
+    - passes: The number of passes over the input the fit took.
+    """
+
+    def __init__(self, steps, stats, passes):
+        self.steps = steps
+        self.stats = stats
+        self.passes = passes
+        self._plan = CleaningPlan(steps)
+
+    def transform(self, chunk):
+        return self._plan.execute(chunk, copy=True)
+
+    def apply(self, chunks):
+        for chunk in chunks() if callable(chunks) else chunks:
+            yield self.transform(chunk)
+
+
+def fit_cleaning(chunks, steps, max_mode_candidates=MAX_MODE_CANDIDATES):
+    """
+    Compute the column statistics of a chain of cleaning steps over a stream of chunks.
+
+    Statistics for fill_missing_values ('mean' or 'mode'), normalize_data, standardize_data and remove_outliers (IQR
+    fences from the KLL quartiles) are accumulated with ColumnStats, on the chunks as the earlier steps of the chain
+    leave them. Consecutive steps share one pass over the
+    input as long as none of them reads a column that an earlier step of the pass still has to rewrite, so a chain over
+    disjoint columns is fitted in a single pass however long it is.
+
+    Parameters:
+        chunks: A re-iterable source of DataFrame chunks, such as a list, or a callable returning a new iterator of
+            chunks on every call (e.g. lambda: loader.iter_csv(path)).
+        steps (list): (method_name, kwargs) pairs naming the DataCleaner methods to apply, in order.
+        max_mode_candidates (int): The distinct values per column for which the mode stays exact.
+
+    Returns:
+        FittedCleaning: The fitted chain.
+    """
+    for name, kwargs in steps:
+        _check_streamable(name, kwargs)
+    fitted, stats, passes = [], [], 0
+    group, pending = [], set()
+    for name, kwargs in list(steps) + [(None, {})]:
+        reads = _step_columns(kwargs) if name is not None else _ALL
+        if pending and (reads is _ALL or _ALL in pending or pending & set(reads)):
+            passes += 1
+            group_stats = _collect(chunks, fitted, group, max_mode_candidates)
+            for (group_name, group_kwargs), column_stats in zip(group, group_stats):
+                if _needs_stats(group_name, group_kwargs):
+                    fitted.append(_resolve(group_name, group_kwargs, column_stats))
+                else:
+                    fitted.append((group_name, (), dict(group_kwargs)))
+                stats.append(column_stats)
+            group, pending = [], set()
+        if name is None:
+            break
+        if _needs_stats(name, kwargs):
+            group.append((name, kwargs))
+            columns = _step_columns(kwargs)
+            # Rows an outlier step removes are only known after its pass, so every later step waits for the next one.
+            pending |= {_ALL} if columns is _ALL or name == 'remove_outliers' else set(columns)
+        elif group:
+            group.append((name, kwargs))
+        else:
+            fitted.append((name, (), dict(kwargs)))
+            stats.append({})
+    logger.info(f"Cleaning steps fitted over {passes} passes of the input")
+    return FittedCleaning(fitted, stats, passes)
+
+
+def _check_streamable(name, kwargs):
+    if name not in _STAT_STEPS + _ROW_STEPS:
+        raise ValueError(f"Cleaning step {name} needs the whole frame and cannot be fitted over chunks")
+    strategy = kwargs.get('strategy', 'mean')
+    if name == 'fill_missing_values' and isinstance(strategy, str) and strategy == 'median':
+        raise ValueError("The median has no exact single-pass statistic; fill with 'mean' or 'mode' instead")
+    if name == 'remove_outliers' and kwargs.get('method', 'IQR') != 'IQR':
+        raise ValueError("Only the IQR method of remove_outliers can be fitted over chunks")
+
+
+def _needs_stats(name, kwargs):
+    if name == 'fill_missing_values':
+        strategy = kwargs.get('strategy', 'mean')
+        return isinstance(strategy, str) and strategy in _STAT_STRATEGIES
+    return name in _STAT_STEPS
+
+
+def _step_columns(kwargs):
+    columns = kwargs.get('columns')
+    if columns is None:
+        return _ALL
+    return [columns] if isinstance(columns, str) else list(columns)
+
+
+def _collect(chunks, fitted, group, max_mode_candidates):
+    prefix = CleaningPlan(fitted) if fitted else None
+    group_stats = [{} for _ in group]
+    for chunk in _iterate(chunks):
+        frame = prefix.execute(chunk, copy=False) if prefix is not None else chunk
+        for (name, kwargs), column_stats in zip(group, group_stats):
+            if not _needs_stats(name, kwargs):
+                frame = CleaningPlan([(name, (), kwargs)]).execute(frame, copy=False)
+                continue
+            track_modes = name == 'fill_missing_values' and kwargs.get('strategy', 'mean') == 'mode'
+            for column in _stat_columns(name, kwargs, frame):
+                column_stats.setdefault(column, ColumnStats(track_modes, max_mode_candidates,
+                                                            name == 'remove_outliers')).update(frame[column])
+    return group_stats
+
+
+def _stat_columns(name, kwargs, frame):
+    columns = _step_columns(kwargs)
+    if columns is not _ALL:
+        return columns
+    if name == 'fill_missing_values':
+        return list(frame.columns)
+    return list(frame.select_dtypes(include='number').columns)
+
+
+def _resolve(name, kwargs, column_stats):
+    """Turn a step that needs statistics into a row-local step with the statistics filled in."""
+    if name == 'fill_missing_values':
+        values = {}
+        for column, stats in column_stats.items():
+            if kwargs.get('strategy', 'mean') == 'mean':
+                if stats.numeric:
+                    values[column] = stats.mean
+            elif stats.count:
+                values[column] = stats.mode()
+            elif stats.nulls:
+                raise ValueError(f"Column {column} has no values to take the mode of")
+        return 'fill_missing_values', (), {'strategy': values, 'columns': list(values)}
+    if name == 'remove_outliers':
+        factor = kwargs.get('factor', 1.5)
+        quartiles = pd.DataFrame({column: stats.quantile([0.25, 0.75]) for column, stats in column_stats.items()},
+                                 index=[0.25, 0.75], columns=list(column_stats), dtype=float)
+        iqr = quartiles.loc[0.75] - quartiles.loc[0.25]
+        return 'keep_within', (), {'lower': quartiles.loc[0.25] - factor * iqr,
+                                   'upper': quartiles.loc[0.75] + factor * iqr}
+    # As Series, the statistics get the common dtype that DataFrame.min() or .mean() gives them in the eager methods,
+    # and so do the scaled columns.
+    if name == 'normalize_data':
+        offsets = pd.Series({column: stats.min for column, stats in column_stats.items()}, dtype=_common(column_stats))
+        scales = pd.Series({column: stats.max for column, stats in column_stats.items()}, dtype=_common(column_stats))
+        scales -= offsets
+    else:
+        dtype = _common(column_stats, moments=True)
+        offsets = pd.Series({column: stats.mean for column, stats in column_stats.items()}, dtype=dtype)
+        scales = pd.Series({column: stats.std for column, stats in column_stats.items()}, dtype=dtype)
+    return 'scale_columns', (), {'offsets': offsets, 'scales': scales}
+
+
+def _common(column_stats, moments=False):
+    dtypes = [stats.dtype for stats in column_stats.values() if stats.dtype is not None]
+    if moments:
+        # Means and deviations of float32 columns stay float32; those of integer columns are float64.
+        dtypes = [np.float32 if dtype == np.float32 else np.float64 for dtype in dtypes]
+    try:
+        return np.result_type(*dtypes) if dtypes else np.float64
+    except TypeError:
+        return np.float64
+
+
+def _iterate(chunks):
+    if callable(chunks):
+        return iter(chunks())
+    if iter(chunks) is chunks:
+        raise ValueError("chunks must be re-iterable: pass a list, or a callable returning a new iterator of chunks")
+    return iter(chunks)
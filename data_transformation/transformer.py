@@ -3,6 +3,7 @@ import numpy as np
 from category_encoders import OneHotEncoder, OrdinalEncoder
 from sklearn.preprocessing import MinMaxScaler
 from utils.logger import logger
+from utils.ownership import take_ownership
 
 # Setting up logging
 logger.setLevel("INFO")
@@ -18,10 +19,13 @@ class DataTransformer:
 
     Instance Attributes:
         df (pd.DataFrame): The DataFrame to process. It is a copy of the original DataFrame to prevent any unwanted
-            alterations to the original data.
+            alterations to the original data, unless the instance is created with copy=False.
 
     Class Methods:
-        __init__(self, df): Initializes the instance and creates a copy of the input DataFrame.
+        __init__(self, df, copy=True): Initializes the instance and creates a copy of the input DataFrame.
+
+        transform_chunks(cls, chunks, steps): Applies a sequence of transformation steps to every DataFrame in an
+            iterable of chunks, yielding the transformed chunks one at a time.
 
         encode_labels(self, columns): Label encodes the data of the specified columns in the DataFrame.
 
@@ -52,8 +56,37 @@ class DataTransformer:
         transformation steps.
     """
 
-    def __init__(self, df):
-        self.df = df.copy()
+    def __init__(self, df, copy=True):
+        self.df = take_ownership(df, copy)
+
+    @classmethod
+    def transform_chunks(cls, chunks, steps):
+        """
+        Apply a sequence of transformation steps to each DataFrame in an iterable of chunks.
+
+        Chunks are transformed in place rather than copied. Encoders and scalers are fitted per chunk, so steps such
+        as encode_labels or scale_data only give consistent results across chunks when each chunk sees the same
+        values; row-wise steps such as log_transform and apply_custom_transform are always safe.
+
+        Parameters:
+            chunks (iterable): DataFrame chunks to transform.
+            steps (list): (method_name, kwargs) pairs naming the DataTransformer methods to apply, in order.
+
+        Returns:
+            generator: The transformed chunks (pd.DataFrame), transformed as they are read. Unknown step names raise a
+            ValueError right away, before any chunk is read.
+        """
+        for name, _ in steps:
+            if name.startswith('_') or name == 'get_transformed_data' or not callable(getattr(cls, name, None)):
+                raise ValueError(f"Unknown transformation step: {name}")
+
+        def transformed():
+            for chunk in chunks:
+                transformer = cls(chunk, copy=False)
+                for name, kwargs in steps:
+                    getattr(transformer, name)(**kwargs)
+                yield transformer.get_transformed_data()
+        return transformed()
 
     def encode_labels(self, columns):
         """
@@ -59,6 +59,97 @@ class TestDataCleaner(unittest.TestCase):
         self.assertAlmostEqual(cleaned_data['D'].mean(), 0.0, places=8)  # 0.0 mean
         self.assertAlmostEqual(cleaned_data['D'].std(), 1.0, places=8)  # 1.0 std dev
 
+    def test_clean_chunks(self):
+        chunks = [self.data.iloc[:3].copy(), self.data.iloc[3:].copy()]
+        cleaned = list(DataCleaner.clean_chunks(chunks, [('drop_missing_values', {}),
+                                                         ('replace_values', {'to_replace': 'foo', 'value': 'spam'})]))
+        self.assertEqual(len(cleaned), 2)
+        self.assertIs(cleaned[1], chunks[1])
+        self.assertEqual(pd.concat(cleaned)['A'].tolist(), ['spam', 'spam', 'bar', 'bar'])
+
+    def test_fill_missing_values_constant(self):
+        self.cleaner.fill_missing_values(strategy=0.0, columns=['C'])
+        self.assertEqual(self.cleaner.get_cleaned_data()['C'].tolist(), [1.0, 0.0, 2.5, -3.0, 2.3])
+
+    def test_remove_outliers_drops_rows(self):
+        data = pd.DataFrame({'x': [1.0, 2.0, 3.0, 2.0, 100.0], 'y': ['a', 'b', 'c', 'd', 'e']})
+        cleaned = DataCleaner(data).remove_outliers().get_cleaned_data()
+        self.assertEqual(cleaned['y'].tolist(), ['a', 'b', 'c', 'd'])
+
+    def test_lazy_matches_eager(self):
+        data = pd.concat([self.data, self.data.iloc[:2]], ignore_index=True)
+        chains = [
+            [('remove_duplicates', (), {}), ('fill_missing_values', (), {}), ('remove_outliers', (), {}),
+             ('standardize_data', (), {})],
+            [('drop_missing_values', (), {}), ('replace_values', ('foo', 'spam'), {}), ('normalize_data', (['C', 'D'],), {}),
+             ('remove_duplicates', (), {'subset': ['A', 'B']})],
+            [('fill_missing_values', (), {'strategy': 'median'}), ('convert_data_types', (['D'], 'float32'), {}),
+             ('remove_outliers', ('C',), {'factor': 0.5}), ('fill_missing_values', (), {'strategy': 'mode'})],
+        ]
+        for chain in chains:
+            eager, lazy = DataCleaner(data), DataCleaner(data, lazy=True)
+            for name, args, kwargs in chain:
+                getattr(eager, name)(*args, **kwargs)
+                self.assertIs(getattr(lazy, name)(*args, **kwargs), lazy)
+            pd.testing.assert_frame_equal(lazy.get_cleaned_data(), eager.get_cleaned_data())
+        self.assertEqual(len(data), 7)
+        self.assertTrue(data['C'].isna().any())
+
+    def test_lazy_without_steps_copies(self):
+        cleaned = DataCleaner(self.data, lazy=True).get_cleaned_data()
+        self.assertIsNot(cleaned, self.data)
+        pd.testing.assert_frame_equal(cleaned, self.data)
+
+    def test_fit_matches_eager(self):
+        rng = np.random.default_rng(0)
+        data = pd.DataFrame({'x': np.where(rng.random(500) < 0.1, np.nan, rng.normal(size=500)),
+                             'y': rng.integers(0, 4, 500), 'z': rng.choice(['p', 'q', None], 500)})
+        chunks = [data.iloc[start:start + 120] for start in range(0, 500, 120)]
+        steps = [('fill_missing_values', {'strategy': 'mode', 'columns': ['z']}), ('standardize_data', {'columns': ['y']}),
+                 ('fill_missing_values', {'columns': ['x']}), ('normalize_data', {'columns': ['x']}),
+                 ('drop_missing_values', {})]
+        fitted = DataCleaner.fit(lambda: iter(chunks), steps)
+        eager = DataCleaner(data)
+        for name, kwargs in steps:
+            getattr(eager, name)(**kwargs)
+        pd.testing.assert_frame_equal(pd.concat(fitted.apply(chunks)), eager.get_cleaned_data())
+        self.assertEqual(fitted.passes, 2)
+        self.assertAlmostEqual(fitted.stats[1]['y'].mean, data['y'].mean())
+
+    def test_remove_outliers_approximate(self):
+        rng = np.random.default_rng(0)
+        data = pd.DataFrame({'x': np.concatenate([rng.integers(0, 100, 20000), [1000, -1000]]).astype(float),
+                             'y': rng.integers(0, 100, 20002)})
+        exact = DataCleaner(data).remove_outliers().get_cleaned_data()
+        pd.testing.assert_frame_equal(DataCleaner(data).remove_outliers(approximate=True).get_cleaned_data(), exact)
+        chunks = [data.iloc[start:start + 3000] for start in range(0, len(data), 3000)]
+        fitted = DataCleaner.fit(chunks, [('remove_outliers', {}), ('normalize_data', {'columns': ['x']})])
+        pd.testing.assert_frame_equal(pd.concat(fitted.apply(chunks)),
+                                      DataCleaner(exact).normalize_data(columns=['x']).get_cleaned_data())
+        self.assertEqual(fitted.passes, 2)
+
+    def test_parallel_matches_sequential(self):
+        data = pd.concat([self.data] * 3, axis=1, keys=['p', 'q', 'r'])
+        data.columns = [f'{group}{column}' for group, column in data.columns]
+        cleaned = DataCleaner(data).fill_missing_values('mode').convert_data_types(['pD', 'qD'], 'float32')
+        for lazy in (False, True):
+            parallel = DataCleaner(data, lazy=lazy, max_workers=2)
+            parallel._executor.min_cells = 0
+            parallel.fill_missing_values('mode').convert_data_types(['pD', 'qD'], 'float32')
+            pd.testing.assert_frame_equal(parallel.get_cleaned_data(), cleaned.get_cleaned_data())
+
+    def test_fit_rejects_whole_frame_steps(self):
+        for steps in ([('remove_duplicates', {})], [('fill_missing_values', {'strategy': 'median'})],
+                      [('remove_outliers', {'method': 'Z-score'})]):
+            with self.assertRaises(ValueError):
+                DataCleaner.fit([self.data], steps)
+        with self.assertRaises(ValueError):
+            DataCleaner.fit(iter([self.data]), [('normalize_data', {})])
+
+    def test_clean_chunks_unknown_step(self):
+        with self.assertRaises(ValueError):
+            DataCleaner.clean_chunks([self.data], [('get_cleaned_data', {})])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+import numpy as np
+import pandas as pd
+from data_transformation.cleaning_plan import fill_value
+from data_transformation.column_executor import ColumnExecutor
+
+
+class TestColumnExecutor(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.columns = [pd.Series(np.where(rng.random(1000) < 0.1, np.nan, rng.normal(size=1000)), name='x'),
+                        pd.Series(rng.choice(['a', 'b', None], 1000), name='y'),
+                        pd.Series(rng.integers(0, 5, 1000), name='z'),
+                        pd.Series(rng.choice(['c', 'd', None], 1000), dtype='string', name='w')]
+
+    def test_map_matches_sequential(self):
+        expected = [fill_value(column, 'mode') for column in self.columns]
+        for use_processes in (True, False):
+            executor = ColumnExecutor(max_workers=2, use_processes=use_processes, min_cells=0)
+            self.assertEqual(executor.map(fill_value, self.columns, 'mode'), expected)
+
+    def test_kwargs_and_order(self):
+        executor = ColumnExecutor(max_workers=3, min_cells=0)
+        results = executor.map(pd.Series.astype, self.columns[:3] * 3, dtype='string')
+        self.assertEqual([values.name for values in results], ['x', 'y', 'z'] * 3)
+        self.assertTrue(all(values.dtype == 'string' for values in results))
+
+    def test_small_input_runs_inline(self):
+        calls = []
+        ColumnExecutor(max_workers=4).map(lambda column: calls.append(column.name), self.columns)
+        self.assertEqual(calls, ['x', 'y', 'z', 'w'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from data_storage.column_store import ColumnStore
+
+
+class TestColumnStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = ColumnStore(os.path.join(self.tmp.name, 'store'))
+        self.df = pd.DataFrame({
+            'id': np.arange(6, dtype=np.int32),
+            'score': np.linspace(0, 1, 6),
+            'active': [True, False] * 3,
+            'when': pd.date_range('2024-01-01', periods=6),
+            'name': ['a', 'b', None, 'a', 'c', 'b'],
+        })
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        self.assertEqual(self.store.write(self.df), 6)
+        opened = self.store.open()
+        pd.testing.assert_frame_equal(opened.drop(columns='name'), self.df.drop(columns='name'))
+        self.assertEqual(opened['name'].dtype, 'category')
+        self.assertEqual(opened['name'].astype(object).where(opened['name'].notna(), None).tolist(),
+                         self.df['name'].tolist())
+
+    def test_open_is_memory_mapped(self):
+        self.store.write(self.df)
+        opened = self.store.open()
+        self.assertIsInstance(opened['id'].to_numpy().base, np.memmap)
+        with self.assertRaises(ValueError):
+            opened.loc[0, 'id'] = 10
+
+    def test_write_chunks(self):
+        chunks = [self.df.iloc[:4], self.df.iloc[4:]]
+        self.assertEqual(self.store.write(iter(chunks)), 6)
+        opened = self.store.open(mmap_mode='c')
+        self.assertEqual(opened['id'].tolist(), list(range(6)))
+        self.assertEqual(list(opened['name'].cat.categories), ['a', 'b', 'c'])
+
+    def test_ordered_categorical_keeps_order(self):
+        df = pd.DataFrame({'size': pd.Categorical(['m', 's', 'l'], categories=['s', 'm', 'l'], ordered=True)})
+        self.store.write(df)
+        opened = self.store.open()['size']
+        self.assertEqual(opened.tolist(), ['m', 's', 'l'])
+        self.assertEqual(opened.dtype, df['size'].dtype)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import bz2
+import gzip
+import lzma
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from data_ingestion.compression import detect_compression, open_decompressed, ParallelGzipReader, _inflate_range
+from data_ingestion.csv_loader import CSVLoader
+
+
+class TestCompression(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.df = pd.DataFrame({'id': np.arange(3000), 'value': np.arange(3000) * 0.5,
+                                'name': [f'row{i}' for i in range(3000)]})
+        self.raw = self.df.to_csv(index=False).encode()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, name, data):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def _multi_member(self, name, pieces=20):
+        step = len(self.raw) // pieces + 1
+        return self._write(name, b''.join(gzip.compress(self.raw[i:i + step])
+                                          for i in range(0, len(self.raw), step)))
+
+    def test_detect_compression(self):
+        self.assertEqual(detect_compression(self._write('a', gzip.compress(self.raw))), 'gzip')
+        self.assertEqual(detect_compression(self._write('b', bz2.compress(self.raw))), 'bz2')
+        self.assertEqual(detect_compression(self._write('c', lzma.compress(self.raw))), 'xz')
+        self.assertIsNone(detect_compression(self._write('d.csv', self.raw)))
+        self.assertIsNone(detect_compression('missing.csv'))
+
+    def test_parallel_inflate_of_multi_member_gzip(self):
+        path = self._multi_member('data.csv.gz')
+        with open_decompressed(path, workers=2) as f:
+            self.assertIsInstance(f.raw, ParallelGzipReader)
+            self.assertEqual(f.read(), self.raw)
+        # Ranges much smaller than a member must still yield every member exactly once.
+        with ParallelGzipReader(path, workers=3, range_size=97) as f:
+            self.assertEqual(f.read(), self.raw)
+
+    def test_large_member_is_streamed_sequentially(self):
+        small = gzip.compress(self.raw[:1000])
+        path = self._write('cat.gz', small + gzip.compress(self.raw[1000:]))
+        # The range stops before the member that inflates past the bound instead of holding it.
+        self.assertEqual(_inflate_range(path, 0, len(small) + 10, 4096), (0, len(small), self.raw[:1000], False))
+        with ParallelGzipReader(path, workers=2, range_size=len(small) + 10, max_inflated=4096) as f:
+            self.assertEqual(f.read(), self.raw)
+            self.assertIsNotNone(f._sequential)
+        with open_decompressed(path, workers=2, max_inflated=4096) as f:
+            self.assertEqual(f.read(), self.raw)
+
+    def test_sequential_streams(self):
+        for name, compress in (('a.gz', gzip.compress), ('b.bz2', bz2.compress), ('c.xz', lzma.compress)):
+            with open_decompressed(self._write(name, compress(self.raw)), workers=2) as f:
+                self.assertEqual(f.read(), self.raw)
+
+    def test_corrupt_member_is_reported(self):
+        data = bytearray(open(self._multi_member('data.gz'), 'rb').read())
+        data[len(data) // 2] ^= 0xFF
+        with self.assertRaises(Exception):
+            with ParallelGzipReader(self._write('bad.gz', bytes(data)), workers=2, range_size=1024) as f:
+                f.read()
+
+    def test_csv_loader_reads_compressed_files(self):
+        loader = CSVLoader(db_name=':memory:', chunk_size=1000, decompress_workers=2)
+        # No extension: the compression comes from the magic bytes.
+        for path in (self._multi_member('export'), self._write('data.bz2.bin', bz2.compress(self.raw))):
+            pd.testing.assert_frame_equal(loader.load_csv(path), self.df)
+            pd.testing.assert_frame_equal(pd.concat(loader.iter_csv(path), ignore_index=True), self.df)
+        pd.testing.assert_frame_equal(loader.load_csv_parallel(self._multi_member('data.csv.gz')), self.df)
+        with self.assertRaises(ValueError):
+            loader.tail_csv(self._multi_member('log.csv.gz'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import asyncio
+import os
+import tempfile
+import unittest
+import pandas as pd
+from core.core import Core, load_data, load_data_async
+from data_storage import engine_registry
+from data_storage.sqlite_handler import SQLiteHandler
+
+
+class TestCoreAsync(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.core = Core(os.path.join(os.path.dirname(__file__), '..', 'config.json'), max_workers=4)
+        self.core.db_path = os.path.join(self.tmp.name, 'core.db')
+
+    def tearDown(self):
+        self.core.close()
+        self.tmp.cleanup()
+
+    def test_load_data_async(self):
+        paths = []
+        for idx in range(3):
+            path = os.path.join(self.tmp.name, f'part{idx}.csv')
+            pd.DataFrame({'value': range(idx + 1)}).to_csv(path, index=False)
+            paths.append(path)
+
+        async def load_all():
+            semaphore = asyncio.Semaphore(2)
+            return await asyncio.gather(*(load_data_async(path, semaphore=semaphore) for path in paths))
+
+        frames = asyncio.run(load_all())
+        self.assertEqual([len(df) for df in frames], [1, 2, 3])
+
+    def test_save_and_query_async(self):
+        async def save_then_query():
+            await asyncio.gather(*(self.core.save_to_sqlite_async(self.core.db_path, 'numbers',
+                                                                  pd.DataFrame({'n': [i]})) for i in range(5)))
+            return await asyncio.gather(*(self.core.query_data_async('SELECT COUNT(*) FROM numbers')
+                                          for _ in range(3)))
+
+        results = asyncio.run(save_then_query())
+        self.assertEqual([rows[0][0] for rows in results], [5, 5, 5])
+
+    def test_query_data_cache(self):
+        self.core._save_frame(pd.DataFrame({'n': [1, 2]}), self.core.db_path, 'numbers')
+        query = 'SELECT COUNT(*) FROM numbers'
+        self.assertEqual(self.core.query_data(query, use_cache=True)[0][0], 2)
+        self.assertEqual(self.core.query_data(query, use_cache=True)[0][0], 2)
+        self.assertEqual(self.core.query_cache.hits, 1)
+        self.core._save_frame(pd.DataFrame({'n': [3]}), self.core.db_path, 'numbers')
+        self.assertEqual(self.core.query_data(query, use_cache=True)[0][0], 3)
+
+    def test_close_releases_engines(self):
+        path = os.path.join(self.tmp.name, 'part.csv')
+        pd.DataFrame({'value': range(3)}).to_csv(path, index=False)
+        loader_key = (engine_registry.database_key('plato.db'), 5)
+        loader_references = engine_registry._references.get(loader_key)
+        for _ in range(3):
+            load_data(path)
+            self.core._save_frame(pd.DataFrame({'n': [1]}), self.core.db_path, 'numbers')
+            self.core.query_data('SELECT COUNT(*) FROM numbers')
+        key = (engine_registry.database_key(self.core.db_path), 5)
+        self.assertEqual(engine_registry._references[key], 1)
+        self.assertEqual(engine_registry._references.get(loader_key), loader_references)
+        self.core.close()
+        self.assertNotIn(key, engine_registry._references)
+
+    def test_close_closes_query_cache(self):
+        self.core._save_frame(pd.DataFrame({'n': [1]}), self.core.db_path, 'numbers')
+        self.core.query_data('SELECT COUNT(*) FROM numbers', use_cache=True)
+        cache = self.core.query_cache
+        self.assertTrue(any(watcher is not None for watcher in cache._watchers.values()))
+        self.core.close()
+        self.assertEqual(cache._watchers, {})
+        self.assertNotIn(cache._on_write, [ref() for ref in SQLiteHandler._listeners['write']])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,9 @@
+import os
+import sqlite3
+import tempfile
 import unittest
 from unittest import mock
+import openpyxl
 import pandas as pd
 from data_ingestion.crosstab_loader import CrosstabLoader
 
@@ -36,6 +40,85 @@ class TestCrosstabLoader(unittest.TestCase):
         expected_result = [mock_df, mock_df]
         self.assertEqual(result, expected_result)
 
+    def _write_workbook(self, path):
+        with pd.ExcelWriter(path) as writer:
+            pd.DataFrame({'a': range(5), 'b': list('vwxyz')}).to_excel(writer, sheet_name='first', index=False)
+            pd.DataFrame({'c': [1.5, 2.5]}).to_excel(writer, sheet_name='second', index=False)
+
+    def test_iter_sheet(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'book.xlsx')
+            self._write_workbook(path)
+            chunks = list(self.crosstab_loader.iter_sheet(path, 'first', chunk_size=2))
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+        self.assertEqual(pd.concat(chunks)['b'].tolist(), list('vwxyz'))
+
+    def test_iter_sheet_renames_duplicate_headers_like_read_excel(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'book.xlsx')
+            workbook = openpyxl.Workbook()
+            for row in (['a', 'a', 'a.1', None, 'a'], [1, 2, 3, 4, 5]):
+                workbook.active.append(row)
+            workbook.save(path)
+            chunks = list(self.crosstab_loader.iter_sheet(path, chunk_size=2))
+            expected = pd.read_excel(path)
+            loader = CrosstabLoader(os.path.join(tmp, 'book.db'))
+            rows = loader.stream_crosstab_to_db(path, table_name='book')
+            saved = loader.db_handler.load_table_to_dataframe('book')
+            loader.close()
+        self.assertEqual(list(chunks[0].columns), list(expected.columns))
+        self.assertEqual(rows, {'Sheet': 1})
+        self.assertEqual(list(saved.columns), ['a', 'a.2', 'a.1', 'Unnamed: 3', 'a.3'])
+
+    def test_load_multiple_crosstabs_parallel_to_db(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = [os.path.join(tmp, 'one.xlsx'), os.path.join(tmp, 'two.xlsx')]
+            for path in paths:
+                self._write_workbook(path)
+            db_path = os.path.join(tmp, 'crosstabs.db')
+            loader = CrosstabLoader(db_path)
+            result = loader.load_multiple_crosstabs(paths, save_to_db=True, parallel=True, max_workers=2)
+            with sqlite3.connect(db_path) as conn:
+                count = conn.execute('SELECT COUNT(*) FROM first').fetchone()[0]
+        self.assertEqual(result, [{'first': 5, 'second': 2}, {'first': 5, 'second': 2}])
+        self.assertEqual(count, 10)
+
+    def test_stream_crosstab_to_db_raises_on_failed_chunk(self):
+        def failing_chunks(*args):
+            yield pd.DataFrame({'a': [1, 2]})
+            yield pd.DataFrame({'a': [3], 'b': ['missing column']})
+
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, 'crosstabs.db')
+            loader = CrosstabLoader(db_path)
+            with mock.patch.object(loader, 'iter_sheet', side_effect=failing_chunks):
+                with self.assertRaises(sqlite3.Error):
+                    loader.stream_crosstab_to_db('book.xlsx', 'first')
+            loader.db_handler.close_connection()
+            with sqlite3.connect(db_path) as conn:
+                tables = conn.execute("SELECT name FROM sqlite_master WHERE name = 'first'").fetchall()
+        self.assertEqual(tables, [])
+
+    def test_stream_crosstab_to_db_reads_sheet_outside_write_lock(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, 'crosstabs.db')
+
+            def chunks_with_concurrent_write(*args):
+                yield pd.DataFrame({'a': [1, 2]})
+                # Another writer must not have to wait while the sheet is still being read.
+                with sqlite3.connect(db_path, timeout=0) as other:
+                    other.execute('CREATE TABLE other (x INTEGER)')
+                yield pd.DataFrame({'a': [3]})
+
+            loader = CrosstabLoader(db_path)
+            with mock.patch.object(loader, 'iter_sheet', side_effect=chunks_with_concurrent_write):
+                counts = loader.stream_crosstab_to_db('book.xlsx', 'first')
+            loader.close()
+            with sqlite3.connect(db_path) as conn:
+                rows = conn.execute('SELECT a FROM first').fetchall()
+        self.assertEqual(counts, {'first': 3})
+        self.assertEqual(rows, [(1,), (2,), (3,)])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,6 +1,12 @@
+import os
+import tempfile
+import time
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import Mock, patch
+import pandas as pd
 from data_ingestion import csv_loader
+from data_storage.sqlite_handler import SQLiteHandler
 
 
 class TestCSVLoader(unittest.TestCase):
@@ -42,6 +48,164 @@ class TestCSVLoader(unittest.TestCase):
         # Assert if save_dataframe_to_db has not been called.
         mock_sqlite_handler_instance.save_dataframe_to_db.assert_not_called()
 
+    @patch('data_ingestion.csv_loader.SQLiteHandler')
+    def test_iter_csv(self, mock_sqlite_handler):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'data.csv')
+            pd.DataFrame({'a': range(5), 'b': list('vwxyz')}).to_csv(path, index=False)
+            loader = csv_loader.CSVLoader(chunk_size=2)
+            chunks = list(loader.iter_csv(path))
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+        self.assertEqual(pd.concat(chunks)['b'].tolist(), list('vwxyz'))
+
+    def test_stream_csv_to_db(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'data.csv')
+            pd.DataFrame({'a': range(5)}).to_csv(path, index=False)
+            loader = csv_loader.CSVLoader(db_name=os.path.join(tmp, 'test.db'), chunk_size=2)
+            rows = loader.stream_csv_to_db(path, stages=[lambda chunks: (c[c['a'] % 2 == 0] for c in chunks)])
+            saved = loader.db_handler.load_table_to_dataframe('data')
+            loader.db_handler.close_connection()
+        self.assertEqual(rows, 3)
+        self.assertEqual(saved['a'].tolist(), [0, 2, 4])
+
+    def test_load_multiple_csvs_to_db_from_threads(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = []
+            for idx in range(4):
+                path = os.path.join(tmp, f'part{idx}.csv')
+                pd.DataFrame({'a': range(300)}).to_csv(path, index=False)
+                paths.append(path)
+            db_path = os.path.join(tmp, 'test.db')
+            loader = csv_loader.CSVLoader(db_name=db_path, chunk_size=50)
+            loader.db_handler.close_connection()
+            # Without a busy timeout, a write that waits on another thread's transaction fails at once.
+            loader.db_handler = SQLiteHandler(db_path, timeout=0)
+            loader.executor.shutdown()
+            loader.executor = ThreadPoolExecutor(max_workers=4)
+            iter_csv = loader.iter_csv
+
+            def slow_iter_csv(*args, **kwargs):
+                for chunk in iter_csv(*args, **kwargs):
+                    time.sleep(0.02)
+                    yield chunk
+
+            with patch.object(loader, 'iter_csv', side_effect=slow_iter_csv):
+                loader.load_multiple_csvs(paths, save_to_db=True)
+            counts = [loader.db_handler.execute_query(f'SELECT COUNT(*) FROM part{idx}')[0][0] for idx in range(4)]
+            loader.close()
+        self.assertEqual(counts, [300] * 4)
+
+    def test_load_csv_to_db_with_optimized_dtypes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'data.csv')
+            pd.DataFrame({'day': ['2024-01-01', '2024-01-02', '2024-01-03'], 'n': [1, 2, 3]}).to_csv(path, index=False)
+            loader = csv_loader.CSVLoader(db_name=os.path.join(tmp, 'test.db'), chunk_size=2)
+            loader.load_csv(path, save_to_db=True, optimize_dtypes=True, sample_rows=2)
+            saved = loader.db_handler.execute_query('SELECT day FROM data')
+            loader.db_handler.close_connection()
+        self.assertEqual(saved[0][0], '2024-01-01 00:00:00.000000')
+
+    @patch('data_ingestion.csv_loader.SQLiteHandler')
+    def test_load_csv_parallel(self, mock_sqlite_handler):
+        df = pd.DataFrame({'a': range(300), 'b': [1.5] * 299 + [None], 'c': ['1'] * 299 + ['x']})
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'data.csv')
+            df.to_csv(path, index=False)
+            loader = csv_loader.CSVLoader()
+            loaded = loader.load_csv_parallel(path, num_workers=3, min_range_size=100)
+            expected = pd.read_csv(path, low_memory=False)
+        pd.testing.assert_frame_equal(loaded, expected)
+        self.assertEqual(loaded['a'].tolist(), list(range(300)))
+        self.assertEqual(loaded['b'].isna().sum(), 1)
+        self.assertEqual(loaded['c'].tolist(), ['1'] * 299 + ['x'])
+
+    @patch('data_ingestion.csv_loader.SQLiteHandler')
+    def test_load_csv_parallel_with_single_dtype(self, mock_sqlite_handler):
+        df = pd.DataFrame({'a': range(300), 'day': ['2024-01-01'] * 299 + ['not a date']})
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'data.csv')
+            df.to_csv(path, index=False)
+            loader = csv_loader.CSVLoader()
+            loaded = loader.load_csv_parallel(path, num_workers=3, min_range_size=100, dtype=str)
+            expected = pd.read_csv(path, dtype=str)
+            # Only the last range fails to parse 'day' as dates, so it is re-parsed as text in every range.
+            dated = loader.load_csv_parallel(path, num_workers=3, min_range_size=100, dtype='string',
+                                             parse_dates=['day'])
+            expected_dated = pd.read_csv(path, dtype='string', parse_dates=['day'])
+        pd.testing.assert_frame_equal(loaded, expected)
+        pd.testing.assert_frame_equal(dated, expected_dated)
+
+    def test_load_csv_parallel_rejects_layout_kwargs(self):
+        loader = csv_loader.CSVLoader(db_name=':memory:')
+        with self.assertRaises(ValueError):
+            loader.load_csv_parallel('test.csv', skiprows=1)
+
+    def test_tail_csv_ingests_only_new_complete_lines(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'events.csv')
+            loader = csv_loader.CSVLoader(db_name=os.path.join(tmp, 'tail.db'))
+            with open(path, 'w') as f:
+                f.write('id,name\n1,a\n2,b\n3,c')
+            self.assertEqual(loader.tail_csv(path), 2)
+            self.assertEqual(loader.tail_csv(path), 0)
+            with open(path, 'a') as f:
+                f.write('\n4,d\n')
+            self.assertEqual(loader.tail_csv(path), 2)
+            rows = loader.db_handler.execute_query('SELECT id, name FROM events ORDER BY id')
+            loader.db_handler.close_connection()
+        self.assertEqual([tuple(row) for row in rows], [(1, 'a'), (2, 'b'), (3, 'c'), (4, 'd')])
+
+    def test_tail_csv_restarts_when_header_changes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'events.csv')
+            loader = csv_loader.CSVLoader(db_name=os.path.join(tmp, 'tail.db'))
+            with open(path, 'w') as f:
+                f.write('id\n1\n2\n')
+            loader.tail_csv(path)
+            with open(path, 'w') as f:
+                f.write('id,extra\n3,x\n')
+            with self.assertRaises(ValueError):
+                loader.tail_csv(path)
+            self.assertEqual(loader.tail_csv(path, table_name='rotated', on_replaced='append'), 1)
+            loader.db_handler.close_connection()
+
+    def test_tail_csv_replaces_rows_of_rewritten_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'events.csv')
+            loader = csv_loader.CSVLoader(db_name=os.path.join(tmp, 'tail.db'))
+            with open(path, 'w') as f:
+                f.write('id,name\n1,a\n2,b\n')
+            loader.tail_csv(path)
+            # Truncated and rewritten in place with the same header, longer than the checkpoint.
+            with open(path, 'w') as f:
+                f.write('id,name\n7,x\n8,y\n9,z\n')
+            with self.assertRaises(ValueError):
+                loader.tail_csv(path)
+            self.assertEqual(loader.tail_csv(path, on_replaced='replace'), 3)
+            self.assertEqual(loader.tail_csv(path), 0)
+            rows = loader.db_handler.execute_query('SELECT id, name FROM events ORDER BY id')
+            loader.db_handler.close_connection()
+        self.assertEqual([tuple(row) for row in rows], [(7, 'x'), (8, 'y'), (9, 'z')])
+
+    def test_tail_csv_detects_rotated_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'events.csv')
+            loader = csv_loader.CSVLoader(db_name=os.path.join(tmp, 'tail.db'))
+            with open(path, 'w') as f:
+                f.write('id,name\n1,a\n')
+            loader.tail_csv(path)
+            # A new file with the same header and first line moved into place: only its identity differs.
+            rotated = os.path.join(tmp, 'events.new')
+            with open(rotated, 'w') as f:
+                f.write('id,name\n1,a\n2,b\n')
+            os.replace(rotated, path)
+            with self.assertRaises(ValueError):
+                loader.tail_csv(path)
+            self.assertEqual(loader.tail_csv(path, on_replaced='append'), 2)
+            rows = loader.db_handler.execute_query('SELECT id, name FROM events ORDER BY rowid')
+            loader.db_handler.close_connection()
+        self.assertEqual([tuple(row) for row in rows], [(1, 'a'), (1, 'a'), (2, 'b')])
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,72 @@
+import os
+import tempfile
+import threading
+import unittest
+import pandas as pd
+from sqlalchemy.pool import StaticPool
+from data_storage import engine_registry
+from data_storage.sqlite_handler import SQLiteHandler
+
+
+class TestEngineRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.tmp.name, 'shared.db')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_handlers_share_one_engine(self):
+        first, second = SQLiteHandler(self.db), SQLiteHandler(os.path.relpath(self.db))
+        self.assertIs(first.engine, second.engine)
+        first.close_connection()
+        first.close_connection()
+        third = SQLiteHandler(self.db)
+        self.assertIs(third.engine, second.engine)
+        second.close_connection()
+        third.close_connection()
+        self.assertIsNot(SQLiteHandler(self.db).engine, second.engine)
+
+    def test_only_writes_switch_to_wal(self):
+        handler = SQLiteHandler(self.db)
+        self.assertEqual(handler.execute_query('PRAGMA journal_mode')[0][0], 'delete')
+        self.assertEqual(handler.execute_query('SELECT count(*) FROM sqlite_master'), [(0,)])
+        self.assertFalse(os.path.exists(self.db + '-wal'))
+        handler.save_dataframe_to_db(pd.DataFrame({'x': [1, 2]}), 't')
+        self.assertEqual(handler.execute_query('PRAGMA journal_mode')[0][0], 'wal')
+        handler.close_connection()
+
+    def test_memory_handlers_are_separate(self):
+        first, second = SQLiteHandler(':memory:'), SQLiteHandler(':memory:')
+        second.save_dataframe_to_db(pd.DataFrame({'x': [1, 2]}), 't')
+        first.close_connection()
+        self.assertEqual(second.execute_query('SELECT count(*) FROM t'), [(2,)])
+        self.assertIsNone(SQLiteHandler(':memory:').execute_query('SELECT count(*) FROM t'))
+
+    def test_threads_use_separate_connections(self):
+        engine = engine_registry.get_engine(self.db)
+        barrier = threading.Barrier(3)
+        connections = []
+
+        def checkout():
+            with engine.connect() as conn:
+                connections.append(conn.connection.driver_connection)
+                barrier.wait()
+
+        threads = [threading.Thread(target=checkout) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len({id(conn) for conn in connections}), 3)
+        engine_registry.release_engine(engine)
+
+    def test_memory_database_uses_one_connection(self):
+        engine = engine_registry.get_engine(':memory:')
+        self.assertIsInstance(engine.pool, StaticPool)
+        engine_registry.release_engine(engine)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import contextlib
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from unittest import mock
+import pandas as pd
+from data_ingestion.ingest_scheduler import IngestScheduler
+
+
+class TestIngestScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.paths = []
+        for name, rows in (('small', 10), ('large', 500), ('medium', 100)):
+            path = os.path.join(self.tmp.name, f'{name}.csv')
+            pd.DataFrame({'id': range(rows), 'label': ['x'] * rows}).to_csv(path, index=False)
+            self.paths.append(path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_estimate_memory(self):
+        scheduler = IngestScheduler(chunk_size=10)
+        full = scheduler.estimate_memory(self.paths[1])
+        self.assertGreater(full, 0)
+        self.assertLess(scheduler.estimate_memory(self.paths[1], streaming=True), full)
+
+    def test_run_with_sink_orders_largest_first(self):
+        received = {}
+        progress = []
+        scheduler = IngestScheduler(memory_budget=1, max_workers=2, use_processes=False,
+                                    progress_callback=lambda p, stats: progress.append(p['files_done']))
+        stats = scheduler.run(self.paths, sink=received.__setitem__)
+        self.assertEqual([os.path.basename(s['file_path']) for s in stats], ['large.csv', 'medium.csv', 'small.csv'])
+        self.assertEqual(len(received[self.paths[1]]), 500)
+        self.assertEqual(progress, [1, 2, 3])
+        self.assertEqual(scheduler.progress['bytes_done'], scheduler.progress['bytes_total'])
+
+    def test_run_to_db(self):
+        db_path = os.path.join(self.tmp.name, 'ingest.db')
+        stats = IngestScheduler(max_workers=2, chunk_size=50).run(self.paths, db_name=db_path)
+        self.assertEqual(sum(s['rows'] for s in stats), 610)
+        with sqlite3.connect(db_path) as conn:
+            self.assertEqual(conn.execute('SELECT COUNT(*) FROM large').fetchone()[0], 500)
+
+    def test_run_to_db_into_one_table(self):
+        db_path = os.path.join(self.tmp.name, 'ingest.db')
+        paths = []
+        for idx in range(6):
+            path = os.path.join(self.tmp.name, f'part{idx}.csv')
+            pd.DataFrame({'id': range(1000), 'part': idx}).to_csv(path, index=False)
+            paths.append(path)
+        stats = IngestScheduler(max_workers=3, chunk_size=100).run(paths, db_name=db_path, table_names=['t'] * 6)
+        with sqlite3.connect(db_path) as conn:
+            self.assertEqual(conn.execute('SELECT COUNT(*) FROM t').fetchone()[0], sum(s['rows'] for s in stats))
+        self.assertEqual(sum(s['rows'] for s in stats), 6000)
+
+    def test_run_to_db_parses_files_concurrently(self):
+        spans = {}
+        read_csv = pd.read_csv
+
+        def slow_read_csv(path, *args, chunksize=None, **kwargs):
+            reader = read_csv(path, *args, chunksize=chunksize, **kwargs)
+            if chunksize is None:
+                return reader
+
+            def chunks():
+                with reader:
+                    start = time.perf_counter()
+                    for chunk in reader:
+                        time.sleep(0.1)
+                        yield chunk
+                    spans[path] = (start, time.perf_counter())
+            return contextlib.closing(chunks())
+
+        db_path = os.path.join(self.tmp.name, 'ingest.db')
+        with mock.patch('pandas.read_csv', slow_read_csv):
+            IngestScheduler(max_workers=2, use_processes=False, chunk_size=100).run(self.paths[1:], db_name=db_path)
+        (first_start, first_end), (second_start, second_end) = spans.values()
+        self.assertLess(max(first_start, second_start), min(first_end, second_end))
+        with sqlite3.connect(db_path) as conn:
+            self.assertEqual(conn.execute('SELECT COUNT(*) FROM large').fetchone()[0], 500)
+            self.assertEqual(conn.execute('SELECT COUNT(*) FROM medium').fetchone()[0], 100)
+
+    def test_run_to_db_raises_on_failed_file(self):
+        db_path = os.path.join(self.tmp.name, 'ingest.db')
+        other = os.path.join(self.tmp.name, 'other.csv')
+        pd.DataFrame({'other': [1, 2]}).to_csv(other, index=False)
+        with self.assertRaises(Exception):
+            IngestScheduler(max_workers=1).run([self.paths[0], other], db_name=db_path, table_names=['t', 't'])
+        with sqlite3.connect(db_path) as conn:
+            self.assertEqual(conn.execute('SELECT COUNT(*) FROM t').fetchone()[0], 10)
+
+    def test_requires_one_destination(self):
+        with self.assertRaises(ValueError):
+            IngestScheduler().run(self.paths)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import os
+import tempfile
+import unittest
+import pandas as pd
+from data_storage.sqlite_handler import SQLiteHandler
+
+
+class TestLazyFrame(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.handler = SQLiteHandler(os.path.join(self.tmp.name, 'lazy.db'))
+        self.df = pd.DataFrame({'id': range(10), 'region': ['north', 'south'] * 5, 'amount': [float(i) for i in range(10)],
+                                'when': pd.date_range('2024-01-01', periods=10), 'flag': [True, False] * 5})
+        self.handler.save_dataframe_to_db(self.df, 'sales')
+
+    def tearDown(self):
+        self.handler.close_connection()
+        self.tmp.cleanup()
+
+    def test_compiles_one_query(self):
+        frame = (self.handler.lazy_table('sales').select('id', 'amount').filter('region = ?', 'north')
+                 .filter('amount > ? OR id = ?', 4, 0).order_by(['amount'], 'DESC').limit(2))
+        self.assertEqual(frame.to_sql(), ('SELECT "id", "amount" FROM "sales" WHERE (region = ?) AND '
+                                          '(amount > ? OR id = ?) ORDER BY "amount" DESC LIMIT ?', ('north', 4, 0, 2)))
+        self.assertEqual(frame.columns, ['id', 'amount'])
+        self.assertEqual(frame.collect().to_dict('list'), {'id': [8, 6], 'amount': [8.0, 6.0]})
+
+    def test_collect_matches_eager_load(self):
+        frame = self.handler.lazy_table('sales')
+        pd.testing.assert_frame_equal(frame.collect(), self.handler.load_table_to_dataframe('sales'))
+        north = frame.filter('region = ?', 'north')
+        self.assertEqual(north.count(), 5)
+        self.assertEqual(north.limit(3).count(), 3)
+        self.assertEqual(sum(len(chunk) for chunk in north.iter_batches(chunksize=2)), 5)
+        self.assertEqual(len(frame.head(4)), 4)
+
+    def test_invalid_chains_are_rejected(self):
+        frame = self.handler.lazy_table('sales')
+        with self.assertRaises(ValueError):
+            frame.select('missing')
+        with self.assertRaises(ValueError):
+            frame.limit(3).filter('id > ?', 1)
+        with self.assertRaises(ValueError):
+            frame.filter('missing > ?', 1).count()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+import numpy as np
+import pandas as pd
+from data_analysis.quant import QuantitativeAnalysis
+from data_modeling.modeler import Modeler
+from data_transformation.cleaner import DataCleaner
+from utils.ownership import handoff, take_ownership
+
+
+class TestOwnership(unittest.TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({'a': [1.0, np.nan, 3.0, 3.0], 'b': [4, 5, 6, 6]})
+
+    def test_take_ownership(self):
+        owned = take_ownership(self.df)
+        owned.loc[0, 'a'] = 100.0
+        self.assertEqual(self.df.loc[0, 'a'], 1.0)
+        self.assertIs(take_ownership(self.df, copy=False), self.df)
+
+    def test_take_ownership_with_copy_on_write(self):
+        with pd.option_context('mode.copy_on_write', True):
+            owned = take_ownership(self.df)
+            self.assertTrue(np.shares_memory(owned['b'].to_numpy(), self.df['b'].to_numpy()))
+            owned.loc[0, 'b'] = 100
+            self.assertEqual(self.df.loc[0, 'b'], 4)
+
+    @unittest.skipIf(tuple(map(int, pd.__version__.split('.')[:2])) < (2, 2), 'mode.copy_on_write="warn" needs pandas 2.2')
+    def test_take_ownership_with_copy_on_write_warnings(self):
+        with pd.option_context('mode.copy_on_write', 'warn'):
+            owned = take_ownership(self.df)
+        self.assertFalse(np.shares_memory(owned['b'].to_numpy(), self.df['b'].to_numpy()))
+
+    def test_handoff_passes_the_frame_without_copying(self):
+        cleaner = DataCleaner(self.df, lazy=True).remove_duplicates().fill_missing_values()
+        cleaned = handoff(cleaner)
+        self.assertIsNone(cleaner.df)
+        analysis = QuantitativeAnalysis(cleaned, copy=False)
+        self.assertIs(analysis.df, cleaned)
+        modeler = Modeler(handoff(analysis), copy=False)
+        self.assertIs(modeler.df, cleaned)
+        self.assertEqual(cleaned['a'].tolist(), [1.0, 2.0, 3.0])
+        with self.assertRaises(ValueError):
+            handoff(analysis)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import io
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+from data_ingestion import parse_cache
+from data_ingestion.csv_loader import CSVLoader
+
+
+class TestParseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, 'data.csv')
+        self.df = pd.DataFrame({
+            'id': np.arange(4),
+            'name': ['a', 'b', 'c', np.nan],
+            'group': pd.Categorical(['x', 'y', 'x', 'y']),
+            'when': pd.date_range('2024-01-01', periods=4),
+        })
+        self.df.to_csv(self.source, index=False)
+        self.cache = parse_cache.ParseCache(os.path.join(self.tmp.name, 'cache'))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        self.assertIsNone(self.cache.get(self.source))
+        self.cache.put(self.source, self.df)
+        pd.testing.assert_frame_equal(self.cache.get(self.source), self.df)
+
+    def test_round_trip_without_pyarrow(self):
+        with patch.object(parse_cache, 'HAS_PYARROW', False):
+            indexed = self.df.set_index('name')
+            self.cache.put(self.source, {'Sheet1': indexed}, 'excel', sheet_name=None)
+            cached = self.cache.get(self.source, 'excel', sheet_name=None)
+        pd.testing.assert_frame_equal(cached['Sheet1'], indexed)
+
+    def test_key_includes_kwargs_and_mtime(self):
+        self.cache.put(self.source, self.df, usecols=['id'])
+        self.assertIsNone(self.cache.get(self.source))
+        self.assertIsNotNone(self.cache.get(self.source, usecols=['id']))
+        stat = os.stat(self.source)
+        os.utime(self.source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+        self.assertIsNone(self.cache.get(self.source, usecols=['id']))
+
+    def test_lru_eviction(self):
+        self.cache.put(self.source, self.df, reader='first')
+        self.cache.max_bytes = self.cache.size() + 1
+        self.cache.put(self.source, self.df, reader='second')
+        self.assertIsNone(self.cache.get(self.source, reader='first'))
+        self.assertIsNotNone(self.cache.get(self.source, reader='second'))
+
+    @patch('data_ingestion.csv_loader.SQLiteHandler')
+    def test_csv_loader_uses_cache(self, mock_sqlite_handler):
+        loader = CSVLoader(parse_cache=self.cache)
+        first = loader.load_csv(self.source)
+        with patch('pandas.read_csv') as mock_read_csv:
+            second = loader.load_csv(self.source)
+        mock_read_csv.assert_not_called()
+        pd.testing.assert_frame_equal(first, second)
+
+    @patch('data_ingestion.csv_loader.SQLiteHandler')
+    def test_csv_loader_skips_cache_for_buffers(self, mock_sqlite_handler):
+        loader = CSVLoader(parse_cache=self.cache)
+        with open(self.source) as f:
+            loaded = loader.load_csv(io.StringIO(f.read()))
+        pd.testing.assert_frame_equal(loaded, pd.read_csv(self.source))
+        self.assertIsNone(self.cache.get('https://example.com/data.csv'))
+        self.assertEqual(self.cache.size(), 0)
+
+    def test_load_csv_cache_hit_has_no_memory_report(self):
+        loader = CSVLoader(parse_cache=self.cache)
+        loader.load_csv(self.source, optimize_dtypes=True)
+        self.assertIsNotNone(loader.last_memory_report)
+        loader.load_csv(self.source, optimize_dtypes=True)
+        self.assertIsNone(loader.last_memory_report)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import pickle
+import unittest
+import numpy as np
+import pandas as pd
+from data_transformation.quantile_sketch import KLLSketch
+
+
+class TestKLLSketch(unittest.TestCase):
+
+    def setUp(self):
+        self.values = np.random.default_rng(0).lognormal(0, 2, 200000)
+
+    def rank_error(self, sketch, q):
+        return abs(np.searchsorted(np.sort(self.values), sketch.quantile(q)) / len(self.values) - q)
+
+    def test_small_input_is_exact(self):
+        values = pd.Series([1.0, 5.0, np.nan, 3.0, 10.0])
+        sketch = KLLSketch().update(values)
+        np.testing.assert_allclose(sketch.quantile([0.25, 0.75]), values.quantile([0.25, 0.75]))
+        self.assertEqual((sketch.count, sketch.min, sketch.max), (4, 1.0, 10.0))
+        self.assertTrue(np.isnan(KLLSketch().quantile(0.5)))
+
+    def test_rank_error_is_bounded(self):
+        sketch = KLLSketch(seed=0)
+        for chunk in np.array_split(self.values, 50):
+            sketch.update(chunk)
+        for q in (0.01, 0.25, 0.5, 0.75, 0.99):
+            self.assertLess(self.rank_error(sketch, q), 0.0165)
+        self.assertEqual(sketch.quantile(1), self.values.max())
+        self.assertLess(sketch.nbytes, 3 * sketch.k * 8)
+
+    def test_merge_across_chunks(self):
+        parts = [pickle.loads(pickle.dumps(KLLSketch(seed=seed).update(chunk)))
+                 for seed, chunk in enumerate(np.array_split(self.values, 8))]
+        merged = parts[0]
+        for part in parts[1:]:
+            merged.merge(part)
+        self.assertEqual(merged.count, len(self.values))
+        for q in (0.25, 0.75):
+            self.assertLess(self.rank_error(merged, q), 0.0165)
+        with self.assertRaises(ValueError):
+            merged.merge(KLLSketch(k=100))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -34,6 +34,20 @@ class TestQueryBuilder(unittest.TestCase):
         self.query_builder.select("name, age").from_table("users").where("age > 18").build()
         self.assertEqual(self.query_builder.query, "")
 
+    def test_build_with_params(self):
+        query, params = (self.query_builder.select("name").from_table("users").where("age > ?", 18)
+                         .where("city = ? OR city = ?", "Oslo", "Bergen").order_by("name").limit(10)
+                         .build(with_params=True))
+        self.assertEqual(query, "SELECT name FROM users WHERE (age > ?) AND (city = ? OR city = ?) "
+                                "ORDER BY name ASC LIMIT ?")
+        self.assertEqual(params, (18, "Oslo", "Bergen", 10))
+        self.assertEqual(self.query_builder.params, [])
+
+    def test_where_after_other_clauses_is_rejected(self):
+        self.query_builder.select().from_table("users").where("age > ?", 18).group_by("age")
+        with self.assertRaises(ValueError):
+            self.query_builder.where("age < ?", 65)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,67 @@
+import os
+import tempfile
+import unittest
+import pandas as pd
+from data_storage.query_profiler import QueryProfiler, query_shape
+from data_storage.result_cache import QueryResultCache
+from data_storage.sqlite_handler import SQLiteHandler
+
+
+class TestQueryProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.tmp.name, 'profile.db')
+        self.handler = SQLiteHandler(self.db)
+        self.handler.bulk_load(pd.DataFrame({'id': range(1000), 'name': [f'n{i}' for i in range(1000)]}), 'items')
+        self.profiler = QueryProfiler(self.db, slow_threshold=10)
+
+    def tearDown(self):
+        self.profiler.close()
+        self.handler.close_connection()
+        self.tmp.cleanup()
+
+    def test_query_shape(self):
+        self.assertEqual(query_shape("SELECT * FROM t WHERE a = 10 AND b = 'x''y' AND c IN (1, 2, 3)"),
+                         'SELECT * FROM t WHERE a = ? AND b = ? AND c IN (?)')
+        self.assertEqual(query_shape('SELECT "col 1", t2.x FROM t2  WHERE y > -1.5e3;'),
+                         'SELECT "col 1", t2.x FROM t2 WHERE y > ?')
+
+    def test_aggregates_by_shape(self):
+        for i in range(3):
+            self.handler.execute_query(f'SELECT * FROM items WHERE id < {100 * (i + 1)}')
+        chunks = list(self.handler.iter_query('SELECT name FROM items', chunksize=300))
+        self.handler.fetch_columnar('SELECT id FROM items WHERE id < ?', (10,))
+        top = self.profiler.top(by='calls')
+        self.assertEqual(top[0]['shape'], 'SELECT * FROM items WHERE id < ?')
+        self.assertEqual((top[0]['calls'], top[0]['rows']), (3, 600))
+        self.assertGreater(top[0]['bytes'], 0)
+        streamed = next(entry for entry in top if entry['shape'] == 'SELECT name FROM items')
+        self.assertEqual((streamed['calls'], streamed['rows']), (1, sum(len(chunk) for chunk in chunks)))
+        self.assertEqual(len(top), 3)
+        self.assertEqual(self.profiler.slow_queries(), [])
+        with self.assertRaises(ValueError):
+            self.profiler.top(by='unknown')
+
+    def test_slow_query_log_captures_plan(self):
+        self.profiler.slow_threshold = 0
+        with self.assertLogs(level='WARNING'):
+            self.handler.execute_query('SELECT * FROM items WHERE name = ?', ('n5',))
+        slow = self.profiler.slow_queries()
+        self.assertEqual(len(slow), 1)
+        self.assertEqual(slow[0]['rows'], 1)
+        self.assertTrue(any(detail.startswith('SCAN') for detail in slow[0]['plan']))
+        self.assertEqual(self.profiler.top()[0]['slow_calls'], 1)
+
+    def test_cache_hits_are_reported(self):
+        cache = QueryResultCache()
+        for _ in range(2):
+            cache.get_or_run(self.db, 'SELECT COUNT(*) FROM items', None,
+                             lambda: self.handler.execute_query('SELECT COUNT(*) FROM items'))
+        cache.close()
+        entry = self.profiler.top()[0]
+        self.assertEqual((entry['calls'], entry['cache_hits']), (2, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
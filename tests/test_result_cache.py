@@ -0,0 +1,66 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+import pandas as pd
+from data_storage.result_cache import QueryResultCache, normalize_sql
+from data_storage.sqlite_handler import SQLiteHandler
+
+
+class TestQueryResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.tmp.name, 'cache.db')
+        self.handler = SQLiteHandler(self.db)
+        self.handler.save_dataframe_to_db(pd.DataFrame({'n': [1, 2, 3]}), 'numbers')
+        self.cache = QueryResultCache()
+        self.runs = 0
+
+    def tearDown(self):
+        self.cache.close()
+        self.handler.close_connection()
+        self.tmp.cleanup()
+
+    def _count(self, query='SELECT COUNT(*) FROM numbers', params=None):
+        def run():
+            self.runs += 1
+            return self.handler.execute_query(query, params)
+        return self.cache.get_or_run(self.db, query, params, run)
+
+    def test_repeated_query_is_served_from_cache(self):
+        self.assertEqual(self._count(), ([(3,)], False))
+        rows, cached = self._count('SELECT  COUNT(*)\n FROM numbers;')
+        self.assertEqual((rows, cached, self.runs), ([(3,)], True, 1))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        self._count('SELECT COUNT(*) FROM numbers WHERE n > ?', (1,))
+        self.assertEqual(self._count('SELECT COUNT(*) FROM numbers WHERE n > ?', (2,))[0], [(1,)])
+
+    def test_write_through_handler_invalidates(self):
+        self._count()
+        SQLiteHandler(self.db).save_dataframe_to_db(pd.DataFrame({'n': [4]}), 'numbers')
+        self.assertEqual(self._count(), ([(4,)], False))
+
+    def test_write_by_another_connection_invalidates(self):
+        self._count()
+        with sqlite3.connect(self.db) as conn:
+            conn.execute('INSERT INTO numbers VALUES (4)')
+        conn.close()
+        self.assertEqual(self._count(), ([(4,)], False))
+
+    def test_least_recently_used_results_are_evicted(self):
+        self.cache.max_bytes = 1
+        self._count()
+        self.assertEqual(self.cache.size(), 0)
+        self.cache.max_bytes = 10 ** 6
+        self._count()
+        self.assertGreater(self.cache.size(), 0)
+        self.cache.invalidate(self.db)
+        self.assertEqual(self.cache.size(), 0)
+
+    def test_normalize_sql_keeps_quoted_text(self):
+        self.assertEqual(normalize_sql("SELECT  *\nFROM t WHERE a = 'x  y';"), "SELECT * FROM t WHERE a = 'x  y'")
+
+
+if __name__ == '__main__':
+    unittest.main()
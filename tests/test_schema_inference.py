@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from data_ingestion.schema_inference import SchemaInferer
+
+
+class TestSchemaInferer(unittest.TestCase):
+
+    def setUp(self):
+        n = 200
+        self.df = pd.DataFrame({
+            'small': np.arange(n) % 100,
+            'large': np.arange(n) * 1000,
+            'ratio': np.linspace(0, 1, n),
+            'half': np.arange(n) / 2,
+            'group': np.random.choice(['a', 'b', 'c'], n),
+            'flag': [True, None] * (n // 2),
+            'day': pd.date_range('2024-01-01', periods=n).astype(str),
+            'label': [f'id{i}' for i in range(n)],
+        })
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'data.csv')
+        self.df.to_csv(self.path, index=False)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_infer_from_frame(self):
+        dtype, parse_dates = SchemaInferer().infer_from_frame(pd.read_csv(self.path))
+        self.assertEqual(dtype, {'group': 'category', 'flag': 'boolean'})
+        self.assertEqual(parse_dates, ['day'])
+
+    def test_infer_from_frame_ignores_date_like_codes(self):
+        sample = pd.DataFrame({
+            'version': [f'1.{i % 5}.{i % 7}' for i in range(100)],
+            'code': [f'{i % 12 + 1} {i % 28 + 1} 2024' for i in range(100)],
+            'stamp': [f'2024-01-{i % 28 + 1:02d}T10:00:00Z' for i in range(99)] + ['unknown'],
+            'slashed': [f'{i % 12 + 1}/{i % 28 + 1}/2024' for i in range(100)],
+        })
+        _, parse_dates = SchemaInferer(category_threshold=0).infer_from_frame(sample)
+        self.assertEqual(parse_dates, ['stamp', 'slashed'])
+        _, parse_dates = SchemaInferer(category_threshold=0, date_threshold=1.0).infer_from_frame(sample)
+        self.assertEqual(parse_dates, ['slashed'])
+
+    def test_read_csv(self):
+        df, report = SchemaInferer(sample_rows=50).read_csv(self.path)
+        self.assertEqual(df['small'].dtype, np.int8)
+        self.assertEqual(df['large'].dtype, np.int32)
+        # float32 cannot hold most of linspace's values exactly; halves it can.
+        self.assertEqual(df['ratio'].dtype, np.float64)
+        self.assertEqual(df['half'].dtype, np.float32)
+        self.assertEqual(df['group'].dtype, 'category')
+        self.assertTrue(pd.api.types.is_datetime64_dtype(df['day']))
+        self.assertEqual(df['label'].dtype, object)
+        self.assertEqual(report['rows'], 200)
+        self.assertLess(report['optimized_bytes'], report['estimated_default_bytes'])
+
+    def test_explicit_dtype_wins(self):
+        df, _ = SchemaInferer().read_csv(self.path, dtype={'group': str})
+        self.assertEqual(df['group'].dtype, object)
+
+    def test_downcast_keeps_floats_float32_cannot_hold(self):
+        df = pd.DataFrame({'precise': [123456.789, np.nan], 'tiny': [1e-9, 1.0], 'exact': [0.25, np.nan]})
+        df = SchemaInferer().downcast(df)
+        self.assertEqual(df['precise'].dtype, np.float64)
+        self.assertEqual(df['precise'].iloc[0], 123456.789)
+        self.assertEqual(df['tiny'].dtype, np.float64)
+        self.assertEqual(df['exact'].dtype, np.float32)
+
+    def test_optimize(self):
+        df = SchemaInferer(downcast_floats=False).optimize(pd.read_csv(self.path))
+        self.assertEqual(df['small'].dtype, np.int8)
+        self.assertEqual(df['ratio'].dtype, np.float64)
+        self.assertEqual(df['group'].dtype, 'category')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,10 @@
+import os
+import tempfile
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 from data_storage import sqlite_handler
 from sqlalchemy import create_engine, text
+import numpy as np
 import pandas as pd
 
 
@@ -43,6 +46,192 @@ class SQLiteHandlerTest(unittest.TestCase):
         loaded_df = loaded_df.head(3)
         pd.testing.assert_frame_equal(df, loaded_df)
 
+    def test_bulk_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            handler = sqlite_handler.SQLiteHandler(os.path.join(tmp, 'bulk.db'))
+            df = pd.DataFrame({'id': [1, 2, 3], 'value': [0.5, None, 2.5], 'name': ['a', None, 'c'],
+                               'when': pd.to_datetime(['2024-01-01', None, '2024-01-03']), 'flag': [True, False, True]})
+            handler.save_dataframe_to_db(df.head(1), 'bulk')
+            handler.execute_query('CREATE INDEX ix_bulk_name ON bulk (name)')
+            rows = handler.bulk_load((df.iloc[i:i + 1] for i in range(1, 3)), 'bulk', index_columns=['id'])
+            loaded = handler.load_table_to_dataframe('bulk')
+            indexes = handler.execute_query("SELECT name FROM sqlite_master WHERE type = 'index' ORDER BY name")
+            journal_mode = handler.execute_query('PRAGMA journal_mode')
+            handler.close_connection()
+        self.assertEqual(rows, 2)
+        pd.testing.assert_frame_equal(loaded, df)
+        self.assertEqual([row[0] for row in indexes], ['ix_bulk_id', 'ix_bulk_name'])
+        self.assertEqual(journal_mode[0][0], 'wal')
+
+    def test_bulk_load_rolls_back_on_error(self):
+        def chunks():
+            yield pd.DataFrame({'A': [4, 5]})
+            raise RuntimeError('source failed')
+
+        with tempfile.TemporaryDirectory() as tmp:
+            handler = sqlite_handler.SQLiteHandler(os.path.join(tmp, 'bulk.db'))
+            handler.bulk_load(pd.DataFrame({'A': [1, 2, 3]}), 'table1', if_exists='replace')
+            with self.assertRaises(RuntimeError):
+                handler.bulk_load(chunks(), 'table1')
+            count = handler.execute_query('SELECT COUNT(*) FROM table1')
+            handler.close_connection()
+        self.assertEqual(count[0][0], 3)
+
+    def test_bulk_load_into_new_table_rolls_back_on_error(self):
+        def chunks():
+            yield pd.DataFrame({'A': [4, 5]})
+            raise RuntimeError('source failed')
+
+        handler = sqlite_handler.SQLiteHandler(':memory:')
+        for typed in (False, True):
+            with self.assertRaises(RuntimeError):
+                handler.bulk_load(chunks(), 'new_table', typed=typed)
+        tables = handler.execute_query("SELECT name FROM sqlite_master WHERE type = 'table'")
+        handler.close_connection()
+        self.assertEqual(tables, [])
+
+    def test_untyped_database_skips_dtype_catalog(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            handler = sqlite_handler.SQLiteHandler(os.path.join(tmp, 'plain.db'))
+            with patch.object(sqlite_handler, '_read_catalog') as read_catalog:
+                handler.save_dataframe_to_db(pd.DataFrame({'A': [1]}), 'plain')
+                handler.save_dataframe_to_db(pd.DataFrame({'A': [2]}), 'plain')
+            read_catalog.assert_not_called()
+            handler.bulk_load(pd.DataFrame({'when': pd.to_datetime(['2024-01-01'])}), 'typed', typed=True)
+            handler.save_dataframe_to_db(pd.DataFrame({'when': pd.to_datetime(['2024-01-02'])}), 'typed')
+            loaded = handler.load_table_to_dataframe('typed')
+            handler.close_connection()
+        self.assertEqual(loaded['when'].dtype, 'datetime64[ns]')
+        self.assertEqual(len(loaded), 2)
+
+    def test_execute_query_with_params(self):
+        result = self.db_handler.execute_query('SELECT ? + ?', (1, 2))
+        self.assertEqual(result[0][0], 3)
+        result = self.db_handler.execute_query('SELECT :a * :b', {'a': 3, 'b': 4})
+        self.assertEqual(result[0][0], 12)
+
+    def test_iter_query(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            handler = sqlite_handler.SQLiteHandler(os.path.join(tmp, 'query.db'))
+            handler.bulk_load(pd.DataFrame({'id': range(5), 'name': list('abcde')}), 'items')
+            chunks = list(handler.iter_query('SELECT * FROM items WHERE id >= ? ORDER BY id', chunksize=2, params=(1,)))
+            empty = list(handler.iter_query('SELECT * FROM items WHERE id < 0'))
+            handler.close_connection()
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2])
+        self.assertEqual(pd.concat(chunks)['name'].tolist(), list('bcde'))
+        self.assertEqual(len(empty), 1)
+        self.assertEqual(list(empty[0].columns), ['id', 'name'])
+
+    def test_fetch_columnar(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            handler = sqlite_handler.SQLiteHandler(os.path.join(tmp, 'query.db'))
+            handler.bulk_load(pd.DataFrame({'id': [1, 2, 3], 'score': [1, None, 2.5], 'name': ['a', 'b', None]}),
+                              'items')
+            columns = handler.fetch_columnar('SELECT id, score, name FROM items ORDER BY id', chunksize=2)
+            handler.close_connection()
+        self.assertEqual(list(columns), ['id', 'score', 'name'])
+        self.assertEqual(columns['id'].dtype, np.int64)
+        self.assertEqual(columns['score'].dtype, np.float64)
+        np.testing.assert_array_equal(columns['score'], [1.0, np.nan, 2.5])
+        self.assertEqual(columns['name'].tolist(), ['a', 'b', None])
+
+    def test_load_table_parallel(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            handler = sqlite_handler.SQLiteHandler(os.path.join(tmp, 'parallel.db'))
+            df = pd.DataFrame({'id': range(1000), 'score': [None] * 500 + [float(i) for i in range(500)],
+                               'when': pd.date_range('2024-01-01', periods=1000, freq='h')})
+            handler.bulk_load(df, 'events')
+            with handler.engine.begin() as conn:
+                conn.exec_driver_sql('DELETE FROM events WHERE id % 7 = 0')
+            expected = handler.load_table_to_dataframe('events')
+            self.assertEqual(len(expected), 857)
+            for use_processes in (False, True):
+                loaded = handler.load_table_parallel('events', num_workers=3, use_processes=use_processes,
+                                                     min_rows_per_range=100)
+                pd.testing.assert_frame_equal(loaded, expected)
+            subset = handler.load_table_parallel('events', num_workers=2, columns=['when'], min_rows_per_range=100)
+            handler.close_connection()
+        pd.testing.assert_frame_equal(subset, expected[['when']])
+
+    def test_typed_table_round_trip(self):
+        df = pd.DataFrame({
+            'when': pd.to_datetime(['2024-01-01 10:00:00.123456789', None, '2024-02-01 00:00:00.000000000']),
+            'local': pd.date_range('2024-01-01', periods=3, freq='h', tz='Europe/Berlin'),
+            'grade': pd.Categorical(['a', 'b', None], categories=['b', 'a', 'z'], ordered=True),
+            'small': np.array([1, 2, 3], dtype='int8'),
+            'ratio': np.array([1.5, 2.0, np.nan], dtype='float32'),
+            'flag': [True, False, True],
+            'wait': pd.to_timedelta([1, 2, None], unit='s'),
+            'count': pd.array([1, None, 3], dtype='Int16')})
+        with tempfile.TemporaryDirectory() as tmp:
+            handler = sqlite_handler.SQLiteHandler(os.path.join(tmp, 'typed.db'))
+            handler.bulk_load(df, 'typed', typed=True, strict=True)
+            loaded = handler.load_table_to_dataframe('typed')
+            schema = handler.execute_query("SELECT sql FROM sqlite_master WHERE name = 'typed'")[0][0]
+            handler.save_dataframe_to_db(df.assign(grade=pd.Categorical(['c'] * 3)).iloc[:1], 'typed')
+            appended = handler.load_table_to_dataframe('typed')
+            handler.close_connection()
+        pd.testing.assert_frame_equal(loaded, df)
+        self.assertIn('"small" INTEGER', schema)
+        if sqlite_handler.STRICT_TABLES_SUPPORTED:
+            self.assertTrue(schema.endswith('STRICT'))
+        self.assertEqual(list(appended['grade'].cat.categories), ['b', 'a', 'z', 'c'])
+        self.assertEqual(appended['grade'].tolist()[-1], 'c')
+        self.assertEqual(appended['when'].iloc[-1], df['when'].iloc[0])
+
+    def test_staged_bulk_load_into_typed_table(self):
+        df = pd.DataFrame({'when': pd.to_datetime(['2024-01-01', '2024-01-02', None]),
+                           'grade': pd.Categorical(['a', 'b', None]), 'n': [1, 2, 3]})
+        with tempfile.TemporaryDirectory() as tmp:
+            handler = sqlite_handler.SQLiteHandler(os.path.join(tmp, 'typed.db'))
+            rows = handler.bulk_load(iter([df.iloc[:2], df.iloc[2:]]), 'typed', typed=True, staged=True)
+            more = df.assign(grade=pd.Categorical(['c', 'a', 'c']))
+            handler.bulk_load(iter([more]), 'typed', staged=True)
+            loaded = handler.load_table_to_dataframe('typed')
+            handler.close_connection()
+            leftovers = [name for name in os.listdir(tmp) if name.startswith('.plato_stage_')]
+        self.assertEqual(rows, 3)
+        self.assertEqual(leftovers, [])
+        self.assertEqual(list(loaded['grade'].cat.categories), ['a', 'b', 'c'])
+        pd.testing.assert_series_equal(loaded['when'], pd.concat([df, more], ignore_index=True)['when'])
+        self.assertEqual(loaded['grade'].tolist()[3:], ['c', 'a', 'c'])
+
+    def test_append_with_checkpoint_into_typed_table(self):
+        df = pd.DataFrame({'when': pd.to_datetime(['2024-01-01 10:00:00.5', None]),
+                           'grade': pd.Categorical(['a', 'b']), 'wait': pd.to_timedelta([1, 2], unit='s')})
+        more = pd.DataFrame({'when': pd.to_datetime(['2024-03-01']), 'grade': pd.Categorical(['c']),
+                             'wait': pd.to_timedelta([3], unit='s')})
+        with tempfile.TemporaryDirectory() as tmp:
+            handler = sqlite_handler.SQLiteHandler(os.path.join(tmp, 'typed.db'))
+            handler.bulk_load(df, 'typed', typed=True, strict=True)
+            handler.append_with_checkpoint(more, 'typed', '/data/events.csv', 42, 'header', '1:2', 'data')
+            loaded = handler.load_table_to_dataframe('typed')
+            checkpoint = handler.get_ingest_checkpoint('/data/events.csv')
+            deleted = handler.reset_ingest_checkpoint('/data/events.csv', delete_rows=True)
+            remaining = handler.load_table_to_dataframe('typed')
+            handler.close_connection()
+        expected = pd.concat([df, more], ignore_index=True)
+        expected['grade'] = pd.Categorical(['a', 'b', 'c'])
+        pd.testing.assert_frame_equal(loaded, expected)
+        self.assertEqual(checkpoint, (42, 'header', '1:2', 'data'))
+        self.assertEqual(deleted, 1)
+        self.assertEqual(len(remaining), 2)
+
+    def test_save_to_typed_table_keeps_indexes(self):
+        df = pd.DataFrame({'when': pd.to_datetime(['2024-01-01', '2024-01-02']), 'n': [1, 2]})
+        with tempfile.TemporaryDirectory() as tmp:
+            handler = sqlite_handler.SQLiteHandler(os.path.join(tmp, 'typed.db'))
+            handler.bulk_load(df, 'typed', typed=True, index_columns=['n'])
+            with patch.object(handler, '_prepare_bulk_table', wraps=handler._prepare_bulk_table) as prepare:
+                handler.save_dataframe_to_db(df.iloc[:1], 'typed')
+            indexes = handler.execute_query("SELECT name FROM sqlite_master WHERE type = 'index' "
+                                            "AND tbl_name = 'typed'")
+            count = handler.execute_query('SELECT COUNT(*) FROM typed')[0][0]
+            handler.close_connection()
+        self.assertTrue(prepare.call_args.args[-1])
+        self.assertEqual([tuple(row) for row in indexes], [('ix_typed_n',)])
+        self.assertEqual(count, 3)
+
 
 if __name__ == '__main__':
     unittest.main()
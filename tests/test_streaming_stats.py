@@ -0,0 +1,45 @@
+import unittest
+import numpy as np
+import pandas as pd
+from data_transformation.streaming_stats import ColumnStats
+
+
+class TestColumnStats(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.values = pd.Series(np.where(rng.random(1000) < 0.1, np.nan, rng.normal(1e6, 5, 1000)))
+
+    def test_update_matches_pandas(self):
+        stats = ColumnStats()
+        for start in range(0, 1000, 150):
+            stats.update(self.values.iloc[start:start + 150])
+        self.assertEqual((stats.count, stats.nulls), (self.values.count(), self.values.isna().sum()))
+        self.assertAlmostEqual(stats.mean, self.values.mean(), places=6)
+        self.assertAlmostEqual(stats.std, self.values.std(), places=9)
+        self.assertEqual((stats.min, stats.max), (self.values.min(), self.values.max()))
+
+    def test_merge_is_order_independent(self):
+        left, right = ColumnStats().update(self.values.iloc[:300]), ColumnStats().update(self.values.iloc[300:])
+        merged = ColumnStats().update(self.values.iloc[300:]).merge(ColumnStats().update(self.values.iloc[:300]))
+        left.merge(right)
+        self.assertAlmostEqual(left.mean, merged.mean, places=6)
+        self.assertAlmostEqual(left.var, merged.var, places=6)
+        self.assertEqual(left.count, merged.count)
+
+    def test_mode(self):
+        stats = ColumnStats(track_modes=True)
+        stats.update(pd.Series(['b', 'a', None, 'c'])).update(pd.Series(['a', 'b', 'd']))
+        self.assertEqual(stats.mode(), pd.Series(['b', 'a', None, 'c', 'a', 'b', 'd']).mode()[0])
+        self.assertTrue(np.isnan(ColumnStats().update(pd.Series([1.0])).std))
+
+    def test_mode_candidates_are_bounded(self):
+        stats = ColumnStats(track_modes=True, max_mode_candidates=10)
+        for start in range(0, 1000, 100):
+            stats.update(pd.Series(list(range(start, start + 100)) + [7] * 5))
+        self.assertLessEqual(len(stats.candidates), 10)
+        self.assertEqual(stats.mode(), 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -34,6 +34,15 @@ class TestTransformer(unittest.TestCase):
         expected_vals = pd.cut(self.df['B'], bins=2, labels=['Low', 'High'])
         self.assertTrue(np.array_equal(transformed['B'], expected_vals))
 
+    def test_transform_chunks(self):
+        chunks = [self.df.iloc[:2].copy(), self.df.iloc[2:].copy()]
+        transformed = pd.concat(DataTransformer.transform_chunks(chunks, [('log_transform', {'columns': 'B'})]))
+        self.assertTrue(np.allclose(transformed['B'], np.log1p(self.df['B'])))
+
+    def test_transform_chunks_unknown_step(self):
+        with self.assertRaises(ValueError):
+            DataTransformer.transform_chunks([self.df], [('get_transformed_data', {})])
+
 
 if __name__ == '__main__':
     unittest.main()
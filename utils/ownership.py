@@ -0,0 +1,55 @@
+import pandas as pd
+from utils.logger import logger
+
+# The methods the pipeline stages use to return their frame; handoff calls the first one a stage has, so a stage with
+# pending work (a lazy DataCleaner) finishes it before handing over.
+_RESULT_GETTERS = ('get_cleaned_data', 'get_transformed_data', 'get_qualitative_data', 'get_quantitative_data')
+
+
+def take_ownership(df, copy=True):
+    """
+    Return the frame a pipeline stage should hold for an input DataFrame.
+
+    Every stage (DataCleaner, DataTransformer, QualitativeAnalysis, QuantitativeAnalysis, Modeler, Visualizer) takes its
+    input through this function, so their copy parameters all mean what is described here.
+
+    With copy=True the stage gets a frame of its own, so its changes never reach the caller. When pandas Copy-on-Write
+    is enabled (pd.options.mode.copy_on_write is True, not "warn"), that is a shallow copy: it shares the caller's data
+    until either side writes to a column, and only that column is then copied. Otherwise it is a deep copy. With
+    copy=False the stage works on df itself; the caller hands the frame over and sees any changes the stage makes to it.
+
+    Parameters:
+        df (pd.DataFrame): The input DataFrame.
+        copy (bool): Whether the stage gets its own frame.
+
+    Returns:
+        pd.DataFrame: The frame for the stage.
+    """
+    if not copy:
+        return df
+    # pandas >= 2.2 also accepts "warn", which only warns about writes that Copy-on-Write would change.
+    return df.copy(deep=pd.options.mode.copy_on_write is not True)
+
+
+def handoff(stage):
+    """
+    Take the frame out of a pipeline stage so the next stage can own it without a copy.
+
+    The stage's result getter (get_cleaned_data, get_transformed_data, ...) is called first, so pending work is done,
+    then the stage lets go of the frame: its df is set to None and it must not be used afterwards. Pass the frame on
+    with copy=False, e.g. QuantitativeAnalysis(handoff(cleaner), copy=False), and the whole pipeline holds one copy of
+    the data.
+
+    Parameters:
+        stage: A DataCleaner, DataTransformer, QualitativeAnalysis, QuantitativeAnalysis, Modeler or Visualizer.
+
+    Returns:
+        pd.DataFrame: The stage's frame.
+    """
+    getter = next((getattr(stage, name) for name in _RESULT_GETTERS if hasattr(stage, name)), None)
+    df = getter() if getter is not None else stage.df
+    if df is None:
+        raise ValueError(f"{type(stage).__name__} has already handed off its frame")
+    stage.df = None
+    logger.info(f"{type(stage).__name__} handed off its frame ({len(df)} rows)")
+    return df